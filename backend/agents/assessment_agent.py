@@ -2,7 +2,7 @@
 Assessment Agent - Autonomous quiz generation and evaluation
 """
 from agents.base_agent import BaseAgent
-from llm_service import LLMService
+from services import LazyService
 from datetime import datetime
 
 class AssessmentAgent(BaseAgent):
@@ -14,13 +14,26 @@ class AssessmentAgent(BaseAgent):
     - Providing detailed feedback
     """
     
+    # Question difficulty distribution per knowledge band
+    DIFFICULTY_MIXES = {
+        'low': {'beginner': 4, 'intermediate': 1, 'advanced': 0},
+        'mid': {'beginner': 1, 'intermediate': 3, 'advanced': 1},
+        'high': {'beginner': 0, 'intermediate': 2, 'advanced': 3}
+    }
+    
+    # Knowledge level used when generating a quiz for a band rather than a student
+    BAND_KNOWLEDGE_LEVELS = {'low': 0.15, 'mid': 0.5, 'high': 0.85}
+    
+    # Shared services, built on first use
+    llm_service = LazyService('llm_service')
+    quiz_pool = LazyService('quiz_pool')  # optional QuizPool of pre-generated quizzes
+    
     def __init__(self):
         super().__init__("AA-001", "AssessmentAgent")
-        self.llm_service = LLMService()
         self.quizzes_generated = 0
         self.questions_evaluated = 0
         self.difficulty_adjustments = 0
-        
+    
     def perceive(self, environment):
         """
         Perceive student's quiz context
@@ -29,23 +42,34 @@ class AssessmentAgent(BaseAgent):
             environment: dict with {
                 'user_id': int,
                 'topic_id': int,
-                'knowledge_level': float,
+                'knowledge_level': float (optional) - defaults to the learner's level on the topic,
                 'recent_performance': list,
-                'quiz_type': str (optional)
+                'quiz_type': str (optional),
+                'stream': bool (optional) - return a question generator instead of a list,
+                'learner': LearnerSnapshot (optional) - saves looking the topic up
             }
         """
         self.update_state("perceiving")
-        self.log(f"Perceiving assessment needs for user {environment.get('user_id')}")
+        self.log("Perceiving assessment needs for user %s", environment.get('user_id'))
         
-        self.user_id = environment.get('user_id')
-        self.topic_id = environment.get('topic_id')
-        self.knowledge_level = environment.get('knowledge_level', 0.0)
-        self.recent_performance = environment.get('recent_performance', [])
-        self.quiz_type = environment.get('quiz_type', 'standard')
+        learner = environment.get('learner')
+        knowledge_level = environment.get('knowledge_level')
+        if knowledge_level is None:
+            # The snapshot already holds the effective level; unpracticed topics start at 0
+            state = learner.state(environment.get('topic_id')) if learner else None
+            knowledge_level = state.knowledge_level if state else 0.0
         
-        return self
+        return self.new_context(
+            user_id=environment.get('user_id'),
+            topic_id=environment.get('topic_id'),
+            knowledge_level=knowledge_level,
+            recent_performance=environment.get('recent_performance', []),
+            quiz_type=environment.get('quiz_type', 'standard'),
+            stream=environment.get('stream', False),
+            learner=learner
+        )
     
-    def decide(self):
+    def decide(self, ctx):
         """
         Autonomous decisions:
         - What difficulty level for questions?
@@ -56,45 +80,34 @@ class AssessmentAgent(BaseAgent):
         self.update_state("deciding")
         
         # Decision 1: Difficulty distribution
-        if self.knowledge_level < 0.3:
-            self.difficulty_mix = {
-                'beginner': 4,
-                'intermediate': 1,
-                'advanced': 0
-            }
-        elif self.knowledge_level < 0.7:
-            self.difficulty_mix = {
-                'beginner': 1,
-                'intermediate': 3,
-                'advanced': 1
-            }
-        else:
-            self.difficulty_mix = {
-                'beginner': 0,
-                'intermediate': 2,
-                'advanced': 3
-            }
+        band = self.knowledge_band(ctx.knowledge_level)
+        difficulty_mix = dict(self.DIFFICULTY_MIXES[band])
         
         # Decision 2: Question count
-        self.num_questions = sum(self.difficulty_mix.values())
+        num_questions = sum(difficulty_mix.values())
         
         # Decision 3: Analyze weak areas from recent performance
-        if len(self.recent_performance) > 0:
-            wrong_topics = [p['topic_area'] for p in self.recent_performance 
+        if len(ctx.recent_performance) > 0:
+            wrong_topics = [p['topic_area'] for p in ctx.recent_performance 
                            if not p.get('correct')]
             if wrong_topics:
-                self.focus_areas = list(set(wrong_topics))
-                self.log(f"Focusing on weak areas: {self.focus_areas}")
+                focus_areas = list(set(wrong_topics))
+                self.log("Focusing on weak areas: %s", focus_areas)
             else:
-                self.focus_areas = []
+                focus_areas = []
         else:
-            self.focus_areas = []
+            focus_areas = []
         
-        self.log(f"Quiz decisions: {self.difficulty_mix}, focus={self.focus_areas}")
+        self.log("Quiz decisions: %s, focus=%s", difficulty_mix, focus_areas)
         
-        return self
+        return ctx.evolve(
+            band=band,
+            difficulty_mix=difficulty_mix,
+            num_questions=num_questions,
+            focus_areas=focus_areas
+        )
     
-    def act(self):
+    def act(self, ctx):
         """
         Execute: Generate adaptive quiz
         """
@@ -102,29 +115,147 @@ class AssessmentAgent(BaseAgent):
         self.log("Generating adaptive quiz...")
         
         from models import Topic
-        topic = Topic.query.get(self.topic_id)
+        topic = ctx.learner.topic(ctx.topic_id) if ctx.learner else Topic.query.get(ctx.topic_id)
         
         if not topic:
-            self.log("Topic not found", "error")
+            self.log("Topic not found", level="error")
             return {"error": "Topic not found"}
         
-        # Build adaptive prompt
+        # Serve a pre-generated quiz when the request isn't personalised by focus areas
+        if self.quiz_pool is not None and not ctx.focus_areas:
+            pooled = self.quiz_pool.take(topic.id, ctx.band)
+            if pooled is not None:
+                if ctx.stream:
+                    return self._quiz_stream_result(ctx, topic, iter(pooled), source="pool")
+                return self._quiz_result(ctx, topic, pooled, source="pool")
+        
+        prompt = self._quiz_prompt(topic.name, ctx.knowledge_level, ctx.focus_areas, ctx.difficulty_mix)
+        
+        if ctx.stream:
+            questions = self.llm_service.stream_quiz_with_prompt(
+                topic.name,
+                ctx.num_questions,
+                custom_prompt=prompt
+            )
+            return self._quiz_stream_result(ctx, topic, questions, source="llm")
+        
+        try:
+            # Generate quiz
+            quiz_questions = self.llm_service.generate_quiz_with_prompt(
+                topic.name,
+                ctx.num_questions,
+                custom_prompt=prompt
+            )
+            
+            return self._quiz_result(ctx, topic, quiz_questions, source="llm")
+        
+        except Exception as e:
+            self.log("Error generating quiz: %s", e, level="error")
+            self.update_state("error")
+            return {"error": str(e)}
+    
+    def _quiz_result(self, ctx, topic, quiz_questions, source):
+        """Record a served quiz and build the act() result"""
+        total = self.increment('quizzes_generated')
+        self.log("Quiz served from %s (Total: %d)", source, total)
+        
+        # Store in memory
+        self.remember("quiz_generated",
+                      topic=topic.name,
+                      num_questions=len(quiz_questions),
+                      difficulty_mix=ctx.difficulty_mix,
+                      source=source,
+                      user_id=ctx.user_id)
+        
+        self.update_state("completed")
+        
+        return {
+            "questions": quiz_questions,
+            "metadata": {
+                "band": ctx.band,
+                "difficulty_mix": ctx.difficulty_mix,
+                "focus_areas": ctx.focus_areas,
+                "source": source,
+                "topic_name": topic.name,
+                "agent": self.name,
+                "generated_at": datetime.utcnow().isoformat()
+            }
+        }
+    
+    def _quiz_stream_result(self, ctx, topic, questions, source):
+        """
+        Streaming variant of _quiz_result(): questions is a generator that
+        yields each question as soon as it is complete
+        """
+        total = self.increment('quizzes_generated')
+        self.log("Quiz stream started from %s (Total: %d)", source, total)
+        
+        self.remember("quiz_streamed",
+                      topic=topic.name,
+                      num_questions=ctx.num_questions,
+                      difficulty_mix=ctx.difficulty_mix,
+                      source=source,
+                      user_id=ctx.user_id)
+        
+        self.update_state("completed")
+        
+        return {
+            "stream": questions,
+            "metadata": {
+                "band": ctx.band,
+                "difficulty_mix": ctx.difficulty_mix,
+                "focus_areas": ctx.focus_areas,
+                "num_questions": ctx.num_questions,
+                "source": source,
+                "topic_name": topic.name,
+                "agent": self.name,
+                "generated_at": datetime.utcnow().isoformat()
+            }
+        }
+    
+    @staticmethod
+    def knowledge_band(knowledge_level):
+        """Map a knowledge level onto one of the three quiz shapes"""
+        if knowledge_level < 0.3:
+            return 'low'
+        elif knowledge_level < 0.7:
+            return 'mid'
+        return 'high'
+    
+    def generate_pool_quiz(self, topic, band):
+        """
+        Generate a quiz for a knowledge band instead of a specific student
+        (used by QuizPool). Does not touch per-request agent state and raises
+        instead of returning the fallback quiz, so failures are never pooled.
+        """
+        difficulty_mix = self.DIFFICULTY_MIXES[band]
+        prompt = self._quiz_prompt(topic.name, self.BAND_KNOWLEDGE_LEVELS[band], [], difficulty_mix)
+        
+        return self.llm_service.generate_quiz_with_prompt(
+            topic.name,
+            sum(difficulty_mix.values()),
+            custom_prompt=prompt,
+            bypass_cache=True,
+            use_fallback=False
+        )
+    
+    def _quiz_prompt(self, topic_name, knowledge_level, focus_areas, difficulty_mix):
+        """Build adaptive prompt"""
         focus_instruction = ""
-        if self.focus_areas:
-            focus_instruction = f"Focus particularly on: {', '.join(self.focus_areas)}"
+        if focus_areas:
+            focus_instruction = f"Focus particularly on: {', '.join(focus_areas)}"
         
         prompt = f"""
-        Generate an adaptive quiz for "{topic.name}"
+        Generate an adaptive quiz for "{topic_name}"
         
         STUDENT PROFILE:
-        - Knowledge level: {self.knowledge_level*100:.0f}%
-        - Recent weak areas: {self.focus_areas if self.focus_areas else 'None'}
+        - Knowledge level: {knowledge_level*100:.0f}%
+        - Recent weak areas: {focus_areas if focus_areas else 'None'}
         
         QUIZ STRUCTURE:
         """
         
-        questions = []
-        for difficulty, count in self.difficulty_mix.items():
+        for difficulty, count in difficulty_mix.items():
             if count > 0:
                 prompt += f"\n- {count} {difficulty} level questions"
         
@@ -146,43 +277,7 @@ class AssessmentAgent(BaseAgent):
         
         NO other text. Just the JSON.
         """
-        
-        try:
-            # Generate quiz
-            quiz_questions = self.llm_service.generate_quiz_with_prompt(
-                topic.name,
-                self.num_questions,
-                custom_prompt=prompt
-            )
-            
-            self.quizzes_generated += 1
-            self.log(f"Quiz generated successfully (Total: {self.quizzes_generated})")
-            
-            # Store in memory
-            self.memory.append({
-                "action": "quiz_generated",
-                "topic": topic.name,
-                "num_questions": self.num_questions,
-                "difficulty_mix": self.difficulty_mix,
-                "user_id": self.user_id
-            })
-            
-            self.update_state("completed")
-            
-            return {
-                "questions": quiz_questions,
-                "metadata": {
-                    "difficulty_mix": self.difficulty_mix,
-                    "focus_areas": self.focus_areas,
-                    "agent": self.name,
-                    "generated_at": datetime.utcnow().isoformat()
-                }
-            }
-            
-        except Exception as e:
-            self.log(f"Error generating quiz: {str(e)}", "error")
-            self.update_state("error")
-            return {"error": str(e)}
+        return prompt
     
     def evaluate_answer(self, question, user_answer, correct_answer, context):
         """
@@ -195,10 +290,10 @@ class AssessmentAgent(BaseAgent):
             context: dict with topic info
         """
         self.update_state("evaluating")
-        self.log(f"Evaluating answer: {user_answer} vs {correct_answer}")
+        self.log("Evaluating answer: %s vs %s", user_answer, correct_answer)
         
         is_correct = user_answer == correct_answer
-        self.questions_evaluated += 1
+        self.increment('questions_evaluated')
         
         # Generate intelligent feedback
         feedback_prompt = f"""
@@ -215,11 +310,11 @@ class AssessmentAgent(BaseAgent):
         """
         
         try:
-            feedback = self.llm_service.model.generate_content(feedback_prompt).text
+            feedback = self.llm_service.generate_text(feedback_prompt, task='explanation')
         except:
             feedback = "Review the concept and try again!" if not is_correct else "Great job!"
         
-        self.log(f"Answer evaluated. Correct: {is_correct}")
+        self.log("Answer evaluated. Correct: %s", is_correct)
         
         return {
             "is_correct": is_correct,
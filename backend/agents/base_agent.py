@@ -2,65 +2,145 @@
 Base Agent Class - All agents inherit from this
 """
 from abc import ABC, abstractmethod
+from agents.execution_context import ExecutionContext
+from collections import deque
+from config import Config
+from itertools import islice
+from tracing import traced
 import logging
+import threading
+import time
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR
+}
+
 class BaseAgent(ABC):
-    """Base class for all autonomous agents"""
+    """
+    Base class for all autonomous agents.
+    
+    One instance serves every request concurrently: per-request data lives in
+    the ExecutionContext returned by perceive(), and only shared statistics
+    stay on the agent (updated through increment()).
+    
+    Memory is a ring buffer of the last Config.AGENT_MEMORY_SIZE records,
+    stored as compact tuples and only turned into dicts by get_memory():
+        (timestamp, level, message, args, state)  - from log()
+        (timestamp, "action", action, details, state)  - from remember()
+    log() only keeps what the logger is enabled for (Config.AGENT_LOG_LEVEL),
+    so debug chatter such as state transitions can't push actions out.
+    
+    perceive/decide/act of every subclass are wrapped by __init_subclass__:
+    each call is timed into the agent's latency histogram and becomes a
+    span when the surrounding request is traced.
+    """
+    
+    TRACED_PHASES = ('perceive', 'decide', 'act')
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for phase in cls.TRACED_PHASES:
+            method = cls.__dict__.get(phase)
+            if method is not None and not getattr(method, '__traced__', False):
+                setattr(cls, phase, traced(lambda agent: agent.name, phase)(method))
     
     def __init__(self, agent_id, name):
         self.agent_id = agent_id
         self.name = name
         self.state = "idle"
-        self.memory = []
+        self.memory = deque(maxlen=Config.AGENT_MEMORY_SIZE)
         self.logger = logging.getLogger(f"Agent-{name}")
+        self.logger.setLevel(Config.AGENT_LOG_LEVEL)
         self.created_at = datetime.utcnow()
+        self._stats_lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+    
+    def new_context(self, **values):
+        """Start the execution context of one request"""
+        return ExecutionContext.create(self, **values)
+    
+    def increment(self, counter, amount=1):
+        """Atomically bump a shared statistics counter and return the new value"""
+        with self._stats_lock:
+            value = getattr(self, counter) + amount
+            setattr(self, counter, value)
+            return value
+    
+    def log(self, message, *args, level="info"):
+        """
+        Log agent activities
         
-    def log(self, message, level="info"):
-        """Log agent activities"""
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "agent": self.name,
-            "message": message,
-            "state": self.state
-        }
-        self.memory.append(log_entry)
+        message is a %-style template formatted with args only when the
+        record is actually emitted or read back from memory. Records below
+        the logger's level are dropped: neither emitted nor kept in memory.
+        """
+        levelno = LOG_LEVELS[level]
+        if not self.logger.isEnabledFor(levelno):
+            return
         
-        if level == "info":
-            self.logger.info(f"[{self.name}] {message}")
-        elif level == "error":
-            self.logger.error(f"[{self.name}] {message}")
-        elif level == "warning":
-            self.logger.warning(f"[{self.name}] {message}")
+        self._record((time.time(), level, message, args, self.state))
+        self.logger.log(levelno, "[%s] %s", self.name, message % args if args else message)
+    
+    def remember(self, action, **details):
+        """Store a completed action in memory"""
+        self._record((time.time(), "action", action, details, self.state))
+    
+    def _record(self, record):
+        with self._memory_lock:
+            self.memory.append(record)
     
     def update_state(self, new_state):
-        """Update agent state"""
+        """Update agent state (last transition of any request; informational only)"""
         old_state = self.state
         self.state = new_state
-        self.log(f"State transition: {old_state} → {new_state}")
+        self.log("State transition: %s → %s", old_state, new_state, level="debug")
     
     @abstractmethod
     def perceive(self, environment):
-        """Perceive the environment - to be implemented by subclasses"""
+        """Perceive the environment and return a new ExecutionContext - to be implemented by subclasses"""
         pass
     
     @abstractmethod
-    def decide(self):
-        """Make autonomous decisions - to be implemented by subclasses"""
+    def decide(self, ctx):
+        """Make autonomous decisions and return ctx evolved with them - to be implemented by subclasses"""
         pass
     
     @abstractmethod
-    def act(self):
-        """Execute actions - to be implemented by subclasses"""
+    def act(self, ctx):
+        """Execute actions for ctx and return the result - to be implemented by subclasses"""
         pass
     
     def get_memory(self, limit=10):
-        """Retrieve recent memory"""
-        return self.memory[-limit:]
+        """Retrieve recent memory, oldest first"""
+        with self._memory_lock:
+            records = list(islice(reversed(self.memory), limit))
+        
+        return [self._format_record(record) for record in reversed(records)]
+    
+    def _format_record(self, record):
+        timestamp, level, message, payload, state = record
+        entry = {
+            "timestamp": datetime.utcfromtimestamp(timestamp).isoformat(),
+            "agent": self.name,
+            "state": state
+        }
+        
+        if level == "action":
+            entry["action"] = message
+            entry.update(payload)
+        else:
+            entry["level"] = level
+            entry["message"] = message % payload if payload else message
+        return entry
     
     def clear_memory(self):
         """Clear agent memory"""
-        self.memory = []
-        self.log("Memory cleared")
\ No newline at end of file
+        with self._memory_lock:
+            self.memory.clear()
+        self.log("Memory cleared")
@@ -2,11 +2,10 @@
 Coordinator Agent - Orchestrates all other agents
 """
 from agents.base_agent import BaseAgent
-from agents.teaching_agent import TeachingAgent
-from agents.assessment_agent import AssessmentAgent
-from agents.knowledge_agent import KnowledgeAgent
-from agents.tutor_agent import TutorAgent
-from agents.recommendation_agent import RecommendationAgent
+from agents.workflow import WorkflowStep, SKIPPED, get_workflow_executor
+from learner_snapshot import LearnerSnapshot
+from services import LazyService
+from tracing import tag_trace
 from datetime import datetime
 import json
 
@@ -15,202 +14,233 @@ class CoordinatorAgent(BaseAgent):
     Master agent that coordinates all other agents
     """
     
+    # Tasks whose agents read the learner's topics and knowledge states
+    LEARNER_TASKS = {
+        "generate_lesson",
+        "generate_quiz",
+        "evaluate_answer",
+        "recommend_topic",
+        "full_learning_session"
+    }
+    
+    # Sub-agents come from the service registry: built on first use and
+    # shared by every coordinator in the process
+    teaching_agent = LazyService('teaching_agent')
+    assessment_agent = LazyService('assessment_agent')
+    knowledge_agent = LazyService('knowledge_agent')
+    tutor_agent = LazyService('tutor_agent')
+    recommendation_agent = LazyService('recommendation_agent')
+    
     def __init__(self):
         super().__init__("CA-001", "CoordinatorAgent")
         
-        # Initialize all sub-agents
-        self.teaching_agent = TeachingAgent()
-        self.assessment_agent = AssessmentAgent()
-        self.knowledge_agent = KnowledgeAgent()
-        self.tutor_agent = TutorAgent()
-        self.recommendation_agent = RecommendationAgent()
+        # Runs each workflow's steps as a dependency graph
+        self.executor = get_workflow_executor()
         
         self.tasks_coordinated = 0
+        self.last_active_agents = 0  # agents used by the most recent workflow
         
-        self.log("Coordinator initialized with 5 sub-agents")
+        self.log("Coordinator initialized with 5 sub-agents (built on first use)")
     
     def perceive(self, environment):
         """
         Perceive global learning environment
+        
+        Besides 'task', 'user_id' and 'context', the environment may carry
+        'on_step' and 'cancelled' hooks, handed to the workflow executor
+        (used by background jobs to report progress and stop early).
         """
         self.update_state("perceiving")
-        self.log(f"Coordinating agents for task: {environment.get('task')}")
+        self.log("Coordinating agents for task: %s", environment.get('task'))
+        
+        task = environment.get('task')
+        user_id = environment.get('user_id')
+        tag_trace(task=task)
         
-        self.task = environment.get('task')
-        self.user_id = environment.get('user_id')
-        self.context = environment.get('context', {})
+        # One read of the learner's state, shared by every agent in the workflow
+        learner = LearnerSnapshot.load(user_id) if task in self.LEARNER_TASKS else None
         
-        return self
+        return self.new_context(
+            task=task,
+            user_id=user_id,
+            context=environment.get('context', {}),
+            learner=learner,
+            on_step=environment.get('on_step'),
+            cancelled=environment.get('cancelled')
+        )
     
-    def decide(self):
+    def decide(self, ctx):
         """
-        Decide which agents to activate
+        Decide which agents to activate and how their steps depend on each other
         """
         self.update_state("deciding")
         
         # Route to appropriate agents based on task
-        self.active_agents = []
+        active_agents = []
+        steps = []
         
-        if self.task == "generate_lesson":
-            self.active_agents = [self.teaching_agent, self.knowledge_agent]
-            self.workflow = "sequential"  # Knowledge first, then teaching
-            
-        elif self.task == "generate_quiz":
-            self.active_agents = [self.knowledge_agent, self.assessment_agent]
-            self.workflow = "sequential"
-            
-        elif self.task == "evaluate_answer":
-            self.active_agents = [self.assessment_agent, self.knowledge_agent]
-            self.workflow = "sequential"
-            
-        elif self.task == "provide_hint":
-            self.active_agents = [self.tutor_agent]
-            self.workflow = "single"
-            
-        elif self.task == "recommend_topic":
-            self.active_agents = [self.knowledge_agent, self.recommendation_agent]
-            self.workflow = "sequential"
-            
-        elif self.task == "full_learning_session":
+        if ctx.task == "generate_lesson":
+            active_agents = [self.teaching_agent, self.knowledge_agent]
+            workflow = "graph"  # Neither agent reads the other's result
+            steps = [self._agent_step(ctx, agent) for agent in active_agents]
+        
+        elif ctx.task == "generate_quiz":
+            active_agents = [self.knowledge_agent, self.assessment_agent]
+            workflow = "graph"
+            steps = [self._agent_step(ctx, agent) for agent in active_agents]
+        
+        elif ctx.task == "evaluate_answer":
+            active_agents = [self.assessment_agent, self.knowledge_agent]
+            workflow = "graph"
+            steps = [self._agent_step(ctx, agent) for agent in active_agents]
+        
+        elif ctx.task == "provide_hint":
+            active_agents = [self.tutor_agent]
+            workflow = "single"
+            steps = [self._agent_step(ctx, self.tutor_agent)]
+        
+        elif ctx.task == "recommend_topic":
+            active_agents = [self.knowledge_agent, self.recommendation_agent]
+            workflow = "graph"
+            steps = [self._agent_step(ctx, agent) for agent in active_agents]
+        
+        elif ctx.task == "full_learning_session":
             # Complex workflow involving all agents
-            self.active_agents = [
+            active_agents = [
                 self.knowledge_agent,
                 self.recommendation_agent,
                 self.teaching_agent,
                 self.assessment_agent,
                 self.tutor_agent
             ]
-            self.workflow = "complex"
+            workflow = "complex"
+            steps = self._complex_workflow_steps(ctx)
         
         else:
-            self.log(f"Unknown task: {self.task}", "warning")
-            self.active_agents = []
-            self.workflow = "none"
+            self.log("Unknown task: %s", ctx.task, level="warning")
+            active_agents = []
+            workflow = "none"
         
-        self.log(f"Activating {len(self.active_agents)} agents in {self.workflow} workflow")
+        self.log("Activating %d agents in %s workflow", len(active_agents), workflow)
         
-        return self
+        return ctx.evolve(active_agents=tuple(active_agents), workflow=workflow, steps=tuple(steps))
     
-    def act(self):
+    def _agent_step(self, ctx, agent, depends_on=()):
+        """Workflow step running one agent's perceive/decide/act cycle"""
+        # Sub-agents always know whose request they serve
+        base_environment = {'user_id': ctx.user_id, 'learner': ctx.learner, **ctx.context}
+        
+        def run(inputs):
+            self.log("Executing %s", agent.name)
+            # Each agent gets the results of the steps it depends on
+            return agent.perceive({**base_environment, **inputs}).decide().act()
+        
+        return WorkflowStep(agent.name, run, depends_on)
+    
+    def act(self, ctx):
         """
         Execute coordinated agent workflow
         """
         self.update_state("acting")
         self.log("Executing coordinated workflow...")
         
-        results = {}
-        
         try:
-            if self.workflow == "single":
-                # Single agent execution
-                agent = self.active_agents[0]
-                agent.perceive(self.context)
-                agent.decide()
-                results = agent.act()
-                
-            elif self.workflow == "sequential":
-                # Sequential agent execution
-                for i, agent in enumerate(self.active_agents):
-                    self.log(f"Step {i+1}: Executing {agent.name}")
-                    
-                    # Each agent gets results from previous
-                    context = {**self.context, **results}
-                    
-                    agent.perceive(context)
-                    agent.decide()
-                    agent_result = agent.act()
-                    
-                    results[agent.name] = agent_result
-                
-            elif self.workflow == "complex":
-                # Complex multi-agent orchestration
-                results = self._execute_complex_workflow()
+            results, timing = self.executor.run(ctx.steps, on_step=ctx.on_step, cancelled=ctx.cancelled)
             
-            self.tasks_coordinated += 1
-            self.log(f"Workflow completed successfully (Total tasks: {self.tasks_coordinated})")
+            if ctx.workflow == "single":
+                # Single agent execution returns that agent's result as is
+                results = results[ctx.steps[0].name]
+            
+            total = self.increment('tasks_coordinated')
+            self.last_active_agents = len(ctx.active_agents)
+            self.log("Workflow completed successfully (Total tasks: %d, critical path %.0fms of %.0fms work)",
+                    total, timing['critical_path_ms'], timing['total_work_ms'])
             
             self.update_state("completed")
             
             return {
                 "success": True,
                 "results": results,
-                "agents_used": [a.name for a in self.active_agents],
-                "workflow": self.workflow,
+                "user_id": ctx.user_id,
+                "agents_used": [a.name for a in ctx.active_agents],
+                "workflow": ctx.workflow,
+                "timing": timing,
                 "coordinator": self.name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-            
+        
         except Exception as e:
-            self.log(f"Workflow error: {str(e)}", "error")
+            self.log("Workflow error: %s", e, level="error")
             self.update_state("error")
             return {
                 "success": False,
                 "error": str(e),
+                "user_id": ctx.user_id,
                 "coordinator": self.name
             }
     
-    def _execute_complex_workflow(self):
+    def _complex_workflow_steps(self, ctx):
         """
-        Execute complex multi-agent workflow
+        Complex multi-agent workflow as a dependency graph:
+        
+            recommendations -> lesson
+            knowledge_analysis
+            assessment
+            motivation
         """
-        results = {}
-        
-        # Step 1: Knowledge Agent analyzes current state
-        self.log("Complex workflow - Step 1: Knowledge analysis")
-        self.knowledge_agent.perceive({
-            'user_id': self.user_id,
-            'recent_activities': self.context.get('recent_activities', [])
-        })
-        self.knowledge_agent.decide()
-        knowledge_result = self.knowledge_agent.act()
-        results['knowledge_analysis'] = knowledge_result
-        
-        # Step 2: Recommendation Agent suggests path
-        self.log("Complex workflow - Step 2: Path recommendation")
-        self.recommendation_agent.perceive({
-            'user_id': self.user_id,
-            'current_topic_id': self.context.get('current_topic_id')
-        })
-        self.recommendation_agent.decide()
-        recommendation_result = self.recommendation_agent.act()
-        results['recommendations'] = recommendation_result
-        
-        # Step 3: Teaching Agent creates lesson
-        if recommendation_result.get('next_best'):
-            next_topic = recommendation_result['next_best']
+        def knowledge_analysis(inputs):
+            self.log("Complex workflow: Knowledge analysis")
+            return self.knowledge_agent.perceive({
+                'user_id': ctx.user_id,
+                'learner': ctx.learner,
+                'recent_activities': ctx.context.get('recent_activities', [])
+            }).decide().act()
+        
+        def recommendations(inputs):
+            self.log("Complex workflow: Path recommendation")
+            return self.recommendation_agent.perceive({
+                'user_id': ctx.user_id,
+                'learner': ctx.learner,
+                'current_topic_id': ctx.context.get('current_topic_id')
+            }).decide().act()
+        
+        def lesson(inputs):
+            next_topic = inputs['recommendations'].get('next_best')
+            if not next_topic:
+                return SKIPPED
             
-            self.log("Complex workflow - Step 3: Lesson generation")
-            self.teaching_agent.perceive({
-                'user_id': self.user_id,
+            self.log("Complex workflow: Lesson generation")
+            return self.teaching_agent.perceive({
+                'user_id': ctx.user_id,
+                'learner': ctx.learner,
                 'topic_id': next_topic['topic_id'],
                 'knowledge_level': next_topic['current_knowledge'],
                 'learning_history': []
+            }).decide().act()
+        
+        def assessment(inputs):
+            self.log("Complex workflow: Assessment preparation")
+            return self.assessment_agent.perceive({
+                'user_id': ctx.user_id,
+                'learner': ctx.learner,
+                'topic_id': ctx.context.get('topic_id'),
+                'recent_performance': []
+            }).decide().act()
+        
+        def motivation(inputs):
+            self.log("Complex workflow: Tutoring setup")
+            return self.tutor_agent.provide_motivation({
+                'score': 0.5,
+                'improvement': 0.1
             })
-            self.teaching_agent.decide()
-            teaching_result = self.teaching_agent.act()
-            results['lesson'] = teaching_result
-        
-        # Step 4: Assessment Agent prepares quiz
-        self.log("Complex workflow - Step 4: Assessment preparation")
-        self.assessment_agent.perceive({
-            'user_id': self.user_id,
-            'topic_id': self.context.get('topic_id'),
-            'knowledge_level': knowledge_result.get('predicted_growth', 0.5),
-            'recent_performance': []
-        })
-        self.assessment_agent.decide()
-        assessment_result = self.assessment_agent.act()
-        results['assessment'] = assessment_result
-        
-        # Step 5: Tutor Agent provides initial guidance
-        self.log("Complex workflow - Step 5: Tutoring setup")
-        motivation = self.tutor_agent.provide_motivation({
-            'score': 0.5,
-            'improvement': 0.1
-        })
-        results['motivation'] = motivation
-        
-        return results
+        
+        return [
+            WorkflowStep('knowledge_analysis', knowledge_analysis),
+            WorkflowStep('recommendations', recommendations),
+            WorkflowStep('lesson', lesson, depends_on=['recommendations']),
+            WorkflowStep('assessment', assessment),
+            WorkflowStep('motivation', motivation)
+        ]
     
     def get_agent_status(self):
         """
@@ -240,6 +270,7 @@ class CoordinatorAgent(BaseAgent):
             "agent": self.name,
             "tasks_coordinated": self.tasks_coordinated,
             "state": self.state,
-            "active_sub_agents": len(self.active_agents) if hasattr(self, 'active_agents') else 0,
+            "active_sub_agents": self.last_active_agents,
+            "workflows": self.executor.get_stats(),
             "memory_size": len(self.memory)
         }
\ No newline at end of file
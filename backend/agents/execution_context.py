@@ -0,0 +1,49 @@
+"""
+Execution Context - Immutable per-request state for agents
+"""
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+
+
+@dataclass(frozen=True)
+class ExecutionContext:
+    """
+    Everything one request knows while passing through an agent: what the
+    agent perceived and what it decided.
+    
+    Agent instances are shared by every request, so they never keep
+    per-request data on self. perceive() builds a context, decide() returns an
+    evolved copy and act() reads from it. decide() and act() are forwarded to
+    the owning agent so the `agent.perceive(env).decide().act()` chain still works.
+    
+    Fields are readable as attributes (ctx.topic_id) or with ctx.get().
+    """
+    
+    agent: object
+    values: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    
+    @classmethod
+    def create(cls, agent, **values):
+        return cls(agent=agent, values=MappingProxyType(dict(values)))
+    
+    def __getattr__(self, name):
+        # Only reached when normal attribute lookup fails
+        if name == 'values':
+            raise AttributeError(name)
+        try:
+            return self.values[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__} has no field '{name}'") from None
+    
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+    
+    def evolve(self, **changes):
+        """Return a copy with some fields added or replaced"""
+        return replace(self, values=MappingProxyType({**self.values, **changes}))
+    
+    def decide(self):
+        return self.agent.decide(self)
+    
+    def act(self):
+        return self.agent.act(self)
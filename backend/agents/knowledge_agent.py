@@ -3,9 +3,9 @@ Knowledge Agent - Autonomous knowledge state management
 """
 from agents.base_agent import BaseAgent
 from knowledge_tracker import KnowledgeTracker
-from models import db, KnowledgeState
-import numpy as np
-from datetime import datetime, timedelta
+from learner_snapshot import LearnerSnapshot
+from services import LazyService
+from datetime import datetime
 
 class KnowledgeAgent(BaseAgent):
     """
@@ -16,12 +16,15 @@ class KnowledgeAgent(BaseAgent):
     - Suggesting review topics
     """
     
+    # Due reviews per user, ordered by due time (review_queue.py)
+    reviews = LazyService('review_queue')
+    
     def __init__(self):
         super().__init__("KA-001", "KnowledgeAgent")
         self.tracker = KnowledgeTracker()
         self.predictions_made = 0
         self.updates_performed = 0
-        
+    
     def perceive(self, environment):
         """
         Perceive student's learning state
@@ -30,26 +33,30 @@ class KnowledgeAgent(BaseAgent):
             environment: dict with {
                 'user_id': int,
                 'topic_id': int (optional),
-                'recent_activities': list
+                'recent_activities': list,
+                'learner': LearnerSnapshot (optional, loaded here if absent)
             }
         """
         self.update_state("perceiving")
-        self.log(f"Perceiving knowledge state for user {environment.get('user_id')}")
+        self.log("Perceiving knowledge state for user %s", environment.get('user_id'))
         
-        self.user_id = environment.get('user_id')
-        self.topic_id = environment.get('topic_id')
-        self.recent_activities = environment.get('recent_activities', [])
+        user_id = environment.get('user_id')
         
         # Get all knowledge states
-        self.knowledge_states = KnowledgeState.query.filter_by(
-            user_id=self.user_id
-        ).all()
+        learner = environment.get('learner') or LearnerSnapshot.load(user_id)
+        knowledge_states = list(learner.knowledge.values())
         
-        self.log(f"Found {len(self.knowledge_states)} knowledge states")
+        self.log("Found %d knowledge states", len(knowledge_states))
         
-        return self
+        return self.new_context(
+            user_id=user_id,
+            topic_id=environment.get('topic_id'),
+            recent_activities=environment.get('recent_activities', []),
+            learner=learner,
+            knowledge_states=knowledge_states
+        )
     
-    def decide(self):
+    def decide(self, ctx):
         """
         Autonomous decisions:
         - Which topics need review?
@@ -58,47 +65,33 @@ class KnowledgeAgent(BaseAgent):
         """
         self.update_state("deciding")
         
-        # Decision 1: Apply forgetting curves
-        topics_needing_review = []
-        for state in self.knowledge_states:
-            days_since_practice = (datetime.utcnow() - state.last_practiced).days
-            
-            if days_since_practice > 7 and state.knowledge_level > 0.3:
-                topics_needing_review.append({
-                    'topic_id': state.topic_id,
-                    'days_since': days_since_practice,
-                    'current_level': state.knowledge_level,
-                    'priority': days_since_practice * (1 - state.knowledge_level)
-                })
-        
-        # Sort by priority
-        topics_needing_review.sort(key=lambda x: x['priority'], reverse=True)
-        self.review_recommendations = topics_needing_review[:3]
+        # Decision 1: Topics due for review (over a week since practice, not yet forgotten),
+        # highest days_since * (1 - level) first
+        review_recommendations = self.reviews.due(ctx.user_id, k=3)
         
         # Decision 2: Identify knowledge gaps
-        self.knowledge_gaps = [
-            state for state in self.knowledge_states
+        knowledge_gaps = [
+            state for state in ctx.knowledge_states
             if 0 < state.knowledge_level < 0.4
         ]
         
         # Decision 3: Predict next knowledge level
-        if self.topic_id:
-            self.predicted_next_level = self._predict_knowledge_growth(self.topic_id)
+        if ctx.topic_id:
+            predicted_next_level = self._predict_knowledge_growth(ctx.learner.state(ctx.topic_id))
         else:
-            self.predicted_next_level = None
+            predicted_next_level = None
         
-        self.log(f"Decisions: {len(self.review_recommendations)} topics need review, "
-                f"{len(self.knowledge_gaps)} knowledge gaps found")
+        self.log("Decisions: %d topics need review, %d knowledge gaps found",
+                len(review_recommendations), len(knowledge_gaps))
         
-        return self
+        return ctx.evolve(
+            review_recommendations=review_recommendations,
+            knowledge_gaps=knowledge_gaps,
+            predicted_next_level=predicted_next_level
+        )
     
-    def _predict_knowledge_growth(self, topic_id):
-        """Predict knowledge growth based on learning patterns"""
-        state = KnowledgeState.query.filter_by(
-            user_id=self.user_id,
-            topic_id=topic_id
-        ).first()
-        
+    def _predict_knowledge_growth(self, state):
+        """Predict knowledge growth based on learning patterns (state: KnowledgeInfo or None)"""
         if not state:
             return 0.15  # Expected growth for new topic
         
@@ -111,79 +104,71 @@ class KnowledgeAgent(BaseAgent):
             growth = 0.15 * (1 - state.knowledge_level)
         
         predicted = min(1.0, state.knowledge_level + growth)
-        self.predictions_made += 1
+        self.increment('predictions_made')
         
-        self.log(f"Predicted knowledge growth: {state.knowledge_level:.2f} → {predicted:.2f}")
+        self.log("Predicted knowledge growth: %.2f → %.2f", state.knowledge_level, predicted)
         
         return predicted
     
-    def act(self):
+    def act(self, ctx):
         """
-        Execute: Update knowledge states and provide recommendations
+        Execute: Report decayed knowledge states and recommendations
+        
+        Levels decay on read (knowledge_tracker.effective_levels), so nothing
+        is written here; only practice changes a stored knowledge state.
         """
         self.update_state("acting")
-        self.log("Updating knowledge states...")
-        
-        # Apply forgetting curves to all states
-        updated_states = []
-        for state in self.knowledge_states:
-            days_since = (datetime.utcnow() - state.last_practiced).days
-            
-            if days_since > 0:
-                # Apply exponential forgetting
-                forgetting_factor = np.exp(-0.05 * days_since)
-                old_level = state.knowledge_level
-                state.knowledge_level *= forgetting_factor
-                
-                if abs(old_level - state.knowledge_level) > 0.01:
-                    updated_states.append({
-                        'topic_id': state.topic_id,
-                        'old_level': old_level,
-                        'new_level': state.knowledge_level,
-                        'decay': old_level - state.knowledge_level
-                    })
-                    self.updates_performed += 1
-        
-        # Commit updates
-        db.session.commit()
-        
-        self.log(f"Updated {len(updated_states)} knowledge states")
+        self.log("Reporting knowledge states...")
+        
+        # Topics that have noticeably faded since they were last practiced
+        decayed_states = [
+            {
+                'topic_id': state.topic_id,
+                'old_level': state.base_level,
+                'new_level': state.knowledge_level,
+                'decay': state.base_level - state.knowledge_level
+            }
+            for state in ctx.knowledge_states
+            if state.base_level - state.knowledge_level > 0.01
+        ]
+        
+        self.log("%d knowledge states have decayed", len(decayed_states))
         self.update_state("completed")
         
         return {
-            "review_recommendations": self.review_recommendations,
+            "review_recommendations": ctx.review_recommendations,
             "knowledge_gaps": [
                 {
                     'topic_id': gap.topic_id,
                     'level': gap.knowledge_level,
                     'confidence': gap.confidence
                 }
-                for gap in self.knowledge_gaps
+                for gap in ctx.knowledge_gaps
             ],
-            "predicted_growth": self.predicted_next_level,
-            "updated_states": updated_states,
+            "predicted_growth": ctx.predicted_next_level,
+            "decayed_states": decayed_states,
             "agent": self.name,
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def update_knowledge_from_quiz(self, topic_id, is_correct, difficulty):
+    def update_knowledge_from_quiz(self, user_id, topic_id, is_correct, difficulty):
         """
         Autonomous knowledge update based on quiz performance
         """
         self.update_state("updating")
-        self.log(f"Updating knowledge for topic {topic_id}, correct={is_correct}")
+        self.log("Updating knowledge for topic %s, correct=%s", topic_id, is_correct)
         
         # Use existing tracker but with agent logging
         state = self.tracker.update_knowledge(
-            self.user_id,
+            user_id,
             topic_id,
             is_correct,
             difficulty
         )
         
-        self.updates_performed += 1
-        self.log(f"Knowledge updated: {state.knowledge_level:.2f}, "
-                f"confidence: {state.confidence:.2f}")
+        self.increment('updates_performed')
+        self.log("Knowledge updated: %.2f, confidence: %.2f",
+                state.knowledge_level, state.confidence)
         
         return {
             "new_level": state.knowledge_level,
@@ -2,7 +2,7 @@
 Recommendation Agent - Autonomous learning path optimization
 """
 from agents.base_agent import BaseAgent
-from models import Topic, KnowledgeState
+from learner_snapshot import LearnerSnapshot
 from datetime import datetime
 
 class RecommendationAgent(BaseAgent):
@@ -18,7 +18,8 @@ class RecommendationAgent(BaseAgent):
         super().__init__("RA-001", "RecommendationAgent")
         self.recommendations_made = 0
         self.learning_paths_created = 0
-        
+        self.last_strategy = None  # strategy of the most recent recommendation
+    
     def perceive(self, environment):
         """
         Perceive student's learning state
@@ -27,29 +28,32 @@ class RecommendationAgent(BaseAgent):
             environment: dict with {
                 'user_id': int,
                 'current_topic_id': int (optional),
-                'goals': list (optional)
+                'goals': list (optional),
+                'learner': LearnerSnapshot (optional, loaded here if absent)
             }
         """
         self.update_state("perceiving")
-        self.log(f"Perceiving learning context for user {environment.get('user_id')}")
+        self.log("Perceiving learning context for user %s", environment.get('user_id'))
         
-        self.user_id = environment.get('user_id')
-        self.current_topic_id = environment.get('current_topic_id')
-        self.goals = environment.get('goals', [])
+        user_id = environment.get('user_id')
         
         # Get all topics and knowledge states
-        self.all_topics = Topic.query.all()
-        self.knowledge_states = {
-            ks.topic_id: ks.knowledge_level
-            for ks in KnowledgeState.query.filter_by(user_id=self.user_id).all()
-        }
-        
-        self.log(f"Analyzing {len(self.all_topics)} topics, "
-                f"{len(self.knowledge_states)} known states")
-        
-        return self
+        learner = environment.get('learner') or LearnerSnapshot.load(user_id)
+        all_topics = learner.topics
+        knowledge_states = learner.levels()
+        
+        self.log("Analyzing %d topics, %d known states",
+                len(all_topics), len(knowledge_states))
+        
+        return self.new_context(
+            user_id=user_id,
+            current_topic_id=environment.get('current_topic_id'),
+            goals=environment.get('goals', []),
+            all_topics=all_topics,
+            knowledge_states=knowledge_states
+        )
     
-    def decide(self):
+    def decide(self, ctx):
         """
         Autonomous decisions:
         - What topic to recommend next?
@@ -61,37 +65,37 @@ class RecommendationAgent(BaseAgent):
         # Decision 1: Calculate scores for all topics
         topic_scores = []
         
-        for topic in self.all_topics:
-            if topic.id == self.current_topic_id:
+        for topic in ctx.all_topics:
+            if topic.id == ctx.current_topic_id:
                 continue  # Skip current topic
             
-            score = self._calculate_topic_score(topic)
+            score = self._calculate_topic_score(ctx, topic)
             topic_scores.append((topic, score))
         
         # Sort by score
         topic_scores.sort(key=lambda x: x[1], reverse=True)
         
         # Decision 2: Choose recommendation strategy
-        if len(self.knowledge_states) < 3:
+        if len(ctx.knowledge_states) < 3:
             # New learner - suggest foundation topics
-            self.strategy = "foundation_building"
-            self.recommendations = [t for t, s in topic_scores 
-                                   if t.difficulty == 'beginner'][:3]
+            strategy = "foundation_building"
+            recommendations = [t for t, s in topic_scores 
+                               if t.difficulty == 'beginner'][:3]
         else:
             # Experienced learner - balanced approach
-            self.strategy = "balanced_growth"
-            self.recommendations = [t for t, s in topic_scores[:5]]
+            strategy = "balanced_growth"
+            recommendations = [t for t, s in topic_scores[:5]]
         
-        self.log(f"Strategy: {self.strategy}, {len(self.recommendations)} recommendations")
+        self.log("Strategy: %s, %d recommendations", strategy, len(recommendations))
         
-        return self
+        return ctx.evolve(strategy=strategy, recommendations=recommendations)
     
-    def _calculate_topic_score(self, topic):
+    def _calculate_topic_score(self, ctx, topic):
         """
         Autonomous scoring algorithm for topic recommendation
         """
         score = 0
-        knowledge_level = self.knowledge_states.get(topic.id, 0)
+        knowledge_level = ctx.knowledge_states.get(topic.id, 0)
         
         # Factor 1: Unstarted topics (high priority for beginners)
         if knowledge_level == 0:
@@ -103,12 +107,11 @@ class RecommendationAgent(BaseAgent):
         elif knowledge_level >= 0.8:
             score += 0.5
         
-        # Factor 4: Prerequisites
+        # Factor 4: Prerequisites (direct ones, from the topic graph)
         if topic.prerequisites:
-            prereq_ids = [int(x.strip()) for x in topic.prerequisites.split(',') if x.strip()]
             prereqs_met = all(
-                self.knowledge_states.get(pid, 0) > 0.6
-                for pid in prereq_ids
+                ctx.knowledge_states.get(pid, 0) > 0.6
+                for pid in topic.prerequisites
             )
             
             if prereqs_met:
@@ -119,7 +122,7 @@ class RecommendationAgent(BaseAgent):
             score += 2  # No prerequisites - easier to start
         
         # Factor 5: Difficulty match
-        avg_knowledge = sum(self.knowledge_states.values()) / len(self.knowledge_states) if self.knowledge_states else 0
+        avg_knowledge = sum(ctx.knowledge_states.values()) / len(ctx.knowledge_states) if ctx.knowledge_states else 0
         
         if topic.difficulty == 'beginner' and avg_knowledge < 0.3:
             score += 2
@@ -129,22 +132,22 @@ class RecommendationAgent(BaseAgent):
             score += 2
         
         # Factor 6: Goals alignment
-        if self.goals:
-            for goal in self.goals:
+        if ctx.goals:
+            for goal in ctx.goals:
                 if goal.lower() in topic.name.lower() or goal.lower() in topic.category.lower():
                     score += 4
         
         return score
     
-    def act(self):
+    def act(self, ctx):
         """
         Execute: Provide recommendations
         """
         self.update_state("acting")
         self.log("Generating personalized recommendations...")
         
-        if not self.recommendations:
-            self.log("No suitable recommendations found", "warning")
+        if not ctx.recommendations:
+            self.log("No suitable recommendations found", level="warning")
             self.update_state("completed")
             return {
                 "recommendations": [],
@@ -155,8 +158,8 @@ class RecommendationAgent(BaseAgent):
         # Build detailed recommendations
         detailed_recommendations = []
         
-        for topic in self.recommendations:
-            knowledge_level = self.knowledge_states.get(topic.id, 0)
+        for topic in ctx.recommendations:
+            knowledge_level = ctx.knowledge_states.get(topic.id, 0)
             
             # Generate reason for recommendation
             if knowledge_level == 0:
@@ -178,71 +181,56 @@ class RecommendationAgent(BaseAgent):
                 'priority': 'high' if knowledge_level == 0 or 0.3 < knowledge_level < 0.7 else 'medium'
             })
         
-        self.recommendations_made += 1
-        self.log(f"Recommendations generated (Total: {self.recommendations_made})")
+        total = self.increment('recommendations_made')
+        self.last_strategy = ctx.strategy
+        self.log("Recommendations generated (Total: %d)", total)
         
         # Store in memory
-        self.memory.append({
-            "action": "recommendations_generated",
-            "count": len(detailed_recommendations),
-            "strategy": self.strategy,
-            "user_id": self.user_id
-        })
+        self.remember("recommendations_generated",
+                      count=len(detailed_recommendations),
+                      strategy=ctx.strategy,
+                      user_id=ctx.user_id)
         
         self.update_state("completed")
         
         return {
             "recommendations": detailed_recommendations,
-            "strategy": self.strategy,
+            "strategy": ctx.strategy,
             "next_best": detailed_recommendations[0] if detailed_recommendations else None,
             "agent": self.name,
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def create_learning_path(self, target_topic_id):
+    def create_learning_path(self, user_id, target_topic_id):
         """
         Autonomous creation of optimal learning path to target topic
         """
         self.update_state("planning")
-        self.log(f"Creating learning path to topic {target_topic_id}")
+        self.log("Creating learning path to topic %s", target_topic_id)
         
-        target_topic = Topic.query.get(target_topic_id)
+        learner = LearnerSnapshot.load(user_id)
+        knowledge_states = learner.levels()
         
-        if not target_topic:
+        if not learner.topic(target_topic_id):
             return {"error": "Topic not found"}
         
+        # Every transitive prerequisite, then the target, prerequisites first
         path = []
-        queue = [target_topic]
-        visited = set()
-        
-        while queue:
-            topic = queue.pop(0)
-            
-            if topic.id in visited:
-                continue
-            
-            visited.add(topic.id)
-            knowledge_level = self.knowledge_states.get(topic.id, 0)
+        for topic_id in learner.graph.path_to(target_topic_id):
+            topic = learner.topic(topic_id)
+            knowledge_level = knowledge_states.get(topic_id, 0)
             
             # Add to path if not mastered
             if knowledge_level < 0.8:
-                path.insert(0, {
+                path.append({
                     'topic_id': topic.id,
                     'name': topic.name,
                     'current_knowledge': knowledge_level,
                     'estimated_hours': self._estimate_learning_time(topic, knowledge_level)
                 })
-            
-            # Add prerequisites to queue
-            if topic.prerequisites:
-                prereq_ids = [int(x.strip()) for x in topic.prerequisites.split(',') if x.strip()]
-                for pid in prereq_ids:
-                    prereq_topic = Topic.query.get(pid)
-                    if prereq_topic and prereq_topic.id not in visited:
-                        queue.append(prereq_topic)
         
-        self.learning_paths_created += 1
-        self.log(f"Learning path created with {len(path)} steps")
+        self.increment('learning_paths_created')
+        self.log("Learning path created with %d steps", len(path))
         
         return {
             "path": path,
@@ -270,7 +258,7 @@ class RecommendationAgent(BaseAgent):
             "agent": self.name,
             "recommendations_made": self.recommendations_made,
             "learning_paths_created": self.learning_paths_created,
-            "current_strategy": self.strategy if hasattr(self, 'strategy') else None,
+            "current_strategy": self.last_strategy,
             "state": self.state,
             "memory_size": len(self.memory)
         }
\ No newline at end of file
@@ -3,7 +3,7 @@
 Teaching Agent - Autonomous content generation and delivery
 """
 from agents.base_agent import BaseAgent
-from llm_service import LLMService
+from services import LazyService
 from datetime import datetime  # ADD THIS LINE
 import random
 
@@ -16,13 +16,15 @@ class TeachingAgent(BaseAgent):
     - Selecting examples based on student performance
     """
     
+    llm_service = LazyService('llm_service')  # shared, built on first use
+    
     def __init__(self):
         super().__init__("TA-001", "TeachingAgent")
-        self.llm_service = LLMService()
         self.teaching_styles = ["visual", "practical", "theoretical", "example-driven"]
-        self.current_style = "practical"
+        self.default_style = "practical"
+        self.current_style = self.default_style  # style of the most recent lesson
         self.lessons_generated = 0
-        
+    
     def perceive(self, environment):
         """
         Perceive student state from environment
@@ -33,39 +35,46 @@ class TeachingAgent(BaseAgent):
                 'topic_id': int,
                 'knowledge_level': float,
                 'learning_history': list,
-                'preferred_style': str (optional)
+                'preferred_style': str (optional),
+                'stream': bool (optional) - return a chunk generator instead of full content,
+                'learner': LearnerSnapshot (optional) - saves looking the topic up
             }
         """
         self.update_state("perceiving")
-        self.log(f"Perceiving environment for user {environment.get('user_id')}")
-        
-        self.user_id = environment.get('user_id')
-        self.topic_id = environment.get('topic_id')
-        self.knowledge_level = environment.get('knowledge_level', 0.0)
-        self.learning_history = environment.get('learning_history', [])
-        self.preferred_style = environment.get('preferred_style')
+        self.log("Perceiving environment for user %s", environment.get('user_id'))
         
-        # Analyze learning patterns
-        self.analyze_learning_patterns()
+        learning_history = environment.get('learning_history', [])
         
-        return self
+        return self.new_context(
+            user_id=environment.get('user_id'),
+            topic_id=environment.get('topic_id'),
+            knowledge_level=environment.get('knowledge_level', 0.0),
+            learning_history=learning_history,
+            preferred_style=environment.get('preferred_style'),
+            stream=environment.get('stream', False),
+            learner=environment.get('learner'),
+            # Analyze learning patterns
+            current_style=self.analyze_learning_patterns(learning_history)
+        )
     
-    def analyze_learning_patterns(self):
-        """Autonomous analysis of learning history"""
-        if len(self.learning_history) > 3:
+    def analyze_learning_patterns(self, learning_history):
+        """Autonomous analysis of learning history; returns the teaching style to use"""
+        style = self.default_style
+        if len(learning_history) > 3:
             # Detect if student struggles with theory
-            theory_struggles = sum(1 for h in self.learning_history 
+            theory_struggles = sum(1 for h in learning_history 
                                   if h.get('type') == 'theory' and not h.get('success'))
             
             if theory_struggles > 2:
                 self.log("Detected struggle with theoretical content")
-                self.current_style = "practical"
+                style = "practical"
             else:
-                self.current_style = "theoretical"
+                style = "theoretical"
         
-        self.log(f"Selected teaching style: {self.current_style}")
+        self.log("Selected teaching style: %s", style)
+        return style
     
-    def decide(self):
+    def decide(self, ctx):
         """
         Autonomous decision making:
         - Which teaching style to use?
@@ -75,38 +84,43 @@ class TeachingAgent(BaseAgent):
         self.update_state("deciding")
         
         # Decision 1: Lesson complexity
-        if self.knowledge_level < 0.3:
-            self.lesson_complexity = "simple"
-            self.example_count = 3
-        elif self.knowledge_level < 0.7:
-            self.lesson_complexity = "moderate"
-            self.example_count = 2
+        if ctx.knowledge_level < 0.3:
+            lesson_complexity = "simple"
+            example_count = 3
+        elif ctx.knowledge_level < 0.7:
+            lesson_complexity = "moderate"
+            example_count = 2
         else:
-            self.lesson_complexity = "advanced"
-            self.example_count = 1
+            lesson_complexity = "advanced"
+            example_count = 1
         
         # Decision 2: Teaching approach
-        if self.current_style == "practical":
-            self.focus = "hands-on examples and real-world applications"
-        elif self.current_style == "theoretical":
-            self.focus = "core concepts and underlying principles"
+        if ctx.current_style == "practical":
+            focus = "hands-on examples and real-world applications"
+        elif ctx.current_style == "theoretical":
+            focus = "core concepts and underlying principles"
         else:
-            self.focus = "balanced theory and practice"
+            focus = "balanced theory and practice"
         
         # Decision 3: Motivational elements
-        if self.knowledge_level > 0.8:
-            self.motivation = "challenge the student with advanced concepts"
-        elif self.knowledge_level < 0.2:
-            self.motivation = "encourage with achievable goals"
+        if ctx.knowledge_level > 0.8:
+            motivation = "challenge the student with advanced concepts"
+        elif ctx.knowledge_level < 0.2:
+            motivation = "encourage with achievable goals"
         else:
-            self.motivation = "maintain momentum with progressive difficulty"
+            motivation = "maintain momentum with progressive difficulty"
         
-        self.log(f"Decisions: complexity={self.lesson_complexity}, "
-                f"examples={self.example_count}, focus={self.focus}")
+        self.log("Decisions: complexity=%s, examples=%s, focus=%s",
+                lesson_complexity, example_count, focus)
         
-        return self
+        return ctx.evolve(
+            lesson_complexity=lesson_complexity,
+            example_count=example_count,
+            focus=focus,
+            motivation=motivation
+        )
     
-    def act(self):
+    def act(self, ctx):
         """
         Execute: Generate the lesson
         """
@@ -115,28 +129,73 @@ class TeachingAgent(BaseAgent):
         
         # Get topic details
         from models import Topic
-        topic = Topic.query.get(self.topic_id)
+        topic = ctx.learner.topic(ctx.topic_id) if ctx.learner else Topic.query.get(ctx.topic_id)
         
         if not topic:
-            self.log("Topic not found", "error")
+            self.log("Topic not found", level="error")
             return {"error": "Topic not found"}
         
-        # Construct adaptive prompt
-        prompt = f"""
-        You are an expert teacher specializing in {self.current_style} teaching.
+        prompt = self._build_prompt(ctx, topic)
+        self.current_style = ctx.current_style
+        
+        if ctx.stream:
+            return self._stream_lesson(ctx, topic, prompt)
+        
+        try:
+            # Generate lesson
+            lesson_content = self.llm_service.generate_lesson_with_prompt(
+                topic.name,
+                topic.difficulty,
+                ctx.knowledge_level,
+                custom_prompt=prompt
+            )
+            
+            total = self.increment('lessons_generated')
+            self.log("Lesson generated successfully (Total: %d)", total)
+            
+            # Store in agent memory
+            self.remember("lesson_generated",
+                          topic=topic.name,
+                          style=ctx.current_style,
+                          complexity=ctx.lesson_complexity,
+                          user_id=ctx.user_id)
+            
+            self.update_state("completed")
+            
+            return {
+                "content": lesson_content,
+                "metadata": {
+                    "teaching_style": ctx.current_style,
+                    "complexity": ctx.lesson_complexity,
+                    "example_count": ctx.example_count,
+                    "topic_name": topic.name,
+                    "agent": self.name,
+                    "generated_at": datetime.utcnow().isoformat()
+                }
+            }
+        
+        except Exception as e:
+            self.log("Error generating lesson: %s", e, level="error")
+            self.update_state("error")
+            return {"error": str(e)}
+    
+    def _build_prompt(self, ctx, topic):
+        """Construct adaptive prompt"""
+        return f"""
+        You are an expert teacher specializing in {ctx.current_style} teaching.
         
         STUDENT PROFILE:
-        - Current knowledge level: {self.knowledge_level*100:.0f}%
-        - Preferred learning: {self.focus}
-        - Motivation strategy: {self.motivation}
+        - Current knowledge level: {ctx.knowledge_level*100:.0f}%
+        - Preferred learning: {ctx.focus}
+        - Motivation strategy: {ctx.motivation}
         
-        TASK: Create a {self.lesson_complexity} lesson on "{topic.name}"
+        TASK: Create a {ctx.lesson_complexity} lesson on "{topic.name}"
         
         REQUIREMENTS:
         1. Start with a compelling hook
-        2. Include {self.example_count} {self.current_style} examples
-        3. Use {self.lesson_complexity} language
-        4. Focus on {self.focus}
+        2. Include {ctx.example_count} {ctx.current_style} examples
+        3. Use {ctx.lesson_complexity} language
+        4. Focus on {ctx.focus}
         5. End with a practice challenge
         
         STRUCTURE:
@@ -144,10 +203,10 @@ class TeachingAgent(BaseAgent):
         Hook the student with why this matters
         
         ## Core Concepts
-        Explain key ideas with {self.current_style} approach
+        Explain key ideas with {ctx.current_style} approach
         
         ## Practical Examples
-        Provide {self.example_count} clear examples with code
+        Provide {ctx.example_count} clear examples with code
         
         ## Real-World Applications
         Show where this is used professionally
@@ -156,51 +215,47 @@ class TeachingAgent(BaseAgent):
         3-5 bullet points
         
         ## Practice Challenge
-        One coding exercise matching {self.lesson_complexity} level
+        One coding exercise matching {ctx.lesson_complexity} level
         
         Keep paragraphs short. Use **bold** for key terms.
         Use code blocks with ```python.
         Total: 400-600 words.
         """
+    
+    def _stream_lesson(self, ctx, topic, prompt):
+        """
+        Streaming variant of act(): the lesson is returned as a chunk generator
+        so the caller can forward text before generation finishes
+        """
+        chunks = self.llm_service.stream_lesson_with_prompt(
+            topic.name,
+            topic.difficulty,
+            ctx.knowledge_level,
+            custom_prompt=prompt
+        )
         
-        try:
-            # Generate lesson
-            lesson_content = self.llm_service.generate_lesson_with_prompt(
-                topic.name,
-                topic.difficulty,
-                self.knowledge_level,
-                custom_prompt=prompt
-            )
-            
-            self.lessons_generated += 1
-            self.log(f"Lesson generated successfully (Total: {self.lessons_generated})")
-            
-            # Store in agent memory
-            self.memory.append({
-                "action": "lesson_generated",
-                "topic": topic.name,
-                "style": self.current_style,
-                "complexity": self.lesson_complexity,
-                "user_id": self.user_id
-            })
-            
-            self.update_state("completed")
-            
-            return {
-                "content": lesson_content,
-                "metadata": {
-                    "teaching_style": self.current_style,
-                    "complexity": self.lesson_complexity,
-                    "example_count": self.example_count,
-                    "agent": self.name,
-                    "generated_at": datetime.utcnow().isoformat()
-                }
+        total = self.increment('lessons_generated')
+        self.log("Lesson stream started (Total: %d)", total)
+        
+        self.remember("lesson_streamed",
+                      topic=topic.name,
+                      style=ctx.current_style,
+                      complexity=ctx.lesson_complexity,
+                      user_id=ctx.user_id)
+        
+        self.update_state("completed")
+        
+        return {
+            "stream": chunks,
+            "metadata": {
+                "teaching_style": ctx.current_style,
+                "complexity": ctx.lesson_complexity,
+                "example_count": ctx.example_count,
+                "topic_name": topic.name,
+                "agent": self.name,
+                "generated_at": datetime.utcnow().isoformat()
             }
-            
-        except Exception as e:
-            self.log(f"Error generating lesson: {str(e)}", "error")
-            self.update_state("error")
-            return {"error": str(e)}
+        }
     
     def get_statistics(self):
         """Return agent statistics"""
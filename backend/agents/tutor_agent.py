@@ -2,7 +2,7 @@
 Tutor Agent - Autonomous assistance and motivation
 """
 from agents.base_agent import BaseAgent
-from llm_service import LLMService
+from services import LazyService
 from datetime import datetime
 
 class TutorAgent(BaseAgent):
@@ -14,13 +14,17 @@ class TutorAgent(BaseAgent):
     - Adaptive guidance
     """
     
+    # Shared services, built on first use (the hint index is None when disabled)
+    llm_service = LazyService('llm_service')
+    hint_index = LazyService('hint_index')
+    
     def __init__(self):
         super().__init__("TUA-001", "TutorAgent")
-        self.llm_service = LLMService()
         self.hints_provided = 0
+        self.hints_reused = 0
         self.questions_answered = 0
-        self.motivation_level = "neutral"
-        
+        self.motivation_level = "neutral"  # motivation of the most recent hint
+    
     def perceive(self, environment):
         """
         Perceive student's help needs
@@ -29,21 +33,22 @@ class TutorAgent(BaseAgent):
             environment: dict with {
                 'user_id': int,
                 'question': str,
-                'context': dict,
+                'context': dict (optional) - challenge and attempt_count; read from
+                           the top level when not nested,
                 'frustration_level': str (optional)
             }
         """
         self.update_state("perceiving")
-        self.log(f"Perceiving help request from user {environment.get('user_id')}")
-        
-        self.user_id = environment.get('user_id')
-        self.question = environment.get('question')
-        self.context = environment.get('context', {})
-        self.frustration_level = environment.get('frustration_level', 'normal')
-        
-        return self
+        self.log("Perceiving help request from user %s", environment.get('user_id'))
+        
+        return self.new_context(
+            user_id=environment.get('user_id'),
+            question=environment.get('question'),
+            context=environment.get('context') or environment,
+            frustration_level=environment.get('frustration_level', 'normal')
+        )
     
-    def decide(self):
+    def decide(self, ctx):
         """
         Autonomous decisions:
         - How much help to provide?
@@ -53,32 +58,36 @@ class TutorAgent(BaseAgent):
         self.update_state("deciding")
         
         # Decision 1: Hint level based on frustration
-        if self.frustration_level == "high":
-            self.hint_level = "detailed"
-            self.motivation_level = "encouraging"
-        elif self.frustration_level == "low":
-            self.hint_level = "subtle"
-            self.motivation_level = "challenging"
+        if ctx.frustration_level == "high":
+            hint_level = "detailed"
+            motivation_level = "encouraging"
+        elif ctx.frustration_level == "low":
+            hint_level = "subtle"
+            motivation_level = "challenging"
         else:
-            self.hint_level = "moderate"
-            self.motivation_level = "supportive"
+            hint_level = "moderate"
+            motivation_level = "supportive"
         
         # Decision 2: Response style
-        attempts = self.context.get('attempt_count', 1)
+        attempts = ctx.context.get('attempt_count') or 1
         
         if attempts == 1:
-            self.response_style = "guiding"
+            response_style = "guiding"
         elif attempts < 3:
-            self.response_style = "explaining"
+            response_style = "explaining"
         else:
-            self.response_style = "showing"  # More explicit help
+            response_style = "showing"  # More explicit help
         
-        self.log(f"Decisions: hint_level={self.hint_level}, "
-                f"style={self.response_style}, motivation={self.motivation_level}")
+        self.log("Decisions: hint_level=%s, style=%s, motivation=%s",
+                hint_level, response_style, motivation_level)
         
-        return self
+        return ctx.evolve(
+            hint_level=hint_level,
+            motivation_level=motivation_level,
+            response_style=response_style
+        )
     
-    def act(self):
+    def act(self, ctx):
         """
         Execute: Provide intelligent hint or answer
         """
@@ -90,54 +99,69 @@ class TutorAgent(BaseAgent):
         You are a supportive programming tutor.
         
         STUDENT CONTEXT:
-        - Question: {self.question}
-        - Challenge: {self.context.get('challenge', 'General learning')}
-        - Previous attempts: {self.context.get('attempt_count', 1)}
-        - Frustration level: {self.frustration_level}
+        - Question: {ctx.question}
+        - Challenge: {ctx.context.get('challenge') or 'General learning'}
+        - Previous attempts: {ctx.context.get('attempt_count') or 1}
+        - Frustration level: {ctx.frustration_level}
         
         YOUR APPROACH:
-        - Hint level: {self.hint_level}
-        - Response style: {self.response_style}
-        - Motivation: {self.motivation_level}
+        - Hint level: {ctx.hint_level}
+        - Response style: {ctx.response_style}
+        - Motivation: {ctx.motivation_level}
         
         INSTRUCTIONS:
         """
         
-        if self.hint_level == "subtle":
+        if ctx.hint_level == "subtle":
             prompt += "Provide a gentle nudge without revealing the solution. Ask guiding questions."
-        elif self.hint_level == "moderate":
+        elif ctx.hint_level == "moderate":
             prompt += "Explain the concept and provide a partial solution or approach."
         else:  # detailed
             prompt += "Provide clear explanation with example code, but encourage student to try."
         
-        prompt += f"\n\nBe {self.motivation_level}. Keep response 2-4 sentences."
+        prompt += f"\n\nBe {ctx.motivation_level}. Keep response 2-4 sentences."
+        
+        challenge = ctx.context.get('challenge')
         
         try:
-            response = self.llm_service.model.generate_content(prompt).text
+            response = None
+            similarity = None
+            if self.hint_index is not None:
+                response, similarity = self.hint_index.lookup(challenge, ctx.question, ctx.hint_level)
+            
+            source = "cache" if response is not None else "llm"
+            if response is None:
+                response = self.llm_service.generate_text(prompt, task='hint')
+                if self.hint_index is not None:
+                    self.hint_index.add(challenge, ctx.question, ctx.hint_level, response)
+            else:
+                self.increment('hints_reused')
             
-            self.hints_provided += 1
-            self.log(f"Hint provided (Total: {self.hints_provided})")
+            total = self.increment('hints_provided')
+            self.motivation_level = ctx.motivation_level
+            self.log("Hint provided from %s (Total: %d)", source, total)
             
             # Store in memory
-            self.memory.append({
-                "action": "hint_provided",
-                "question": self.question,
-                "hint_level": self.hint_level,
-                "user_id": self.user_id
-            })
+            self.remember("hint_provided",
+                          question=ctx.question,
+                          hint_level=ctx.hint_level,
+                          source=source,
+                          user_id=ctx.user_id)
             
             self.update_state("completed")
             
             return {
                 "hint": response,
-                "hint_level": self.hint_level,
-                "motivation": self.motivation_level,
+                "hint_level": ctx.hint_level,
+                "motivation": ctx.motivation_level,
+                "source": source,
+                "similarity": round(similarity, 3) if similarity is not None else None,
                 "agent": self.name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-            
+        
         except Exception as e:
-            self.log(f"Error generating hint: {str(e)}", "error")
+            self.log("Error generating hint: %s", e, level="error")
             self.update_state("error")
             return {
                 "hint": "Think about what you've learned. Break the problem into smaller steps!",
@@ -162,7 +186,7 @@ class TutorAgent(BaseAgent):
         else:
             message = "💪 Don't give up! Every expert was once a beginner. Take it one step at a time."
         
-        self.log(f"Motivation provided for score {score}")
+        self.log("Motivation provided for score %s", score)
         
         return {
             "message": message,
@@ -170,11 +194,18 @@ class TutorAgent(BaseAgent):
             "tone": "encouraging"
         }
     
+    def get_hint_cache_stats(self):
+        """Return hint cache hit rate and lookup latency"""
+        if self.hint_index is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.hint_index.get_stats()}
+    
     def get_statistics(self):
         """Return agent statistics"""
         return {
             "agent": self.name,
             "hints_provided": self.hints_provided,
+            "hints_reused": self.hints_reused,
             "questions_answered": self.questions_answered,
             "current_motivation_level": self.motivation_level,
             "state": self.state,
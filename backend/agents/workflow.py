@@ -0,0 +1,316 @@
+"""
+Workflow - Dependency-graph execution of agent steps
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import Config
+from flask import current_app, has_app_context
+from tracing import span
+import contextvars
+import threading
+import time
+
+
+class WorkflowError(ValueError):
+    """Raised for graphs that cannot run: duplicate steps, unknown dependencies or cycles"""
+    pass
+
+
+class WorkflowCancelled(Exception):
+    """Raised when a run is cancelled before all of its steps have started"""
+    pass
+
+
+# Returned by a step that decided it has nothing to contribute
+SKIPPED = object()
+
+
+class WorkflowStep(namedtuple('WorkflowStep', ['name', 'run', 'depends_on'])):
+    """
+    One node of a workflow graph.
+    
+    run(inputs) is called with {dependency name: dependency result} once every
+    step in depends_on has finished, and returns this step's result (or SKIPPED).
+    """
+    __slots__ = ()
+    
+    def __new__(cls, name, run, depends_on=()):
+        return super().__new__(cls, name, run, tuple(depends_on))
+
+
+class WorkflowExecutor:
+    """
+    Runs a workflow graph with as much parallelism as its edges allow:
+    - Every step whose dependencies are done is started at once on a shared thread pool
+    - Results flow along the edges; each step sees only what it depends on
+    - Worker threads get their own Flask app context (and so their own DB session)
+      plus a copy of the caller's contextvars
+    - Each run returns a timing breakdown: wall time, total work and the critical path
+    
+    A step that itself runs a workflow executes it inline, so nested graphs
+    can't exhaust the pool and deadlock.
+    """
+    
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or Config.WORKFLOW_MAX_WORKERS
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='workflow-step')
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        
+        self.stats = {
+            'runs': 0,
+            'steps': 0,
+            'failed': 0,
+            'wall_seconds': 0.0,
+            'work_seconds': 0.0,
+            'critical_path_seconds': 0.0
+        }
+    
+    # ============ PUBLIC API ============
+    
+    def run(self, steps, on_step=None, cancelled=None):
+        """
+        Execute a graph of WorkflowSteps
+        
+        Args:
+            steps: iterable of WorkflowStep
+            on_step: callable(name, status, result) (optional) - called from the
+                calling thread as each step is 'running', then 'done', 'skipped' or 'failed'
+            cancelled: callable() -> bool (optional) - checked before starting each
+                step; once it returns True no further steps are started
+        
+        Returns:
+            (results, timing) - results maps step name to result (skipped steps
+            are left out); timing is the breakdown described in _timing()
+        
+        Raises:
+            WorkflowError for an invalid graph, WorkflowCancelled, or the first exception
+            raised by a step (steps already running are allowed to finish; the rest are not started)
+        """
+        steps = list(steps)
+        order = self._topological_order(steps)
+        app = current_app._get_current_object() if has_app_context() else None
+        origin = time.perf_counter()
+        on_step = on_step or (lambda name, status, result: None)
+        cancelled = cancelled or (lambda: False)
+        
+        try:
+            if getattr(self._local, 'in_step', False):
+                spans = self._run_inline(order, origin, on_step, cancelled)
+            else:
+                spans = self._run_parallel(order, app, origin, on_step, cancelled)
+        except Exception:
+            self._bump(failed=1)
+            raise
+        
+        wall = time.perf_counter() - origin
+        timing = self._timing(order, spans, wall)
+        
+        results = {name: span[2] for name, span in spans.items() if span[2] is not SKIPPED}
+        self._bump(
+            runs=1,
+            steps=len(order),
+            wall_seconds=wall,
+            work_seconds=timing['total_work_ms'] / 1000,
+            critical_path_seconds=timing['critical_path_ms'] / 1000
+        )
+        return results, timing
+    
+    def get_stats(self):
+        """Run counts and cumulative timings; parallelism = total work / wall time"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        wall = stats['wall_seconds']
+        stats['avg_parallelism'] = round(stats['work_seconds'] / wall, 2) if wall else 0.0
+        stats['max_workers'] = self.max_workers
+        for key in ('wall_seconds', 'work_seconds', 'critical_path_seconds'):
+            stats[key] = round(stats[key], 3)
+        return stats
+    
+    # ============ EXECUTION ============
+    
+    def _run_parallel(self, order, app, origin, on_step, cancelled):
+        spans = {}  # name -> (start, end, result), seconds since origin
+        waiting = {step.name: set(step.depends_on) for step in order}
+        by_name = {step.name: step for step in order}
+        running = {}
+        error = None
+        
+        def start_ready():
+            ready = [name for name, deps in waiting.items() if not deps]
+            if ready and cancelled():
+                return False
+            for name in ready:
+                del waiting[name]
+                step = by_name[name]
+                inputs = self._inputs(step, spans)
+                on_step(name, 'running', None)
+                future = self._pool.submit(
+                    contextvars.copy_context().run, self._execute, step, inputs, app, origin
+                )
+                running[future] = name
+            return True
+        
+        stopped = not start_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    spans[name] = future.result()
+                except Exception as e:
+                    error = error or e
+                    on_step(name, 'failed', None)
+                    continue
+                result = spans[name][2]
+                on_step(name, 'skipped' if result is SKIPPED else 'done', result)
+                for deps in waiting.values():
+                    deps.discard(name)
+            
+            if error is None and not stopped:
+                stopped = not start_ready()
+        
+        if error is not None:
+            raise error
+        if waiting:
+            raise WorkflowCancelled(f"Workflow cancelled before {', '.join(waiting)}")
+        return spans
+    
+    def _run_inline(self, order, origin, on_step, cancelled):
+        spans = {}
+        for i, step in enumerate(order):
+            if cancelled():
+                remaining = ', '.join(s.name for s in order[i:])
+                raise WorkflowCancelled(f"Workflow cancelled before {remaining}")
+            on_step(step.name, 'running', None)
+            start = time.perf_counter() - origin
+            try:
+                result = step.run(self._inputs(step, spans))
+            except Exception:
+                on_step(step.name, 'failed', None)
+                raise
+            spans[step.name] = (start, time.perf_counter() - origin, result)
+            on_step(step.name, 'skipped' if result is SKIPPED else 'done', result)
+        return spans
+    
+    def _execute(self, step, inputs, app, origin):
+        """Run one step on a pool thread"""
+        self._local.in_step = True
+        start = time.perf_counter() - origin
+        try:
+            with span(f"step.{step.name}", step=step.name):
+                if app is None:
+                    result = step.run(inputs)
+                else:
+                    with app.app_context():
+                        result = step.run(inputs)
+        finally:
+            self._local.in_step = False
+        return start, time.perf_counter() - origin, result
+    
+    @staticmethod
+    def _inputs(step, spans):
+        return {
+            dep: spans[dep][2]
+            for dep in step.depends_on
+            if spans[dep][2] is not SKIPPED
+        }
+    
+    # ============ GRAPH ============
+    
+    @staticmethod
+    def _topological_order(steps):
+        """Steps sorted so every step comes after its dependencies (declaration order otherwise)"""
+        by_name = {}
+        for step in steps:
+            if step.name in by_name:
+                raise WorkflowError(f"Duplicate workflow step '{step.name}'")
+            by_name[step.name] = step
+        
+        for step in steps:
+            for dep in step.depends_on:
+                if dep not in by_name:
+                    raise WorkflowError(f"Step '{step.name}' depends on unknown step '{dep}'")
+        
+        order = []
+        visiting, visited = set(), set()
+        
+        def visit(step, path):
+            if step.name in visited:
+                return
+            if step.name in visiting:
+                cycle = ' -> '.join(path[path.index(step.name):] + [step.name])
+                raise WorkflowError(f"Workflow has a cycle: {cycle}")
+            visiting.add(step.name)
+            for dep in step.depends_on:
+                visit(by_name[dep], path + [step.name])
+            visiting.discard(step.name)
+            visited.add(step.name)
+            order.append(step)
+        
+        for step in steps:
+            visit(step, [])
+        return order
+    
+    @staticmethod
+    def _timing(order, spans, wall):
+        """
+        Breakdown of one run (milliseconds):
+        - wall_ms: elapsed time of the whole run
+        - total_work_ms: sum of step durations, i.e. the time a serial run would take
+        - critical_path_ms: longest dependency chain by duration, the best any
+          schedule could do; critical_path lists its steps
+        - parallelism: total work / wall time
+        """
+        finish = {}
+        previous = {}
+        for step in order:
+            start, end, _ = spans[step.name]
+            before = max(step.depends_on, key=lambda dep: finish[dep], default=None)
+            finish[step.name] = (finish[before] if before else 0.0) + (end - start)
+            previous[step.name] = before
+        
+        path = []
+        name = max(finish, key=finish.get, default=None)
+        while name:
+            path.append(name)
+            name = previous[name]
+        path.reverse()
+        
+        total_work = sum(end - start for start, end, _ in spans.values())
+        return {
+            'wall_ms': round(wall * 1000, 1),
+            'total_work_ms': round(total_work * 1000, 1),
+            'critical_path_ms': round(finish[path[-1]] * 1000, 1) if path else 0.0,
+            'critical_path': path,
+            'parallelism': round(total_work / wall, 2) if wall else 0.0,
+            'steps': {
+                step.name: {
+                    'start_ms': round(spans[step.name][0] * 1000, 1),
+                    'duration_ms': round((spans[step.name][1] - spans[step.name][0]) * 1000, 1),
+                    'depends_on': list(step.depends_on),
+                    'skipped': spans[step.name][2] is SKIPPED
+                }
+                for step in order
+            }
+        }
+    
+    def _bump(self, **amounts):
+        with self._stats_lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_workflow_executor():
+    """Process-wide executor shared by every coordinator"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = WorkflowExecutor()
+    return _executor
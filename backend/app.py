@@ -1,13 +1,20 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, g, request, jsonify, session, stream_with_context
 from flask_cors import CORS
-from models import db, User, Topic, KnowledgeState, LearningSession, QuizAttempt
+from models import db, User, Topic, TopicPrerequisite, KnowledgeState, LearningSession, QuizAttempt
 from knowledge_tracker import KnowledgeTracker
-from llm_service import LLMService
 from config import Config
 from agents.coordinator_agent import CoordinatorAgent
+from formatting import format_lesson_content, format_study_tips, IncrementalLessonFormatter
+from quiz_pool import QuizPool
+from job_queue import JobQueue, JobLimitError
+from write_behind import WriteBehindBuffer
+from services import registry, get_llm_service
+import migrations
+import tracing
+import atexit
 import os
 from datetime import datetime
-import re
+import json
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -21,39 +28,108 @@ CORS(app,
 
 db.init_app(app)
 
-# Initialize agents and services
+# Request tracing: sampled by TRACE_SAMPLE_RATE, or forced with an "X-Trace: 1" header
+with app.app_context():
+    tracing.instrument_sqlalchemy(db.engine)
+
+@app.before_request
+def start_request_trace():
+    g.trace = tracing.start_trace(
+        f"{request.method} {request.path}",
+        force=request.headers.get('X-Trace') == '1',
+        endpoint=request.endpoint
+    )
+
+@app.after_request
+def defer_streamed_trace(response):
+    # A streamed body is produced after the request is torn down, so its trace
+    # stays open until the server closes the response
+    if response.is_streamed and 'trace' in g:
+        root = g.pop('trace')
+        response.call_on_close(lambda: tracing.finish_trace(root))
+    return response
+
+@app.teardown_request
+def close_request_trace(error=None):
+    tracing.finish_trace(g.pop('trace', None), error)
+
+# Initialize agents and services (sub-agents and the LLM client are built on first use, see services.py)
 
 knowledge_tracker = KnowledgeTracker()
-llm_service = LLMService()
 coordinator = CoordinatorAgent()
 
+# Pre-generated quizzes per (topic, knowledge band); worker starts on the first take()
+quiz_pool = QuizPool(app, lambda topic, band: coordinator.assessment_agent.generate_pool_quiz(topic, band))
+if Config.QUIZ_POOL_ENABLED:
+    registry.register('quiz_pool', lambda: quiz_pool)
+
+# Long coordinator workflows run as background jobs; workers start on first use
+job_queue = JobQueue(app, coordinator)
+
+# Optional write-behind for append-only inserts; flushed on shutdown, journaled against crashes.
+# Handlers look it up in the registry (None when disabled).
+write_buffer = WriteBehindBuffer(app) if Config.WRITE_BEHIND_ENABLED else None
+if write_buffer is not None:
+    registry.register('write_behind', lambda: write_buffer)
+    atexit.register(write_buffer.stop)
+
+def save_row(model, **fields):
+    """Insert one QuizAttempt/LearningSession; returns its id, or None when it went to the write-behind buffer"""
+    buffer = registry.get('write_behind')
+    if buffer is not None:
+        buffer.add(model, **fields)
+        return None
+    
+    row_id = db.session.execute(db.insert(model).values(**fields)).inserted_primary_key[0]
+    db.session.commit()
+    return row_id
+
 # Initialize database and sample data
 def init_db():
     with app.app_context():
         db.create_all()
         
+        # Indexes and constraints added to tables an older database already has
+        migrations.upgrade()
+        
         # Create sample topics if none exist
         if Topic.query.count() == 0:
             sample_topics = [
                 Topic(name="Python Basics", category="Programming", difficulty="beginner",
                       description="Introduction to Python programming"),
                 Topic(name="Data Structures", category="Programming", difficulty="intermediate",
-                      description="Learn about arrays, lists, stacks, and queues", prerequisites="1"),
+                      description="Learn about arrays, lists, stacks, and queues"),
                 Topic(name="Object-Oriented Programming", category="Programming", difficulty="intermediate",
-                      description="Classes, objects, inheritance, and polymorphism", prerequisites="1"),
+                      description="Classes, objects, inheritance, and polymorphism"),
                 Topic(name="Algorithms", category="Programming", difficulty="advanced",
-                      description="Sorting, searching, and algorithm complexity", prerequisites="2"),
+                      description="Sorting, searching, and algorithm complexity"),
                 Topic(name="Machine Learning Basics", category="AI/ML", difficulty="intermediate",
-                      description="Introduction to ML concepts and algorithms", prerequisites="1,2"),
+                      description="Introduction to ML concepts and algorithms"),
                 Topic(name="Web Development", category="Web", difficulty="beginner",
                       description="HTML, CSS, and JavaScript fundamentals"),
                 Topic(name="Database Design", category="Database", difficulty="intermediate",
-                      description="SQL and database normalization", prerequisites="1"),
+                      description="SQL and database normalization"),
                 Topic(name="Neural Networks", category="AI/ML", difficulty="advanced",
-                      description="Deep learning and neural network architectures", prerequisites="5"),
+                      description="Deep learning and neural network architectures"),
             ]
-            db.session.bulk_save_objects(sample_topics)
+            # (topic, prerequisite) as positions in sample_topics
+            sample_prerequisites = [(1, 0), (2, 0), (3, 1), (4, 0), (4, 1), (6, 0), (7, 4)]
+            db.session.add_all(sample_topics)
+            db.session.flush()
+            db.session.add_all(
+                TopicPrerequisite(topic_id=sample_topics[topic].id, prerequisite_id=sample_topics[prerequisite].id)
+                for topic, prerequisite in sample_prerequisites
+            )
             db.session.commit()
+        
+        # Fitted knowledge-tracing rates and the topic graph, read up front instead of by the first request
+        # (the graph afresh: migrations write prerequisites without going through the ORM)
+        registry.get('topic_parameters').rates()
+        registry.get('topic_graph').invalidate()
+        registry.get('topic_graph').get()
+        
+        # Review schedule for knowledge states practiced before it existed
+        registry.get('review_queue').backfill()
 
 # UPDATED: Root route now returns API info instead of template
 @app.route('/')
@@ -66,10 +142,12 @@ def index():
         'endpoints': {
             'auth': '/api/login, /api/register, /api/logout, /api/current-user',
             'topics': '/api/topics, /api/topics/<id>',
-            'learning': '/api/generate-lesson',
-            'quiz': '/api/generate-quiz, /api/submit-answer',
+            'learning': '/api/generate-lesson, /api/generate-lesson/stream',
+            'quiz': '/api/generate-quiz, /api/generate-quiz/stream, /api/submit-answer, /api/submit-quiz',
             'progress': '/api/progress-summary, /api/knowledge-state/<id>',
-            'utility': '/api/check-code, /api/ask-challenge-hint, /api/agent-status'
+            'jobs': '/api/jobs, /api/jobs/<id>, /api/jobs/<id>/events, /api/jobs/<id>/cancel',
+            'utility': '/api/check-code, /api/ask-challenge-hint, /api/agent-status',
+            'admin': '/api/admin/quiz-pool, /api/admin/traces'
         }
     })
 
@@ -153,140 +231,6 @@ def get_topic(topic_id):
         'description': topic.description
     })
 
-def format_lesson_content(content):
-    """Format lesson content for better display"""
-    import re
-    
-    # Remove multiple consecutive blank lines
-    content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
-    
-    # Remove extra whitespace from each line
-    content = '\n'.join(line.strip() for line in content.split('\n'))
-    
-    # Convert markdown code blocks to HTML
-    content = re.sub(r'```python\n(.*?)\n```', r'<pre><code class="python">\1</code></pre>', content, flags=re.DOTALL)
-    content = re.sub(r'```\n(.*?)\n```', r'<pre><code>\1</code></pre>', content, flags=re.DOTALL)
-    
-    # Convert markdown headers to HTML
-    content = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', content, flags=re.MULTILINE)
-    content = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', content, flags=re.MULTILINE)
-    content = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
-    
-    # Convert markdown bold to HTML
-    content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
-    
-    # Convert inline code to HTML (before lists to preserve code in lists)
-    content = re.sub(r'`([^`]+)`', r'<code>\1</code>', content)
-    
-    # Convert markdown lists to HTML - IMPROVED
-    lines = content.split('\n')
-    in_list = False
-    result_lines = []
-    
-    for i, line in enumerate(lines):
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            if in_list:
-                result_lines.append('</ul>')
-                in_list = False
-            continue
-        
-        # Handle list items
-        if line.startswith('- '):
-            if not in_list:
-                result_lines.append('<ul>')
-                in_list = True
-            result_lines.append(f'<li>{line[2:]}</li>')
-        else:
-            if in_list:
-                result_lines.append('</ul>')
-                in_list = False
-            result_lines.append(line)
-    
-    if in_list:
-        result_lines.append('</ul>')
-    
-    content = '\n'.join(result_lines)
-    
-    # Convert paragraphs - NO NEWLINES
-    lines = content.split('\n')
-    formatted_lines = []
-    in_pre = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip completely empty lines
-        if not line:
-            continue
-        
-        # Handle pre blocks
-        if '<pre>' in line:
-            in_pre = True
-            formatted_lines.append(line)
-            continue
-        elif '</pre>' in line:
-            in_pre = False
-            formatted_lines.append(line)
-            continue
-        elif in_pre:
-            formatted_lines.append(line)
-            continue
-        
-        # Keep HTML tags as-is
-        if line.startswith('<h') or line.startswith('<ul>') or line.startswith('</ul>') or line.startswith('<li>'):
-            formatted_lines.append(line)
-        else:
-            # Wrap non-HTML content in paragraph
-            formatted_lines.append(f'<p>{line}</p>')
-    
-    # Join WITHOUT newlines to eliminate all spacing
-    return ''.join(formatted_lines)
-
-def format_study_tips(content):
-    """Format study tips markdown to HTML"""
-    import re
-    
-    # Convert **bold** to HTML
-    content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
-    
-    # Convert bullet points to HTML list
-    lines = content.split('\n')
-    formatted_lines = []
-    in_list = False
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check if it's a header
-        if line.endswith(':') and not line.startswith('-') and not line.startswith('•'):
-            if in_list:
-                formatted_lines.append('</ul>')
-                in_list = False
-            formatted_lines.append(f'<h3 style="color: var(--primary-color); margin-top: 1.5rem; margin-bottom: 0.75rem;">{line}</h3>')
-        # Check if it's a bullet point
-        elif line.startswith('- ') or line.startswith('• '):
-            if not in_list:
-                formatted_lines.append('<ul style="list-style-type: disc; margin-left: 1.5rem; line-height: 1.8;">')
-                in_list = True
-            # Remove the bullet character
-            text = line[2:] if line.startswith('- ') else line[2:]
-            formatted_lines.append(f'<li style="margin-bottom: 1rem; color: #4b5563;">{text}</li>')
-        else:
-            if in_list:
-                formatted_lines.append('</ul>')
-                in_list = False
-            formatted_lines.append(f'<p style="margin-bottom: 0.75rem; color: #4b5563;">{line}</p>')
-    
-    if in_list:
-        formatted_lines.append('</ul>')
-    
-    return ''.join(formatted_lines)
-
 @app.route('/api/generate-lesson', methods=['POST'])
 def generate_lesson():
     if 'user_id' not in session:
@@ -312,28 +256,100 @@ def generate_lesson():
     teaching_result = result['results'].get('TeachingAgent', {})
     
     # Format content
-    content = format_lesson_content(teaching_result.get('content', ''))
+    with tracing.span('format_lesson'):
+        content = format_lesson_content(teaching_result.get('content', ''))
     
     # Save to database
-    topic = Topic.query.get(topic_id)
-    
-    learning_session = LearningSession(
-        user_id=session['user_id'],
-        topic_id=topic_id,
-        content=content,
-        difficulty=teaching_result.get('metadata', {}).get('complexity', 'beginner')
-    )
-    db.session.add(learning_session)
-    db.session.commit()
+    with tracing.span('db_commit'):
+        save_row(
+            LearningSession,
+            user_id=session['user_id'],
+            topic_id=topic_id,
+            content=content,
+            difficulty=teaching_result.get('metadata', {}).get('complexity', 'beginner')
+        )
     
     return jsonify({
         'content': content,
         'difficulty': teaching_result.get('metadata', {}).get('complexity'),
         'knowledge_level': teaching_result.get('metadata', {}).get('knowledge_level', 0),
-        'topic_name': topic.name,
+        'topic_name': teaching_result.get('metadata', {}).get('topic_name'),
         'agent_metadata': teaching_result.get('metadata', {})
     })
 
+def sse_event(event, data):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/generate-lesson/stream', methods=['GET', 'POST'])
+def generate_lesson_stream():
+    """
+    Streaming variant of /api/generate-lesson.
+    Emits 'meta', then one 'fragment' event per formatted HTML block as the
+    model produces it, then 'done' once the lesson is saved.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    data = request.get_json(silent=True) or request.args
+    topic_id = int(data['topic_id'])
+    user_id = session['user_id']
+    
+    result = coordinator.perceive({
+        'task': 'generate_lesson',
+        'user_id': user_id,
+        'context': {
+            'topic_id': topic_id,
+            'learning_history': [],
+            'stream': True
+        }
+    }).decide().act()
+    
+    if not result['success']:
+        return jsonify({'error': result.get('error')}), 500
+    
+    teaching_result = result['results'].get('TeachingAgent', {})
+    if 'stream' not in teaching_result:
+        return jsonify({'error': teaching_result.get('error', 'Lesson generation failed')}), 500
+    
+    metadata = teaching_result.get('metadata', {})
+    
+    def generate():
+        yield sse_event('meta', {
+            'topic_name': metadata.get('topic_name'),
+            'difficulty': metadata.get('complexity'),
+            'knowledge_level': metadata.get('knowledge_level', 0),
+            'agent_metadata': metadata
+        })
+        
+        formatter = IncrementalLessonFormatter()
+        fragments = []
+        
+        for chunk in teaching_result['stream']:
+            for html in formatter.feed(chunk):
+                fragments.append(html)
+                yield sse_event('fragment', {'html': html})
+        
+        for html in formatter.flush():
+            fragments.append(html)
+            yield sse_event('fragment', {'html': html})
+        
+        session_id = save_row(
+            LearningSession,
+            user_id=user_id,
+            topic_id=topic_id,
+            content=''.join(fragments),
+            difficulty=metadata.get('complexity', 'beginner')
+        )
+        
+        yield sse_event('done', {'session_id': session_id})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/generate-quiz', methods=['POST'])
 def generate_quiz():
     if 'user_id' not in session:
@@ -357,16 +373,68 @@ def generate_quiz():
     
     assessment_result = result['results'].get('AssessmentAgent', {})
     
-    topic = Topic.query.get(topic_id)
-    
     return jsonify({
         'questions': assessment_result.get('questions', []),
         'difficulty': 'adaptive',
-        'topic_name': topic.name,
+        'topic_name': assessment_result.get('metadata', {}).get('topic_name'),
         'topic_id': topic_id,
         'agent_metadata': assessment_result.get('metadata', {})
     })
 
+@app.route('/api/generate-quiz/stream', methods=['GET', 'POST'])
+def generate_quiz_stream():
+    """
+    Streaming variant of /api/generate-quiz.
+    Emits 'meta', then one 'question' event per question as soon as the model
+    has finished writing it, then 'done' with the final count.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    data = request.get_json(silent=True) or request.args
+    topic_id = int(data['topic_id'])
+    
+    result = coordinator.perceive({
+        'task': 'generate_quiz',
+        'user_id': session['user_id'],
+        'context': {
+            'topic_id': topic_id,
+            'recent_performance': [],
+            'stream': True
+        }
+    }).decide().act()
+    
+    if not result['success']:
+        return jsonify({'error': result.get('error')}), 500
+    
+    assessment_result = result['results'].get('AssessmentAgent', {})
+    if 'stream' not in assessment_result:
+        return jsonify({'error': assessment_result.get('error', 'Quiz generation failed')}), 500
+    
+    metadata = assessment_result.get('metadata', {})
+    
+    def generate():
+        yield sse_event('meta', {
+            'topic_name': metadata.get('topic_name'),
+            'topic_id': topic_id,
+            'difficulty': 'adaptive',
+            'expected_questions': metadata.get('num_questions'),
+            'agent_metadata': metadata
+        })
+        
+        count = 0
+        for question in assessment_result['stream']:
+            yield sse_event('question', {'index': count, 'question': question})
+            count += 1
+        
+        yield sse_event('done', {'total': count})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/submit-answer', methods=['POST'])
 def submit_answer():
     if 'user_id' not in session:
@@ -382,7 +450,8 @@ def submit_answer():
     is_correct = user_answer == correct_answer
     
     # Save quiz attempt
-    attempt = QuizAttempt(
+    save_row(
+        QuizAttempt,
         user_id=session['user_id'],
         topic_id=topic_id,
         question=question,
@@ -391,8 +460,6 @@ def submit_answer():
         is_correct=is_correct,
         difficulty=difficulty
     )
-    db.session.add(attempt)
-    db.session.commit()
     
     # Update knowledge state
     state = knowledge_tracker.update_knowledge(
@@ -404,7 +471,7 @@ def submit_answer():
     
     # Generate explanation
     topic = Topic.query.get(topic_id)
-    explanation = llm_service.explain_answer(
+    explanation = get_llm_service().explain_answer(
         question,
         user_answer,
         correct_answer,
@@ -418,6 +485,89 @@ def submit_answer():
         'confidence': state.confidence
     })
 
+@app.route('/api/submit-quiz', methods=['POST'])
+def submit_quiz():
+    """
+    Quiz-level submission: all answers at once, all explanations from one LLM call
+    
+    Answers are graded in memory, the attempts are inserted in one statement and
+    the knowledge state takes every answer in one pass; all of it is one commit.
+    
+    Body: {'topic_id': int, 'answers': [{'question', 'user_answer', 'correct_answer', 'difficulty'}]}
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    data = request.json or {}
+    topic_id = data.get('topic_id')
+    answers = data.get('answers') or []
+    
+    if not answers:
+        return jsonify({'error': 'No answers submitted'}), 400
+    if any('question' not in a or 'user_answer' not in a or 'correct_answer' not in a for a in answers):
+        return jsonify({'error': 'Each answer needs question, user_answer and correct_answer'}), 400
+    
+    topic = db.session.get(Topic, topic_id)
+    if not topic:
+        return jsonify({'error': 'Topic not found'}), 404
+    
+    # Grade in memory
+    user_id = session['user_id']
+    now = datetime.utcnow()
+    attempts = [
+        {
+            'user_id': user_id,
+            'topic_id': topic_id,
+            'question': answer['question'],
+            'user_answer': answer['user_answer'],
+            'correct_answer': answer['correct_answer'],
+            'is_correct': answer['user_answer'] == answer['correct_answer'],
+            'difficulty': answer.get('difficulty'),
+            'created_at': now
+        }
+        for answer in answers
+    ]
+    
+    # One transaction: bulk insert, sequential knowledge updates, one commit
+    buffer = registry.get('write_behind')
+    try:
+        if buffer is None:
+            db.session.execute(db.insert(QuizAttempt), attempts)
+        state = knowledge_tracker.apply_attempts(
+            user_id,
+            topic_id,
+            [(a['is_correct'], a['difficulty']) for a in attempts],
+            now
+        )
+        # Read before the commit expires them
+        topic_name, new_level, confidence = topic.name, state.knowledge_level, state.confidence
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    # Write-behind: the attempts are buffered once the knowledge update is in
+    if buffer is not None:
+        buffer.add_many(QuizAttempt, attempts)
+    
+    # One LLM call for every explanation, outside the transaction
+    explanations = get_llm_service().explain_answers_batch(answers, topic_name)
+    
+    results = [
+        {'question': a['question'], 'is_correct': a['is_correct'], 'explanation': explanation}
+        for a, explanation in zip(attempts, explanations)
+    ]
+    correct_count = sum(1 for r in results if r['is_correct'])
+    
+    return jsonify({
+        'results': results,
+        'score': correct_count / len(results),
+        'correct_count': correct_count,
+        'total': len(results),
+        'new_knowledge_level': new_level,
+        'confidence': confidence
+    })
+
 @app.route('/api/knowledge-state/<int:topic_id>', methods=['GET'])
 def get_knowledge_state(topic_id):
     if 'user_id' not in session:
@@ -432,7 +582,7 @@ def get_knowledge_state(topic_id):
     return jsonify({
         'topic_id': topic_id,
         'topic_name': topic.name,
-        'knowledge_level': state.knowledge_level,
+        'knowledge_level': knowledge_tracker.current_level(state),
         'confidence': state.confidence,
         'practice_count': state.practice_count,
         'last_practiced': state.last_practiced.isoformat()
@@ -443,15 +593,9 @@ def get_progress_summary():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
     
+    # Topic names are part of the stored summary
     summary = knowledge_tracker.get_progress_summary(session['user_id'])
     
-    # Enhance with topic names
-    for topic_list in ['weak_topics', 'strong_topics']:
-        for item in summary[topic_list]:
-            topic = Topic.query.get(item['id'])
-            if topic:
-                item['name'] = topic.name
-    
     return jsonify(summary)
 
 @app.route('/api/next-topic', methods=['GET'])
@@ -488,6 +632,91 @@ def get_next_topic():
     
     return jsonify({'message': 'No recommendations available'}), 404
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a long workflow (full_learning_session) and return its job id at once.
+    Follow it with GET /api/jobs/<id> or the /events stream.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        job = job_queue.submit(
+            session['user_id'],
+            data.get('task', 'full_learning_session'),
+            data.get('context', {})
+        )
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(job), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'jobs': job_queue.for_user(session['user_id'], limit)})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, per-step progress and the results of the steps finished so far"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    job = job_queue.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-sent events for one job: a 'progress' event with the whole job
+    every time it changes, then 'done' once it has finished.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    user_id = session['user_id']
+    if job_queue.get(job_id, user_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        version = 0
+        last = None
+        while True:
+            job = job_queue.get(job_id, user_id)
+            if job['status'] in JobQueue.FINISHED:
+                yield sse_event('done', job)
+                return
+            if job != last:
+                yield sse_event('progress', job)
+                last = job
+            version = job_queue.wait_for_change(job_id, version, Config.JOB_POLL_INTERVAL)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    job = job_queue.cancel(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/api/study-tips', methods=['GET'])
 def get_study_tips():
     if 'user_id' not in session:
@@ -495,20 +724,10 @@ def get_study_tips():
     
     summary = knowledge_tracker.get_progress_summary(session['user_id'])
     
-    weak_topic_names = []
-    strong_topic_names = []
-    
-    for item in summary['weak_topics']:
-        topic = Topic.query.get(item['id'])
-        if topic:
-            weak_topic_names.append(topic.name)
+    weak_topic_names = [item['name'] for item in summary['weak_topics']]
+    strong_topic_names = [item['name'] for item in summary['strong_topics']]
     
-    for item in summary['strong_topics']:
-        topic = Topic.query.get(item['id'])
-        if topic:
-            strong_topic_names.append(topic.name)
-    
-    tips = llm_service.generate_study_tips(weak_topic_names, strong_topic_names)
+    tips = get_llm_service().generate_study_tips(weak_topic_names, strong_topic_names)
     
     # Format the tips
     formatted_tips = format_study_tips(tips)
@@ -571,7 +790,7 @@ def check_code():
             'output': output if output else 'Code executed successfully (no output)',
             'error': False
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -617,8 +836,68 @@ def get_agent_status():
         return jsonify({'error': 'Not logged in'}), 401
     
     status = coordinator.get_agent_status()
+    llm_service = get_llm_service()
+    status['llm_cache'] = llm_service.get_cache_stats()
+    status['llm_runner'] = llm_service.get_runner_stats()
+    status['llm_resilience'] = llm_service.get_resilience_stats()
+    status['hint_cache'] = coordinator.tutor_agent.get_hint_cache_stats()
+    status['latency'] = tracing.get_latency_histograms()
+    status['jobs'] = job_queue.get_status()
+    buffer = registry.get('write_behind')
+    if buffer is not None:
+        status['write_behind'] = buffer.get_status()
+    return jsonify(status)
+
+@app.route('/api/admin/quiz-pool', methods=['GET'])
+def get_quiz_pool_status():
+    """Show pre-generated quiz pool depth per topic and knowledge band"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    status = quiz_pool.get_status()
+    status['enabled'] = Config.QUIZ_POOL_ENABLED
     return jsonify(status)
 
+@app.route('/api/admin/traces', methods=['GET'])
+def get_traces():
+    """Most recent sampled request traces, newest first"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({
+        'sample_rate': Config.TRACE_SAMPLE_RATE,
+        'exporter': Config.TRACE_EXPORTER,
+        'traces': tracing.recent_traces(limit)
+    })
+
+@app.route('/api/admin/reviews-due', methods=['GET'])
+def get_reviews_due():
+    """Users with spaced-repetition reviews due by the end of a day (default today), for batch reminders"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    day = request.args.get('date')
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date() if day else datetime.utcnow().date()
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    
+    user_ids = registry.get('review_queue').users_due(day)
+    return jsonify({'date': day.isoformat(), 'count': len(user_ids), 'user_ids': user_ids})
+
 if __name__ == '__main__':
     init_db()
+    
+    # Only start background workers in the serving process, not the reloader parent;
+    # elsewhere (flask run, WSGI servers) they start on first use
+    if Config.QUIZ_POOL_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        quiz_pool.start()
+    
+    # Picks up jobs interrupted by the last shutdown
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
+        if write_buffer is not None:
+            write_buffer.start()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Async LLM Runner - Shared event loop with bounded concurrency for model calls
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from config import Config
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call exceeds its per-call timeout"""
+    pass
+
+
+class AsyncLLMRunner:
+    """
+    Runs every LLM coroutine on one background event loop so that:
+    - A global semaphore caps the number of calls in flight per process
+    - Each call gets its own timeout (queue wait included)
+    - Sync callers (Flask threads) and async callers (any event loop) share the same limit
+    - Cancelling the caller's future cancels the underlying call
+    - Concurrent calls submitted with the same key share one upstream call (single-flight)
+    """
+
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+
+        self._loop = asyncio.new_event_loop()
+        # Blocking SDK calls fall back to to_thread, so the executor must match the limit
+        self._loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm-call')
+        )
+        self._semaphore = None
+        self._inflight = {}  # single-flight key -> shared task (touched only on the loop thread)
+        self._ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0,
+            'shared_calls': 0,
+            'coalesced': 0
+        }
+
+        self._thread = threading.Thread(target=self._run_loop, name='llm-event-loop', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        self._loop.run_forever()
+
+    # ============ PUBLIC API ============
+
+    def submit(self, factory, timeout=None, key=None):
+        """
+        Schedule a call on the runner loop
+
+        Args:
+            factory: callable - Zero-argument callable returning the coroutine to run
+            timeout: float - Seconds before the call is abandoned (default: Config.LLM_TIMEOUT_SECONDS)
+            key: str - Single-flight key; calls with the same key in flight share one result (optional)
+
+        Returns:
+            concurrent.futures.Future - cancel() on it cancels the call (or stops waiting on a shared one)
+        """
+        self._bump('submitted')
+        return asyncio.run_coroutine_threadsafe(self._limited(factory, timeout, key), self._loop)
+
+    def run(self, factory, timeout=None, key=None):
+        """Blocking call for sync code paths"""
+        future = self.submit(factory, timeout, key)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def arun(self, factory, timeout=None, key=None):
+        """Awaitable call usable from any event loop"""
+        return await asyncio.wrap_future(self.submit(factory, timeout, key))
+
+    def orchestrate(self, factory):
+        """
+        Blocking call for sync code that fans out several LLM calls, e.g.
+        asyncio.gather over async LLMService methods. The coroutine runs on the
+        runner loop in the caller's context (so trace spans nest) and holds no
+        slot itself: each call it makes waits for its own.
+        """
+        context = contextvars.copy_context()
+
+        async def in_callers_context():
+            return await self._loop.create_task(factory(), context=context)
+
+        future = asyncio.run_coroutine_threadsafe(in_callers_context(), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """
+        Hold one concurrency slot from a sync thread, e.g. while consuming a
+        streaming response that cannot run as a single coroutine
+        """
+        timeout = timeout if timeout is not None else Config.LLM_TIMEOUT_SECONDS
+        self._bump('submitted')
+        claim = {'acquired': False, 'abandoned': False}
+        future = asyncio.run_coroutine_threadsafe(self._acquire_slot(claim), self._loop)
+
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # future.cancel() can still succeed after the acquisition finished,
+            # so whether a slot was taken is settled under the claim lock
+            with self._claim_lock:
+                claim['abandoned'] = True
+                acquired = claim['acquired']
+            if acquired:
+                # Acquired just as we gave up - hand the slot back
+                self._loop.call_soon_threadsafe(self._semaphore.release)
+            else:
+                future.cancel()
+            self._bump('timeouts')
+            raise LLMTimeoutError(f"No LLM slot free within {timeout}s")
+
+        with self._stats_lock:
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+
+        try:
+            yield
+        except GeneratorExit:
+            self._bump('cancelled')
+            raise
+        except Exception:
+            self._bump('failed')
+            raise
+        else:
+            self._bump('completed')
+        finally:
+            with self._stats_lock:
+                self.stats['in_flight'] -= 1
+            self._loop.call_soon_threadsafe(self._semaphore.release)
+
+    def get_stats(self):
+        """Return concurrency counters"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['max_concurrency'] = self.max_concurrency
+        joined = stats['shared_calls'] + stats['coalesced']
+        stats['coalesce_rate'] = round(stats['coalesced'] / joined, 3) if joined else 0.0
+        return stats
+
+    # ============ INTERNALS ============
+
+    async def _limited(self, factory, timeout, key=None):
+        timeout = timeout if timeout is not None else Config.LLM_TIMEOUT_SECONDS
+        if key is None:
+            call = self._acquire_and_call(factory)
+        else:
+            # Waiters time out or get cancelled individually; the shared call keeps running
+            call = asyncio.shield(self._shared_task(key, factory))
+
+        try:
+            result = await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            self._bump('timeouts')
+            raise LLMTimeoutError(f"LLM call exceeded {timeout}s")
+        except asyncio.CancelledError:
+            self._bump('cancelled')
+            raise
+        except Exception:
+            self._bump('failed')
+            raise
+
+        self._bump('completed')
+        return result
+
+    def _shared_task(self, key, factory):
+        """Join the in-flight call for key, or start it (runs on the loop thread)"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._bump('coalesced')
+            return task
+
+        task = self._loop.create_task(self._acquire_and_call(factory))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish_shared(key, done))
+        self._bump('shared_calls')
+        return task
+
+    def _finish_shared(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter gave up
+
+    async def _acquire_slot(self, claim):
+        """Acquire a slot for a sync caller, unless it gave up meanwhile (runs on the loop thread)"""
+        await self._semaphore.acquire()
+        with self._claim_lock:
+            claim['acquired'] = not claim['abandoned']
+        if not claim['acquired']:
+            self._semaphore.release()
+
+    async def _acquire_and_call(self, factory):
+        async with self._semaphore:
+            with self._stats_lock:
+                self.stats['in_flight'] += 1
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+            try:
+                return await factory()
+            finally:
+                with self._stats_lock:
+                    self.stats['in_flight'] -= 1
+
+    def _bump(self, counter):
+        with self._stats_lock:
+            self.stats[counter] += 1
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Process-wide runner shared by every LLMService instance"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AsyncLLMRunner()
+    return _runner
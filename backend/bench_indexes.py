@@ -0,0 +1,137 @@
+"""
+Index benchmark for the lookups the agents and KnowledgeTracker make
+
+Fills a throwaway SQLite database with the old schema (no indexes on
+knowledge_state, quiz_attempt or learning_session) and a large quiz
+history, times the per-user lookups, upgrades it in place with
+migrations.upgrade() and times them again.
+
+Usage: python bench_indexes.py [attempts]   (default 1000000)
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ATTEMPTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+ATTEMPTS_PER_USER = 100
+LESSONS_PER_USER = 20
+SAMPLES = 200  # random users per lookup
+CHUNK = 50_000
+
+TEMP_DIR = tempfile.mkdtemp(prefix='elearning-indexes-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEMP_DIR, 'bench.db')
+os.environ.setdefault('LLM_PROVIDER', 'synthetic')
+os.environ['QUIZ_POOL_ENABLED'] = 'false'
+
+from app import app, db
+from models import KnowledgeState, LearningSession, QuizAttempt, Topic, User
+import migrations
+
+NEW_INDEXES = ['uq_knowledge_state_user_topic', 'ix_quiz_attempt_user_created',
+               'ix_quiz_attempt_topic_user_created', 'ix_learning_session_user_created']
+
+LOOKUPS = {
+    'knowledge state (user, topic)': lambda user_id, topic_id: db.select(KnowledgeState.id).where(
+        KnowledgeState.user_id == user_id, KnowledgeState.topic_id == topic_id),
+    "user's knowledge states": lambda user_id, topic_id: db.select(KnowledgeState.id).where(
+        KnowledgeState.user_id == user_id),
+    'latest 20 attempts': lambda user_id, topic_id: db.select(QuizAttempt.topic_id, QuizAttempt.is_correct).where(
+        QuizAttempt.user_id == user_id).order_by(QuizAttempt.created_at.desc()).limit(20),
+    "attempts on one topic": lambda user_id, topic_id: db.select(QuizAttempt.is_correct).where(
+        QuizAttempt.topic_id == topic_id, QuizAttempt.user_id == user_id).order_by(QuizAttempt.created_at),
+    'latest 5 lessons': lambda user_id, topic_id: db.select(LearningSession.id).where(
+        LearningSession.user_id == user_id).order_by(LearningSession.created_at.desc()).limit(5)
+}
+
+
+def fill(users):
+    """The old schema, then `users` users with their knowledge states, attempts and lessons"""
+    db.create_all()
+    with db.engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+
+    topic_ids = list(range(1, 9))
+    db.session.add_all(Topic(id=topic_id, name=f'Topic {topic_id}', category='Bench', difficulty='beginner')
+                       for topic_id in topic_ids)
+    db.session.execute(db.insert(User), [{'id': i, 'username': f'u{i}', 'email': f'u{i}@example.com'}
+                                         for i in range(1, users + 1)])
+
+    rng = random.Random(3)
+    start = datetime(2026, 1, 1)
+    db.session.execute(db.insert(KnowledgeState), [
+        {'user_id': user_id, 'topic_id': topic_id, 'knowledge_level': rng.random(), 'practice_count': 10,
+         'last_practiced': start}
+        for user_id in range(1, users + 1) for topic_id in topic_ids
+    ])
+
+    # Attempts interleaved across users, as they arrive in production
+    rows = []
+    for i in range(users * ATTEMPTS_PER_USER):
+        rows.append({'user_id': rng.randint(1, users), 'topic_id': rng.choice(topic_ids), 'question': 'q',
+                     'is_correct': rng.random() < 0.7, 'difficulty': 'intermediate',
+                     'created_at': start + timedelta(seconds=i)})
+        if len(rows) == CHUNK:
+            db.session.execute(db.insert(QuizAttempt), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(QuizAttempt), rows)
+
+    db.session.execute(db.insert(LearningSession), [
+        {'user_id': rng.randint(1, users), 'topic_id': rng.choice(topic_ids), 'content': 'lesson',
+         'created_at': start + timedelta(minutes=i)}
+        for i in range(users * LESSONS_PER_USER)
+    ])
+    db.session.commit()
+
+
+def time_lookups(users):
+    """Median milliseconds per lookup over SAMPLES random (user, topic) pairs"""
+    rng = random.Random(11)
+    samples = [(rng.randint(1, users), rng.randint(1, 8)) for _ in range(SAMPLES)]
+    medians = {}
+    with db.engine.connect() as conn:
+        for name, lookup in LOOKUPS.items():
+            times = []
+            for user_id, topic_id in samples:
+                started = time.perf_counter()
+                conn.execute(lookup(user_id, topic_id)).all()
+                times.append((time.perf_counter() - started) * 1000)
+            medians[name] = statistics.median(times)
+    return medians
+
+
+def main():
+    users = max(1, ATTEMPTS // ATTEMPTS_PER_USER)
+
+    print("\n" + "="*60)
+    print(f"INDEX BENCHMARK ({users * ATTEMPTS_PER_USER} attempts, {users} users, "
+          f"{users * 8} knowledge states, {users * LESSONS_PER_USER} lessons)")
+    print("="*60)
+
+    with app.app_context():
+        started = time.perf_counter()
+        fill(users)
+        print(f"\n  filled in {time.perf_counter() - started:.0f}s")
+
+        before = time_lookups(users)
+        started = time.perf_counter()
+        migrations.upgrade()
+        print(f"  migrated in {time.perf_counter() - started:.1f}s")
+        after = time_lookups(users)
+
+    print(f"\n  {'lookup (median of ' + str(SAMPLES) + ')':<32} {'no index':>10} {'indexed':>10} {'speedup':>9}")
+    for name in LOOKUPS:
+        print(f"  {name:<32} {before[name]:>8.2f}ms {after[name]:>8.3f}ms {before[name] / after[name]:>8.0f}x")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
@@ -0,0 +1,102 @@
+"""
+Startup benchmark for the Flask app and the agent tests
+
+Times cold starts, each in a fresh interpreter, and reports peak memory,
+how many LLMService instances exist afterwards and which heavy optional
+modules got imported. Work left lazy at boot is paid by the first request,
+so the first hint is measured as well.
+
+Uses a throwaway database and, unless LLM_PROVIDER is set, the synthetic
+backend (set LLM_PROVIDER=gemini to include the Gemini SDK import).
+
+Usage: python bench_startup.py [runs]
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+HEAVY_MODULES = ('google.generativeai', 'sklearn', 'scipy')
+
+SCENARIOS = {
+    'import app': "import app",
+    'boot + GET /': "import app\napp.app.test_client().get('/')",
+    'test_agents boot': (
+        "import test_agents\n"
+        "from agents.coordinator_agent import CoordinatorAgent\n"
+        "CoordinatorAgent()"
+    ),
+    'boot + first hint': (
+        "import app\n"
+        "with app.app.app_context():\n"
+        "    app.coordinator.perceive({'task': 'provide_hint', 'user_id': 1,\n"
+        "        'context': {'question': 'How do loops work?', 'challenge': 'Print 1 to 10'}}).decide().act()"
+    )
+}
+
+# Runs in the child interpreter: times the scenario and reports on the process
+PROBE = """
+import gc, json, resource, sys, time
+started = time.perf_counter()
+exec(compile(%r, '<scenario>', 'exec'))
+elapsed = time.perf_counter() - started
+from llm_service import LLMService
+print('BENCH ' + json.dumps({
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'llm_services': sum(isinstance(obj, LLMService) for obj in gc.get_objects()),
+    'heavy': [name for name in %r if name in sys.modules]
+}))
+"""
+
+
+def run_scenario(code):
+    """One cold start with empty database and caches; returns the probe's report"""
+    temp_dir = tempfile.mkdtemp(prefix='elearning-startup-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(temp_dir, 'bench.db')
+    env['LLM_CACHE_PATH'] = os.path.join(temp_dir, 'llm_cache.db')
+    env['HINT_CACHE_PATH'] = os.path.join(temp_dir, 'hint_index.db')
+    env['QUIZ_POOL_ENABLED'] = 'false'
+
+    try:
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE % (code, HEAVY_MODULES)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    line = next(line for line in output.splitlines() if line.startswith('BENCH '))
+    return json.loads(line[len('BENCH '):])
+
+
+def main():
+    os.environ.setdefault('LLM_PROVIDER', 'synthetic')
+    os.environ.setdefault('SYNTHETIC_LATENCY', 'fixed:0')
+
+    print("\n" + "="*60)
+    print(f"STARTUP BENCHMARK ({RUNS} cold starts each, provider {os.environ['LLM_PROVIDER']})")
+    print("="*60)
+    print(f"\n  {'scenario':<20} {'median':>9} {'min':>9} {'rss':>8}  llm services / heavy imports")
+
+    for name, code in SCENARIOS.items():
+        reports = [run_scenario(code) for _ in range(RUNS)]
+        times = [report['seconds'] * 1000 for report in reports]
+        last = reports[-1]
+        print(f"  {name:<20} {statistics.median(times):>7.0f}ms {min(times):>7.0f}ms "
+              f"{statistics.median(r['max_rss_mb'] for r in reports):>6.0f}MB  "
+              f"{last['llm_services']} / {', '.join(last['heavy']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,15 +7,94 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'akatsuki-bench-Area51'
 
     basedir = os.path.abspath(os.path.dirname(__file__))
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.dirname(basedir), 'data', 'database.db')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(os.path.dirname(basedir), 'data', 'database.db')
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+    # LLM Provider: gemini | replay | synthetic
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')
+    LLM_MODEL = os.environ.get('LLM_MODEL', 'gemini-2.0-flash')
+    LLM_CASSETTE_PATH = os.environ.get('LLM_CASSETTE_PATH') or os.path.join(os.path.dirname(basedir), 'data', 'cassettes', 'default.jsonl')
+    LLM_REPLAY_MODE = os.environ.get('LLM_REPLAY_MODE', 'auto')  # replay | record | auto
+    LLM_REPLAY_INNER = os.environ.get('LLM_REPLAY_INNER', 'gemini')  # provider used when recording
+    SYNTHETIC_LATENCY = os.environ.get('SYNTHETIC_LATENCY', 'lognormal:1.5,0.4')  # seconds, see SyntheticProvider
+    SYNTHETIC_SEED = int(os.environ.get('SYNTHETIC_SEED', 42))
     
     # Knowledge Tracing Parameters
     INITIAL_KNOWLEDGE = 0.0  
     LEARNING_RATE = 0.15  # Increased slightly for faster progression
     FORGETTING_RATE = 0.05
+    TOPIC_PARAMETERS_TTL = float(os.environ.get('TOPIC_PARAMETERS_TTL', 300))  # seconds before fitted rates are re-read
+    FIT_CHUNK_SIZE = int(os.environ.get('FIT_CHUNK_SIZE', 10000))  # quiz attempts per pass in fit_parameters.py
+    FIT_MIN_ATTEMPTS = int(os.environ.get('FIT_MIN_ATTEMPTS', 200))  # topics with fewer keep the defaults
+    TOPIC_GRAPH_TTL = float(os.environ.get('TOPIC_GRAPH_TTL', 300))  # seconds before topics and prerequisites are re-read
+    REVIEW_CACHE_USERS = int(os.environ.get('REVIEW_CACHE_USERS', 1000))  # per-user review heaps kept in memory
+    REVIEW_CACHE_TTL = float(os.environ.get('REVIEW_CACHE_TTL', 60))  # seconds before a heap is re-read (other processes' practice)
     
     # Difficulty Levels
-    DIFFICULTY_LEVELS = ['beginner', 'intermediate', 'advanced']
\ No newline at end of file
+    DIFFICULTY_LEVELS = ['beginner', 'intermediate', 'advanced']
+
+    # LLM Response Cache
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or os.path.join(os.path.dirname(basedir), 'data', 'llm_cache.db')
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 512))  # in-memory LRU size
+    LLM_CACHE_DISK_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_DISK_MAX_ENTRIES', 20000))
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))  # seconds
+
+    # Async LLM Runner
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 256))  # calls in flight per process
+    LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', 30))  # upper bound for adaptive timeouts
+
+    # LLM Resilience
+    LLM_ADAPTIVE_TIMEOUT = os.environ.get('LLM_ADAPTIVE_TIMEOUT', 'true').lower() == 'true'
+    LLM_TIMEOUT_MULTIPLIER = float(os.environ.get('LLM_TIMEOUT_MULTIPLIER', 2.0))  # x observed p99
+    LLM_TIMEOUT_FLOOR = float(os.environ.get('LLM_TIMEOUT_FLOOR', 5))  # seconds
+    LLM_LATENCY_WINDOW = int(os.environ.get('LLM_LATENCY_WINDOW', 200))  # samples kept per task
+    LLM_LATENCY_MIN_SAMPLES = int(os.environ.get('LLM_LATENCY_MIN_SAMPLES', 20))  # before adapting/hedging
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+    LLM_HEDGE_MAX_IN_FLIGHT = int(os.environ.get('LLM_HEDGE_MAX_IN_FLIGHT', 8))
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))  # consecutive failures to open
+    LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))  # seconds before a probe call
+
+    # Quiz Warm Pool
+    QUIZ_POOL_ENABLED = os.environ.get('QUIZ_POOL_ENABLED', 'true').lower() == 'true'
+    QUIZ_POOL_SIZE = int(os.environ.get('QUIZ_POOL_SIZE', 3))  # ready quizzes per (topic, band)
+    QUIZ_POOL_REFILL_INTERVAL = float(os.environ.get('QUIZ_POOL_REFILL_INTERVAL', 30))  # seconds
+
+    # Tutor Hint Cache
+    HINT_CACHE_ENABLED = os.environ.get('HINT_CACHE_ENABLED', 'true').lower() == 'true'
+    HINT_CACHE_PATH = os.environ.get('HINT_CACHE_PATH') or os.path.join(os.path.dirname(basedir), 'data', 'hint_index.db')
+    HINT_CACHE_THRESHOLD = float(os.environ.get('HINT_CACHE_THRESHOLD', 0.85))  # cosine similarity
+    HINT_CACHE_MAX_ENTRIES = int(os.environ.get('HINT_CACHE_MAX_ENTRIES', 20000))
+
+    # Agent Workflows
+    WORKFLOW_MAX_WORKERS = int(os.environ.get('WORKFLOW_MAX_WORKERS', 16))  # agent steps running at once per process
+
+    # Agent Memory & Logging
+    AGENT_MEMORY_SIZE = int(os.environ.get('AGENT_MEMORY_SIZE', 500))  # records kept per agent (ring buffer)
+    AGENT_LOG_LEVEL = os.environ.get('AGENT_LOG_LEVEL', 'INFO').upper()
+
+    # Learner Snapshot
+    LEARNER_RECENT_ATTEMPTS = int(os.environ.get('LEARNER_RECENT_ATTEMPTS', 20))  # quiz attempts in a learner snapshot
+
+    # Tracing
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))  # fraction of requests traced (0-1)
+    TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'memory')  # memory | jsonl (file as well as memory)
+    TRACE_PATH = os.environ.get('TRACE_PATH') or os.path.join(os.path.dirname(basedir), 'data', 'traces.jsonl')
+    TRACE_MEMORY_SIZE = int(os.environ.get('TRACE_MEMORY_SIZE', 200))  # traces kept for /api/admin/traces
+
+    # Background Jobs
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # jobs running at once per process
+    JOB_MAX_PER_USER = int(os.environ.get('JOB_MAX_PER_USER', 2))  # queued + running jobs per user
+    JOB_MAX_QUEUED = int(os.environ.get('JOB_MAX_QUEUED', 100))  # queued jobs in total
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # runs before an interrupted job fails
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # seconds between idle worker/event checks
+
+    # Write-Behind Inserts (QuizAttempt, LearningSession)
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 100))  # buffered rows that trigger a flush
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))  # seconds between flushes
+    WRITE_BEHIND_JOURNAL_PATH = os.environ.get('WRITE_BEHIND_JOURNAL_PATH') or os.path.join(os.path.dirname(basedir), 'data', 'write_behind.jsonl')
+    WRITE_BEHIND_FSYNC = os.environ.get('WRITE_BEHIND_FSYNC', 'true').lower() == 'true'  # fsync the journal per add
@@ -0,0 +1,80 @@
+"""
+Test setup shared by every test module
+
+pytest loads this before collecting any test, and each test script imports
+it first when run on its own, so the environment below is in place before
+app (and with it Config) is first imported: one throwaway database for the
+whole run, the synthetic LLM backend (no API key) and nothing under data/.
+"""
+import atexit
+import functools
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import pytest
+except ImportError:  # the scripts also run on their own, without pytest
+    pytest = None
+
+TEMP_DIR = tempfile.mkdtemp(prefix='elearning-tests-')
+atexit.register(shutil.rmtree, TEMP_DIR, ignore_errors=True)
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEMP_DIR, 'test.db')
+os.environ['LLM_PROVIDER'] = 'synthetic'
+os.environ['SYNTHETIC_LATENCY'] = 'fixed:0.001'
+os.environ['LLM_CACHE_ENABLED'] = 'false'
+os.environ['LLM_CACHE_PATH'] = os.path.join(TEMP_DIR, 'llm_cache.db')
+os.environ['HINT_CACHE_ENABLED'] = 'false'  # cached hints are shared across users by design
+os.environ['QUIZ_POOL_ENABLED'] = 'false'
+os.environ['WRITE_BEHIND_ENABLED'] = 'false'  # test_write_behind runs its own buffer
+os.environ['WRITE_BEHIND_JOURNAL_PATH'] = os.path.join(TEMP_DIR, 'write_behind.jsonl')
+
+from app import init_db
+from llm_providers import SyntheticProvider
+from llm_service import LLMService
+from services import registry
+
+init_db()
+
+
+if pytest is not None:
+    @pytest.hookimpl(wrapper=True)
+    def pytest_pyfunc_call(pyfuncitem):
+        """Fail a test that returns False: the scripts report failure that way, for their exit code"""
+        test = pyfuncitem.obj
+        returned = []
+
+        @functools.wraps(test)
+        def recording(*args, **kwargs):
+            returned.append(test(*args, **kwargs))
+
+        # pytest still makes the call; it only sees None, which it expects from a test
+        pyfuncitem.obj = recording
+        try:
+            outcome = yield
+        finally:
+            pyfuncitem.obj = test
+
+        if returned and returned[0] is False:
+            raise AssertionError(f"{pyfuncitem.name} returned False (see the [!!] checks in its output)")
+        return outcome
+
+
+def check(results, name, ok, detail=''):
+    """Record and print one check of a test"""
+    results.append(ok)
+    print(f"  {'[OK]' if ok else '[!!]'} {name}{': ' + detail if detail else ''}")
+
+
+@contextmanager
+def synthetic_latency(spec):
+    """Serve LLM calls from a synthetic provider with the given latency spec (see SyntheticProvider) meanwhile"""
+    previous = registry.get('llm_service')
+    service = LLMService(SyntheticProvider(latency=spec))
+    registry.register('llm_service', lambda: service)
+    try:
+        yield service
+    finally:
+        registry.register('llm_service', lambda: previous)
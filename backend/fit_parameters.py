@@ -0,0 +1,213 @@
+"""
+Fit Parameters - Offline fit of per-topic knowledge-tracing rates from quiz history
+
+Streams the QuizAttempt table in chunks, ordered by topic, user and time,
+and replays every student's answers through the KnowledgeTracker update for
+a whole grid of (learning rate, forgetting rate) pairs at once. Before each
+answer the replayed knowledge level is the prediction of that answer; a
+pair's score is the Brier score (mean squared error of level vs. correct) of
+those predictions. The best pair per topic goes to the TopicParameters
+table, which KnowledgeTracker reads.
+
+Usage: python fit_parameters.py [--chunk-size N] [--min-attempts N] [--dry-run]
+"""
+from config import Config
+from datetime import datetime
+from knowledge_tracker import KnowledgeTracker
+from models import db, QuizAttempt, TopicParameters
+import numpy as np
+import sys
+
+# Candidate rates; both include the Config defaults, which are the baseline
+LEARNING_RATES = np.unique(np.round(np.r_[np.arange(0.02, 0.52, 0.02), Config.LEARNING_RATE], 4))
+FORGETTING_RATES = np.unique(np.r_[0.0, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3,
+                                   Config.FORGETTING_RATE])
+
+NO_TIME = np.datetime64('NaT', 'us')
+
+
+class ParameterFitter:
+    """
+    Accumulates per-topic prediction error for every candidate rate pair.
+
+    feed() takes one chunk of attempts as column arrays. Answers are replayed
+    position by position: step k updates the k-th answer of every (user,
+    topic) sequence in the chunk at once, for all candidates, so the Python
+    loop runs once per position rather than once per attempt. A sequence cut
+    by a chunk boundary continues in the next chunk from its carried state.
+
+    Memory is bounded by chunk size x number of candidates, whatever the
+    size of the table.
+    """
+
+    def __init__(self, learning_rates=LEARNING_RATES, forgetting_rates=FORGETTING_RATES):
+        grid_lr, grid_fr = np.meshgrid(learning_rates, forgetting_rates, indexing='ij')
+        self.learning_rates = grid_lr.ravel()
+        self.forgetting_rates = grid_fr.ravel()
+        self.baseline = int(np.flatnonzero(
+            np.isclose(self.learning_rates, Config.LEARNING_RATE) & np.isclose(self.forgetting_rates, Config.FORGETTING_RATE)
+        )[0])
+
+        self.squared_error = {}  # topic_id -> summed squared error per candidate
+        self.attempts = {}  # topic_id -> attempts seen
+        self._carry = None  # ((topic_id, user_id), levels per candidate, last time) of the last open sequence
+
+    def feed(self, topic_ids, user_ids, correct, weights, times):
+        """
+        Replay one chunk of attempts
+
+        Args:
+            topic_ids, user_ids: int arrays
+            correct: bool array
+            weights: float array - KnowledgeTracker difficulty weight per attempt
+            times: datetime64 array
+            (all aligned, sorted by topic, user, time; chunks in table order)
+        """
+        n = len(topic_ids)
+        if n == 0:
+            return
+
+        starts_sequence = np.ones(n, dtype=bool)
+        starts_sequence[1:] = (topic_ids[1:] != topic_ids[:-1]) | (user_ids[1:] != user_ids[:-1])
+        sequence = np.cumsum(starts_sequence) - 1
+        position = np.arange(n) - np.flatnonzero(starts_sequence)[sequence]
+
+        levels = np.full((sequence[-1] + 1, len(self.learning_rates)), Config.INITIAL_KNOWLEDGE)
+        last = np.full(sequence[-1] + 1, NO_TIME)
+        if self._carry is not None and self._carry[0] == (topic_ids[0], user_ids[0]):
+            levels[0], last[0] = self._carry[1], self._carry[2]
+
+        topics, topic_index = np.unique(topic_ids, return_inverse=True)
+        squared_error = np.zeros((len(topics), len(self.learning_rates)))
+
+        # Attempts grouped by their position in the sequence
+        order = np.argsort(position, kind='stable')
+        bounds = np.searchsorted(position[order], np.arange(position.max() + 2))
+
+        for k in range(position.max() + 1):
+            rows = order[bounds[k]:bounds[k + 1]]
+            seq = sequence[rows]
+
+            # Decay since the previous answer, as effective_levels does
+            previous = np.where(np.isnat(last[seq]), times[rows], last[seq])
+            days = np.maximum((times[rows] - previous) // np.timedelta64(1, 'D'), 0)
+            level = levels[seq] * np.exp(-days[:, None] * self.forgetting_rates)
+
+            # Rows keep table order, so each topic's rows are contiguous
+            outcome = correct[rows][:, None]
+            row_topics = topic_index[rows]
+            first = np.flatnonzero(np.r_[True, row_topics[1:] != row_topics[:-1]])
+            squared_error[row_topics[first]] += np.add.reduceat((level - outcome) ** 2, first)
+
+            # KnowledgeTracker.apply_attempts, for every candidate
+            step = self.learning_rates * weights[rows][:, None]
+            levels[seq] = np.where(
+                outcome,
+                np.minimum(1.0, level + step * (1 - level)),
+                np.maximum(0.0, level - step * level * 0.3)
+            )
+            last[seq] = times[rows]
+
+        self._carry = ((topic_ids[-1], user_ids[-1]), levels[-1].copy(), last[-1])
+
+        counts = np.bincount(topic_index)
+        for i, topic_id in enumerate(topics.tolist()):
+            self.squared_error[topic_id] = self.squared_error.get(topic_id, 0) + squared_error[i]
+            self.attempts[topic_id] = self.attempts.get(topic_id, 0) + int(counts[i])
+
+    def results(self, min_attempts=None):
+        """
+        Best rates per topic with at least min_attempts attempts
+
+        Returns:
+            list of dicts {topic_id, learning_rate, forgetting_rate, attempts,
+            brier_score, baseline_brier_score}
+        """
+        min_attempts = Config.FIT_MIN_ATTEMPTS if min_attempts is None else min_attempts
+        results = []
+        for topic_id, squared_error in sorted(self.squared_error.items()):
+            attempts = self.attempts[topic_id]
+            if attempts < min_attempts:
+                continue
+
+            best = int(np.argmin(squared_error))
+            results.append({
+                'topic_id': topic_id,
+                'learning_rate': float(self.learning_rates[best]),
+                'forgetting_rate': float(self.forgetting_rates[best]),
+                'attempts': attempts,
+                'brier_score': float(squared_error[best] / attempts),
+                'baseline_brier_score': float(squared_error[self.baseline] / attempts)
+            })
+        return results
+
+
+def stream_attempts(chunk_size=None):
+    """
+    Yield the QuizAttempt table as column arrays, chunk_size rows at a time,
+    ordered by topic, user and time (server-side cursor, never fully loaded)
+    """
+    weights = KnowledgeTracker.DIFFICULTY_WEIGHTS
+    query = db.select(
+        QuizAttempt.topic_id, QuizAttempt.user_id, QuizAttempt.is_correct,
+        QuizAttempt.difficulty, QuizAttempt.created_at
+    ).order_by(
+        QuizAttempt.topic_id, QuizAttempt.user_id, QuizAttempt.created_at, QuizAttempt.id
+    ).execution_options(yield_per=chunk_size or Config.FIT_CHUNK_SIZE)
+
+    for rows in db.session.execute(query).partitions():
+        topic_ids, user_ids, correct, difficulty, created_at = zip(*rows)
+        yield (
+            np.array(topic_ids),
+            np.array(user_ids),
+            np.array([bool(value) for value in correct]),
+            np.array([weights.get(value, 1.0) for value in difficulty]),
+            np.array(created_at, dtype='datetime64[us]')
+        )
+
+
+def fit(chunk_size=None, min_attempts=None):
+    """Fit every topic with enough attempts; returns (results, attempts read)"""
+    fitter = ParameterFitter()
+    for chunk in stream_attempts(chunk_size):
+        fitter.feed(*chunk)
+    return fitter.results(min_attempts), sum(fitter.attempts.values())
+
+
+def save(results):
+    """Replace the TopicParameters table with a new fit (one transaction)"""
+    now = datetime.utcnow()
+    db.session.execute(db.delete(TopicParameters))
+    if results:
+        db.session.execute(db.insert(TopicParameters), [{**result, 'fitted_at': now} for result in results])
+    db.session.commit()
+
+
+def main(args):
+    from app import app
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    chunk_size = option('--chunk-size', Config.FIT_CHUNK_SIZE)
+    min_attempts = option('--min-attempts', Config.FIT_MIN_ATTEMPTS)
+
+    with app.app_context():
+        results, total = fit(chunk_size, min_attempts)
+
+        print(f"\nFitted {len(results)} topic(s) from {total} quiz attempts "
+              f"(chunks of {chunk_size}, at least {min_attempts} attempts per topic)")
+        print(f"\n  {'topic':>5} {'attempts':>9} {'lr':>6} {'fr':>7} {'brier':>7} {'default':>8}")
+        for result in results:
+            print(f"  {result['topic_id']:>5} {result['attempts']:>9} {result['learning_rate']:>6.2f} "
+                  f"{result['forgetting_rate']:>7.4f} {result['brier_score']:>7.4f} {result['baseline_brier_score']:>8.4f}")
+
+        if '--dry-run' in args:
+            print("\nDry run: TopicParameters not changed")
+        else:
+            save(results)
+            print(f"\nSaved to TopicParameters (servers pick it up within {Config.TOPIC_PARAMETERS_TTL:.0f}s)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,210 @@
+"""
+Formatting - Markdown-to-HTML conversion for lessons and study tips
+"""
+import re
+
+def format_lesson_content(content):
+    """Format lesson content for better display"""
+    
+    # Remove multiple consecutive blank lines
+    content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
+    
+    # Remove extra whitespace from each line
+    content = '\n'.join(line.strip() for line in content.split('\n'))
+    
+    # Convert markdown code blocks to HTML
+    content = re.sub(r'```python\n(.*?)\n```', r'<pre><code class="python">\1</code></pre>', content, flags=re.DOTALL)
+    content = re.sub(r'```\n(.*?)\n```', r'<pre><code>\1</code></pre>', content, flags=re.DOTALL)
+    
+    # Convert markdown headers to HTML
+    content = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', content, flags=re.MULTILINE)
+    content = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', content, flags=re.MULTILINE)
+    content = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
+    
+    # Convert markdown bold to HTML
+    content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
+    
+    # Convert inline code to HTML (before lists to preserve code in lists)
+    content = re.sub(r'`([^`]+)`', r'<code>\1</code>', content)
+    
+    # Convert markdown lists to HTML - IMPROVED
+    lines = content.split('\n')
+    in_list = False
+    result_lines = []
+    
+    for i, line in enumerate(lines):
+        line = line.strip()
+        
+        # Skip empty lines
+        if not line:
+            if in_list:
+                result_lines.append('</ul>')
+                in_list = False
+            continue
+        
+        # Handle list items
+        if line.startswith('- '):
+            if not in_list:
+                result_lines.append('<ul>')
+                in_list = True
+            result_lines.append(f'<li>{line[2:]}</li>')
+        else:
+            if in_list:
+                result_lines.append('</ul>')
+                in_list = False
+            result_lines.append(line)
+    
+    if in_list:
+        result_lines.append('</ul>')
+    
+    content = '\n'.join(result_lines)
+    
+    # Convert paragraphs - NO NEWLINES
+    lines = content.split('\n')
+    formatted_lines = []
+    in_pre = False
+    
+    for line in lines:
+        line = line.strip()
+        
+        # Skip completely empty lines
+        if not line:
+            continue
+        
+        # Handle pre blocks
+        if '<pre>' in line:
+            in_pre = True
+            formatted_lines.append(line)
+            continue
+        elif '</pre>' in line:
+            in_pre = False
+            formatted_lines.append(line)
+            continue
+        elif in_pre:
+            formatted_lines.append(line)
+            continue
+        
+        # Keep HTML tags as-is
+        if line.startswith('<h') or line.startswith('<ul>') or line.startswith('</ul>') or line.startswith('<li>'):
+            formatted_lines.append(line)
+        else:
+            # Wrap non-HTML content in paragraph
+            formatted_lines.append(f'<p>{line}</p>')
+    
+    # Join WITHOUT newlines to eliminate all spacing
+    return ''.join(formatted_lines)
+
+def format_study_tips(content):
+    """Format study tips markdown to HTML"""
+    
+    # Convert **bold** to HTML
+    content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
+    
+    # Convert bullet points to HTML list
+    lines = content.split('\n')
+    formatted_lines = []
+    in_list = False
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        # Check if it's a header
+        if line.endswith(':') and not line.startswith('-') and not line.startswith('•'):
+            if in_list:
+                formatted_lines.append('</ul>')
+                in_list = False
+            formatted_lines.append(f'<h3 style="color: var(--primary-color); margin-top: 1.5rem; margin-bottom: 0.75rem;">{line}</h3>')
+        # Check if it's a bullet point
+        elif line.startswith('- ') or line.startswith('• '):
+            if not in_list:
+                formatted_lines.append('<ul style="list-style-type: disc; margin-left: 1.5rem; line-height: 1.8;">')
+                in_list = True
+            # Remove the bullet character
+            text = line[2:] if line.startswith('- ') else line[2:]
+            formatted_lines.append(f'<li style="margin-bottom: 1rem; color: #4b5563;">{text}</li>')
+        else:
+            if in_list:
+                formatted_lines.append('</ul>')
+                in_list = False
+            formatted_lines.append(f'<p style="margin-bottom: 0.75rem; color: #4b5563;">{line}</p>')
+    
+    if in_list:
+        formatted_lines.append('</ul>')
+    
+    return ''.join(formatted_lines)
+
+
+class IncrementalLessonFormatter:
+    """
+    Formats a lesson while it is still being generated.
+
+    Text is buffered until a block is complete (a blank line or a new heading
+    outside a code fence), then the block is run through format_lesson_content.
+    Code fences and lists are never split, so the concatenated fragments match
+    formatting the full lesson at once.
+    """
+
+    def __init__(self):
+        self._partial_line = ''
+        self._block = []
+        self._in_fence = False
+
+    def feed(self, chunk):
+        """
+        Add generated text
+
+        Returns:
+            list - HTML fragments for blocks completed by this chunk
+        """
+        fragments = []
+        text = self._partial_line + chunk
+        *complete_lines, self._partial_line = text.split('\n')
+
+        for line in complete_lines:
+            fragments.extend(self._consume_line(line))
+
+        return fragments
+
+    def flush(self):
+        """Format whatever is left once generation has finished"""
+        fragments = []
+        if self._partial_line:
+            fragments.extend(self._consume_line(self._partial_line))
+            self._partial_line = ''
+        fragments.extend(self._emit_block())
+        self._in_fence = False
+        return fragments
+
+    def _consume_line(self, line):
+        stripped = line.strip()
+
+        if stripped.startswith('```'):
+            self._in_fence = not self._in_fence
+            self._block.append(line)
+            return []
+
+        if self._in_fence:
+            self._block.append(line)
+            return []
+
+        if not stripped:
+            return self._emit_block()
+
+        if stripped.startswith('#'):
+            # A heading closes the previous section
+            fragments = self._emit_block()
+            self._block.append(line)
+            return fragments
+
+        self._block.append(line)
+        return []
+
+    def _emit_block(self):
+        if not self._block:
+            return []
+
+        html = format_lesson_content('\n'.join(self._block))
+        self._block = []
+        return [html] if html else []
@@ -0,0 +1,245 @@
+"""
+Hint Index - Similarity cache of past tutor hints
+"""
+from collections import deque
+from config import Config
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+
+
+class HintIndex:
+    """
+    TF-IDF nearest-neighbour index over past (challenge, question, hint_level) -> hint pairs.
+
+    Hints are only reused within the same challenge and hint level; within that
+    bucket the question text is compared by cosine similarity. Terms are hashed
+    (HashingVectorizer is stateless), so adding a hint only updates the document
+    frequencies and appends one row - nothing is refitted, and IDF is applied
+    at lookup time. Entries live in a SQLite file and are re-vectorized on
+    startup; past max_entries the oldest are dropped, from memory as from disk.
+    """
+
+    def __init__(self, path=None, threshold=None, max_entries=None):
+        self.path = path or Config.HINT_CACHE_PATH
+        self.threshold = threshold if threshold is not None else Config.HINT_CACHE_THRESHOLD
+        self.max_entries = max_entries or Config.HINT_CACHE_MAX_ENTRIES
+
+        self._vectorizer = HashingVectorizer(
+            n_features=2 ** 18,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm=None
+        )
+        self._doc_freq = np.zeros(self._vectorizer.n_features, dtype=np.float64)
+        self._buckets = {}      # (challenge, hint_level) -> {'rows': [tf rows], 'hints': [...], 'matrix': cached}
+        self._count = 0
+        self._order = deque()   # bucket key of every entry, oldest first
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)  # recent lookup times in ms
+
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'added': 0
+        }
+
+        self._init_disk()
+        self._load()
+
+    # ============ PUBLIC API ============
+
+    def lookup(self, challenge, question, hint_level):
+        """
+        Return (hint, similarity) for the closest stored question, or (None, best_similarity)
+        when nothing in the bucket passes the threshold
+        """
+        started = time.perf_counter()
+        hint, similarity = None, 0.0
+
+        query = self._tf(question) if question else None
+        if query is not None and query.nnz:
+            with self._lock:
+                bucket = self._buckets.get(self._bucket_key(challenge, hint_level))
+                if bucket is not None:
+                    # IDF is only needed where the bucket's rows and the query have terms
+                    tf, hints = self._matrix(bucket)
+                    row_idf = self._idf(self._doc_freq[tf.indices])
+                    query_idf = self._idf(self._doc_freq[query.indices])
+
+            if bucket is not None:
+                scores = self._weighted(tf, row_idf) @ self._weighted(query, query_idf).T
+                scores = scores.toarray().ravel()
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+                if similarity >= self.threshold:
+                    hint = hints[best]
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['hits' if hint is not None else 'misses'] += 1
+            self._latencies.append((time.perf_counter() - started) * 1000)
+
+        return hint, similarity
+
+    def add(self, challenge, question, hint_level, hint):
+        """Index a freshly generated hint and persist it"""
+        if not question or not hint:
+            return
+
+        with self._lock:
+            self._insert(challenge, question, hint_level, hint)
+            self.stats['added'] += 1
+
+        try:
+            conn = sqlite3.connect(self.path, timeout=5)
+            with conn:
+                conn.execute(
+                    "INSERT INTO hint_index (challenge, question, hint_level, hint, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (challenge or '', question, hint_level, hint, time.time())
+                )
+                conn.execute("""
+                    DELETE FROM hint_index WHERE id IN (
+                        SELECT id FROM hint_index ORDER BY id DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error writing hint index: {e}")
+
+    def get_stats(self):
+        """Return hit rate, lookup latency and index size"""
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = np.array(self._latencies) if self._latencies else None
+            stats['entries'] = self._count
+            stats['buckets'] = len(self._buckets)
+
+        stats['threshold'] = self.threshold
+        stats['hit_rate'] = round(stats['hits'] / stats['lookups'], 3) if stats['lookups'] else 0.0
+        stats['lookup_ms_avg'] = round(float(latencies.mean()), 3) if latencies is not None else 0.0
+        stats['lookup_ms_p95'] = round(float(np.percentile(latencies, 95)), 3) if latencies is not None else 0.0
+        return stats
+
+    # ============ INDEX ============
+
+    @staticmethod
+    def _bucket_key(challenge, hint_level):
+        return (' '.join((challenge or '').lower().split()), hint_level)
+
+    def _tf(self, text):
+        """Sublinear term frequencies of one question"""
+        tf = self._vectorizer.transform([text])
+        tf.data = 1 + np.log(tf.data)
+        return tf
+
+    def _idf(self, doc_freq):
+        """Smoothed IDF of the given document frequencies (caller holds lock)"""
+        return np.log((1 + self._count) / (1 + doc_freq)) + 1
+
+    @staticmethod
+    def _weighted(tf, idf):
+        """L2-normalized TF-IDF rows, idf being aligned with tf.data"""
+        weighted = tf.copy()
+        weighted.data *= idf
+        return normalize(weighted)
+
+    def _insert(self, challenge, question, hint_level, hint):
+        """Add one document (caller holds lock)"""
+        tf = self._tf(question)
+        key = self._bucket_key(challenge, hint_level)
+        bucket = self._buckets.setdefault(
+            key,
+            {'rows': [], 'hints': [], 'matrix': None}
+        )
+        bucket['rows'].append(tf)
+        bucket['hints'].append(hint)
+        bucket['matrix'] = None
+
+        self._doc_freq[tf.indices] += 1
+        self._count += 1
+        self._order.append(key)
+
+        while self._count > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        """Drop the oldest document, which is the first row of its bucket (caller holds lock)"""
+        key = self._order.popleft()
+        bucket = self._buckets[key]
+        tf = bucket['rows'].pop(0)
+        bucket['hints'].pop(0)
+        bucket['matrix'] = None
+        if not bucket['rows']:
+            del self._buckets[key]
+
+        self._doc_freq[tf.indices] -= 1
+        self._count -= 1
+
+    def _matrix(self, bucket):
+        """
+        (TF rows, hints) of a bucket (caller holds lock). The rows carry no IDF,
+        so they are only restacked when this bucket changes, not whenever a hint
+        lands elsewhere; lookups weight them by the current IDF themselves.
+        """
+        if bucket['matrix'] is None:
+            bucket['matrix'] = (sparse.vstack(bucket['rows']).tocsr(), tuple(bucket['hints']))
+        return bucket['matrix']
+
+    # ============ PERSISTENCE ============
+
+    def _init_disk(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS hint_index (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        challenge TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        hint_level TEXT NOT NULL,
+                        hint TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error initializing hint index: {e}")
+
+    def _load(self):
+        try:
+            conn = sqlite3.connect(self.path, timeout=5)
+            rows = conn.execute(
+                "SELECT challenge, question, hint_level, hint FROM hint_index ORDER BY id DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error loading hint index: {e}")
+            return
+
+        with self._lock:
+            for challenge, question, hint_level, hint in reversed(rows):
+                self._insert(challenge, question, hint_level, hint)
+
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_hint_index():
+    """Process-wide hint index"""
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = HintIndex()
+    return _shared_index
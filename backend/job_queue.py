@@ -0,0 +1,362 @@
+"""
+Job Queue - Background execution of long coordinator workflows
+"""
+from config import Config
+from datetime import datetime
+from models import db, Job
+import json
+import threading
+import uuid
+
+
+class JobLimitError(Exception):
+    """Raised when a submit would exceed the per-user or queue-wide limit"""
+    pass
+
+
+class JobQueue:
+    """
+    Runs slow coordinator tasks (full_learning_session) outside the request.
+
+    submit() stores a queued Job row and returns at once; a fixed pool of
+    worker threads claims queued jobs from the database and runs them through
+    the coordinator. Every workflow step reports its progress, and the results
+    of finished steps are saved as they arrive, so clients can poll the job or
+    subscribe to its updates and show partial results early.
+
+    Jobs live in the database, so a restart loses nothing: jobs that were
+    running when the process stopped are queued again on start() (up to
+    Config.JOB_MAX_ATTEMPTS runs in total). This assumes one serving process
+    per database, as with the SQLite deployment.
+    """
+
+    TASKS = ('full_learning_session',)
+    ACTIVE = ('queued', 'running')
+    FINISHED = ('succeeded', 'failed', 'cancelled')
+
+    def __init__(self, app, coordinator, workers=None, max_per_user=None, max_queued=None):
+        """
+        Args:
+            app: Flask app - Needed for DB access from the worker threads
+            coordinator: CoordinatorAgent - Runs the jobs' workflows
+            workers: int - Jobs running at once
+            max_per_user: int - Queued plus running jobs allowed per user
+            max_queued: int - Queued jobs allowed in total
+        """
+        self.app = app
+        self.coordinator = coordinator
+        self.workers = workers or Config.JOB_WORKERS
+        self.max_per_user = max_per_user or Config.JOB_MAX_PER_USER
+        self.max_queued = max_queued or Config.JOB_MAX_QUEUED
+
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._work = threading.Condition()  # workers wait here for new jobs
+        self._updates = threading.Condition()  # subscribers wait here for job changes
+        self._versions = {}  # job_id -> change counter, for jobs that are still active
+        self._cancel_requested = set()  # running jobs to stop at the next step
+        self._stats_lock = threading.Lock()
+
+        self.stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'requeued': 0
+        }
+
+    # ============ PUBLIC API ============
+
+    def submit(self, user_id, task, context=None):
+        """
+        Queue a coordinator task for a user
+
+        Returns:
+            dict - The queued job (see to_dict)
+
+        Raises:
+            ValueError for a task that can't run as a job, JobLimitError when
+            the user or the queue is full
+        """
+        if task not in self.TASKS:
+            raise ValueError(f"Task '{task}' can't run as a job")
+
+        active = Job.query.filter(Job.user_id == user_id, Job.status.in_(self.ACTIVE)).count()
+        if active >= self.max_per_user:
+            self._bump(rejected=1)
+            raise JobLimitError(f"At most {self.max_per_user} jobs can be queued or running per user")
+
+        if Job.query.filter_by(status='queued').count() >= self.max_queued:
+            self._bump(rejected=1)
+            raise JobLimitError("Job queue is full, try again later")
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            task=task,
+            params=json.dumps(context or {}),
+            status='queued'
+        )
+        db.session.add(job)
+        db.session.commit()
+        self._bump(submitted=1)
+
+        self.start()
+        with self._work:
+            self._work.notify()
+        return self.to_dict(job)
+
+    def get(self, job_id, user_id=None):
+        """Current state of a job as a dict, or None (also when it belongs to another user)"""
+        # populate_existing: pollers re-read the same row through one session
+        job = db.session.get(Job, job_id, populate_existing=True)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return self.to_dict(job)
+
+    def for_user(self, user_id, limit=20):
+        """A user's most recent jobs, newest first"""
+        jobs = Job.query.filter_by(user_id=user_id).order_by(Job.created_at.desc()).limit(limit)
+        return [self.to_dict(job, include_result=False) for job in jobs]
+
+    def cancel(self, job_id, user_id):
+        """
+        Cancel a job: a queued job is cancelled at once, a running one stops
+        before its next workflow step (steps already running finish first)
+
+        Returns:
+            dict - The job after the request, or None if the user has no such job
+        """
+        now = datetime.utcnow()
+        cancelled = Job.query.filter_by(id=job_id, user_id=user_id, status='queued').update(
+            {'status': 'cancelled', 'finished_at': now, 'updated_at': now},
+            synchronize_session=False
+        )
+        if cancelled:
+            db.session.commit()
+            self._bump(cancelled=1)
+            self._changed(job_id, finished=True)
+            return self.get(job_id)
+
+        requested = Job.query.filter_by(id=job_id, user_id=user_id, status='running').update(
+            {'cancel_requested': True, 'updated_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if requested:
+            self._cancel_requested.add(job_id)
+            self._changed(job_id)
+        return self.get(job_id, user_id)
+
+    def wait_for_change(self, job_id, seen, timeout):
+        """
+        Block until the job changes in this process (or timeout seconds pass)
+
+        Args:
+            seen: int - Version returned by the previous call (0 at first)
+
+        Returns:
+            int - Version to pass next time
+        """
+        with self._updates:
+            self._updates.wait_for(lambda: self._versions.get(job_id, 0) != seen, timeout)
+            return self._versions.get(job_id, 0)
+
+    def start(self):
+        """Queue interrupted jobs again and start the workers (idempotent)"""
+        with self._start_lock:
+            if any(thread.is_alive() for thread in self._threads):
+                return
+            self._stopping.clear()
+
+            with self.app.app_context():
+                self._recover()
+
+            self._threads = [
+                threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        with self._work:
+            self._work.notify_all()
+
+    def get_status(self):
+        """Workers, job counts per status and counters"""
+        counts = dict(
+            db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all()
+        )
+        with self._stats_lock:
+            stats = dict(self.stats)
+
+        return {
+            'workers': self.workers,
+            'running_workers': sum(1 for thread in self._threads if thread.is_alive()),
+            'max_per_user': self.max_per_user,
+            'max_queued': self.max_queued,
+            'jobs': counts,
+            'stats': stats
+        }
+
+    @staticmethod
+    def to_dict(job, include_result=True):
+        data = {
+            'job_id': job.id,
+            'task': job.task,
+            'status': job.status,
+            'progress': json.loads(job.progress) if job.progress else {},
+            'error': job.error,
+            'cancel_requested': bool(job.cancel_requested),
+            'attempts': job.attempts or 0,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        }
+        if include_result:
+            data['result'] = json.loads(job.result) if job.result else None
+        return data
+
+    # ============ WORKER ============
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    job_id = self._claim()
+                    if job_id is not None:
+                        self._execute(job_id)
+                        continue
+            except Exception as e:
+                print(f"Error in job worker: {e}")
+
+            # Other processes may queue jobs too, so poll as well as wait
+            with self._work:
+                self._work.wait(Config.JOB_POLL_INTERVAL)
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running; returns its id or None"""
+        candidates = [
+            job_id for (job_id,) in db.session.query(Job.id)
+            .filter_by(status='queued')
+            .order_by(Job.created_at)
+            .limit(self.workers + 1)
+        ]
+
+        for job_id in candidates:
+            # Conditional update: only one worker wins each job
+            now = datetime.utcnow()
+            claimed = Job.query.filter_by(id=job_id, status='queued').update({
+                'status': 'running',
+                'started_at': now,
+                'updated_at': now,
+                'attempts': Job.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                self._changed(job_id)
+                return job_id
+        return None
+
+    def _execute(self, job_id):
+        """Run one claimed job through the coordinator, saving progress per step"""
+        job = db.session.get(Job, job_id)
+        progress = json.loads(job.progress) if job.progress else {}
+        partial = {}
+        if job.cancel_requested:
+            self._cancel_requested.add(job_id)
+
+        def on_step(name, status, result):
+            progress[name] = {'status': status, 'at': datetime.utcnow().isoformat()}
+            fields = {'progress': json.dumps(progress)}
+            if status == 'done':
+                partial[name] = result
+                fields['result'] = json.dumps({'results': partial}, default=str)
+            self._save(job_id, **fields)
+
+        try:
+            response = self.coordinator.perceive({
+                'task': job.task,
+                'user_id': job.user_id,
+                'context': json.loads(job.params or '{}'),
+                'on_step': on_step,
+                'cancelled': lambda: job_id in self._cancel_requested
+            }).decide().act()
+
+            if job_id in self._cancel_requested:
+                status, error = 'cancelled', None
+            elif response['success']:
+                status, error = 'succeeded', None
+                partial = response['results']
+            else:
+                status, error = 'failed', response.get('error')
+
+            self._finish(job_id, status, error, {'results': partial, 'timing': response.get('timing')})
+        except Exception as e:
+            db.session.rollback()
+            self._finish(job_id, 'failed', str(e), {'results': partial})
+        finally:
+            self._cancel_requested.discard(job_id)
+
+    def _finish(self, job_id, status, error, result):
+        self._save(
+            job_id,
+            status=status,
+            error=error,
+            result=json.dumps(result, default=str),
+            finished_at=datetime.utcnow(),
+            finished=True
+        )
+        self._bump(**{status: 1})
+
+    def _save(self, job_id, finished=False, **fields):
+        fields['updated_at'] = datetime.utcnow()
+        Job.query.filter_by(id=job_id).update(fields, synchronize_session=False)
+        db.session.commit()
+        self._changed(job_id, finished)
+
+    def _recover(self):
+        """Jobs left 'running' by a stopped process: queue them again, or fail them after too many attempts"""
+        now = datetime.utcnow()
+        interrupted = Job.query.filter_by(status='running')
+
+        cancelled = interrupted.filter(Job.cancel_requested.is_(True)).update(
+            {'status': 'cancelled', 'finished_at': now, 'updated_at': now},
+            synchronize_session=False
+        )
+        failed = interrupted.filter(Job.attempts >= Config.JOB_MAX_ATTEMPTS).update({
+            'status': 'failed',
+            'error': f"Interrupted {Config.JOB_MAX_ATTEMPTS} times",
+            'finished_at': now,
+            'updated_at': now
+        }, synchronize_session=False)
+        requeued = interrupted.update(
+            {'status': 'queued', 'updated_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+        self._bump(cancelled=cancelled, failed=failed, requeued=requeued)
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+
+    # ============ NOTIFICATIONS ============
+
+    def _changed(self, job_id, finished=False):
+        """Wake subscribers of a job; finished jobs stop being tracked"""
+        with self._updates:
+            if finished:
+                # A missing entry reads as version 0, which still differs from what waiters saw
+                self._versions.pop(job_id, None)
+            else:
+                self._versions[job_id] = self._versions.get(job_id, 0) + 1
+            self._updates.notify_all()
+
+    def _bump(self, **amounts):
+        with self._stats_lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
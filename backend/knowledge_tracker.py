@@ -1,15 +1,107 @@
 import numpy as np
+import threading
+import time
 from datetime import datetime, timedelta
-from models import db, KnowledgeState, QuizAttempt
+from models import db, KnowledgeState, QuizAttempt, TopicParameters
 from config import Config
+from services import LazyService
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+def effective_levels(levels, last_practiced, now=None, forgetting_rate=None):
+    """
+    Knowledge levels as of `now`, decayed along the forgetting curve.
+    
+    A stored knowledge state is a base level plus the time it was last
+    practiced; the level a student has *now* is
+    base * exp(-forgetting_rate * whole days since practice). Computing it on
+    read keeps reads free of writes - only practice moves the anchor.
+    
+    Args:
+        levels: sequence of stored (base) levels
+        last_practiced: sequence of datetimes, aligned with levels (None = now)
+        forgetting_rate: float, or a sequence of per-level rates (default Config)
+    
+    Returns:
+        np.ndarray of effective levels
+    """
+    rate = Config.FORGETTING_RATE if forgetting_rate is None else np.asarray(forgetting_rate, dtype=float)
+    now = np.datetime64(now or datetime.utcnow(), 'us')
+    levels = np.asarray(levels, dtype=float)
+    anchors = np.array(last_practiced, dtype='datetime64[us]')
+    anchors = np.where(np.isnat(anchors), now, anchors)
+    
+    days = np.maximum((now - anchors) // np.timedelta64(1, 'D'), 0)
+    return levels * np.exp(-rate * days)
+
+class TopicParameterCache:
+    """
+    Per-topic learning and forgetting rates fitted offline (fit_parameters.py)
+    
+    The TopicParameters table is read on first use and again once
+    Config.TOPIC_PARAMETERS_TTL seconds have passed, so a new fit is picked up
+    without a restart. Topics without a fit use the Config defaults.
+    """
+    
+    def __init__(self, ttl=None):
+        self.ttl = Config.TOPIC_PARAMETERS_TTL if ttl is None else ttl
+        self._rates = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+    
+    def rates(self):
+        """{topic_id: (learning_rate, forgetting_rate)} for fitted topics"""
+        if self._rates is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._rates is None or time.monotonic() - self._loaded_at > self.ttl:
+                    self._rates = self._load()
+                    self._loaded_at = time.monotonic()
+        return self._rates
+    
+    def _load(self):
+        # Own connection: a failed read must not roll back the caller's session
+        query = db.select(TopicParameters.topic_id, TopicParameters.learning_rate, TopicParameters.forgetting_rate)
+        try:
+            with db.engine.connect() as conn:
+                return {topic_id: (lr, fr) for topic_id, lr, fr in conn.execute(query)}
+        except (OperationalError, ProgrammingError) as e:
+            # Database created before the table existed (init_db creates it)
+            print(f"Fitted topic parameters unavailable, using defaults: {e.orig}")
+            return {}
+    
+    def get(self, topic_id):
+        """(learning_rate, forgetting_rate) for a topic"""
+        return self.rates().get(topic_id, (Config.LEARNING_RATE, Config.FORGETTING_RATE))
+    
+    def forgetting_rates(self, topic_ids):
+        """Forgetting rate per topic id, as an array aligned with topic_ids"""
+        rates = self.rates()
+        return np.array([rates.get(topic_id, (None, Config.FORGETTING_RATE))[1] for topic_id in topic_ids])
+    
+    def invalidate(self):
+        self._rates = None
 
 class KnowledgeTracker:
+    # Fitted per-topic rates; Config.LEARNING_RATE / FORGETTING_RATE where there is no fit
+    parameters = LazyService('topic_parameters')
+    # Materialized per-user progress summaries, kept current by apply_attempts
+    summaries = LazyService('progress_summaries')
+    # Due-review index for spaced repetition, rescheduled by apply_attempts
+    reviews = LazyService('review_queue')
+    # Topics and their prerequisites, cached per process
+    topics = LazyService('topic_graph')
+    
+    DIFFICULTY_WEIGHTS = {
+        'beginner': 0.7,
+        'intermediate': 1.0,
+        'advanced': 1.3
+    }
+    
     def __init__(self):
         self.learning_rate = Config.LEARNING_RATE
         self.forgetting_rate = Config.FORGETTING_RATE
     
-    def get_or_create_knowledge_state(self, user_id, topic_id):
-        """Get or create knowledge state for a user-topic pair"""
+    def get_or_create_knowledge_state(self, user_id, topic_id, commit=True):
+        """Get or create knowledge state for a user-topic pair (commit=False only flushes a new one)"""
         state = KnowledgeState.query.filter_by(
             user_id=user_id, 
             topic_id=topic_id
@@ -22,75 +114,115 @@ class KnowledgeTracker:
                 knowledge_level=Config.INITIAL_KNOWLEDGE,
                 confidence=0.0
             )
-            db.session.add(state)
-            db.session.commit()
+            try:
+                # Savepoint: losing a race to a concurrent request keeps the caller's transaction
+                with db.session.begin_nested():
+                    db.session.add(state)
+            except IntegrityError:
+                # The other request created it first (one state per user and topic)
+                return KnowledgeState.query.filter_by(user_id=user_id, topic_id=topic_id).one()
+            
+            self.summaries.invalidate(user_id)
+            if commit:
+                db.session.commit()
         
         return state
     
+    def current_level(self, state, now=None):
+        """Effective (decayed) level of one KnowledgeState"""
+        return self.current_levels([state], now)[0]
+    
+    def current_levels(self, states, now=None):
+        """Effective levels of several KnowledgeStates, as a list of floats"""
+        if not states:
+            return []
+        return effective_levels(
+            [state.knowledge_level for state in states],
+            [state.last_practiced for state in states],
+            now,
+            self.parameters.forgetting_rates([state.topic_id for state in states])
+        ).tolist()
+    
     def update_knowledge(self, user_id, topic_id, is_correct, difficulty, time_taken=None):
         """Update knowledge state based on quiz performance"""
-        state = self.get_or_create_knowledge_state(user_id, topic_id)
+        state = self.apply_attempts(user_id, topic_id, [(is_correct, difficulty)])
+        db.session.commit()
         
-        # Apply forgetting curve based on time since last practice (only if knowledge > 0)
-        if state.knowledge_level > 0:
-            time_diff = (datetime.utcnow() - state.last_practiced).days
-            if time_diff > 0:
-                forgetting_factor = np.exp(-self.forgetting_rate * time_diff)
-                state.knowledge_level *= forgetting_factor
+        return state
+    
+    def apply_attempts(self, user_id, topic_id, attempts, now=None):
+        """
+        Apply several graded answers to one knowledge state, in order.
         
-        # Update based on current performance
-        difficulty_weight = self._get_difficulty_weight(difficulty)
+        Decays the state once, then runs the same per-answer update as
+        update_knowledge for each (is_correct, difficulty) pair, with the
+        topic's fitted rates. Nothing is committed, so a whole quiz can be
+        saved in the caller's transaction.
         
-        if is_correct:
-            # Increase knowledge level
-            delta = self.learning_rate * difficulty_weight * (1 - state.knowledge_level)
-            state.knowledge_level = min(1.0, state.knowledge_level + delta)
-            state.confidence = min(1.0, state.confidence + 0.1)
-        else:
-            # Decrease knowledge level slightly (only if there was knowledge to begin with)
-            if state.knowledge_level > 0:
-                delta = self.learning_rate * difficulty_weight * state.knowledge_level * 0.3
-                state.knowledge_level = max(0.0, state.knowledge_level - delta)
-            state.confidence = max(0.0, state.confidence - 0.1)
+        Returns:
+            KnowledgeState - the updated (uncommitted) state
+        """
+        state = self.get_or_create_knowledge_state(user_id, topic_id, commit=False)
         
-        # Update metadata
-        state.last_practiced = datetime.utcnow()
-        state.practice_count += 1
+        # Start from the decayed level: practice re-anchors the forgetting curve
+        now = now or datetime.utcnow()
+        learning_rate, forgetting_rate = self.parameters.get(topic_id)
+        level = state.knowledge_level
+        if level > 0:
+            level = float(effective_levels([level], [state.last_practiced], now, forgetting_rate)[0])
+        old_level = level
+        confidence = state.confidence or 0.0
         
-        db.session.commit()
+        for is_correct, difficulty in attempts:
+            difficulty_weight = self._get_difficulty_weight(difficulty)
+            
+            if is_correct:
+                # Increase knowledge level
+                delta = learning_rate * difficulty_weight * (1 - level)
+                level = min(1.0, level + delta)
+                confidence = min(1.0, confidence + 0.1)
+            else:
+                # Decrease knowledge level slightly (only if there was knowledge to begin with)
+                if level > 0:
+                    delta = learning_rate * difficulty_weight * level * 0.3
+                    level = max(0.0, level - delta)
+                confidence = max(0.0, confidence - 0.1)
+        
+        # One write per state, however many answers
+        state.knowledge_level = level
+        state.confidence = confidence
+        state.last_practiced = now
+        state.practice_count = (state.practice_count or 0) + len(attempts)
+        
+        self.summaries.record(user_id, topic_id, old_level, level, len(attempts), now)
+        self.reviews.record(user_id, topic_id, level, now)
         
         return state
     
     def _get_difficulty_weight(self, difficulty):
         """Get weight based on difficulty level"""
-        weights = {
-            'beginner': 0.7,
-            'intermediate': 1.0,
-            'advanced': 1.3
-        }
-        return weights.get(difficulty, 1.0)
+        return self.DIFFICULTY_WEIGHTS.get(difficulty, 1.0)
     
     def get_recommended_difficulty(self, user_id, topic_id):
         """Recommend difficulty level based on knowledge state"""
         state = self.get_or_create_knowledge_state(user_id, topic_id)
+        knowledge_level = self.current_level(state)
         
-        if state.knowledge_level < 0.3:
+        if knowledge_level < 0.3:
             return 'beginner'
-        elif state.knowledge_level < 0.7:
+        elif knowledge_level < 0.7:
             return 'intermediate'
         else:
             return 'advanced'
     
     def get_next_topic(self, user_id, current_topic_id=None):
-        """Recommend next topic to learn based on knowledge states"""
-        from models import Topic
-        
-        # Get all topics
-        all_topics = Topic.query.all()
+        """Recommend next topic to learn based on knowledge states (a TopicInfo, or None)"""
+        # Get all topics (with their direct prerequisites) from the cached topic graph
+        all_topics = self.topics.get().topics
         
         # Get user's knowledge states
         knowledge_states = KnowledgeState.query.filter_by(user_id=user_id).all()
-        knowledge_map = {ks.topic_id: ks.knowledge_level for ks in knowledge_states}
+        knowledge_map = dict(zip((ks.topic_id for ks in knowledge_states), self.current_levels(knowledge_states)))
         
         # Score topics based on various factors
         topic_scores = []
@@ -111,11 +243,10 @@ class KnowledgeTracker:
             
             # Check prerequisites
             if topic.prerequisites:
-                prereq_ids = [int(x.strip()) for x in topic.prerequisites.split(',') if x.strip()]
-                prereq_met = all(knowledge_map.get(pid, 0) > 0.5 for pid in prereq_ids)
+                prereq_met = all(knowledge_map.get(pid, 0) > 0.5 for pid in topic.prerequisites)
                 if prereq_met:
                     score += 2
-                elif any(knowledge_map.get(pid, 0) > 0 for pid in prereq_ids):
+                elif any(knowledge_map.get(pid, 0) > 0 for pid in topic.prerequisites):
                     score += 1  # Some prerequisites started
                 else:
                     score -= 1  # Prerequisites not met, but don't exclude completely
@@ -132,36 +263,5 @@ class KnowledgeTracker:
         return None
     
     def get_progress_summary(self, user_id):
-        """Get overall learning progress for a user"""
-        knowledge_states = KnowledgeState.query.filter_by(user_id=user_id).all()
-        
-        if not knowledge_states:
-            return {
-                'average_knowledge': 0,
-                'topics_mastered': 0,
-                'topics_in_progress': 0,
-                'total_practice_count': 0,
-                'weak_topics': [],
-                'strong_topics': []
-            }
-        
-        total_knowledge = sum(ks.knowledge_level for ks in knowledge_states)
-        avg_knowledge = total_knowledge / len(knowledge_states)
-        
-        mastered = [ks for ks in knowledge_states if ks.knowledge_level >= 0.8]
-        in_progress = [ks for ks in knowledge_states if 0 < ks.knowledge_level < 0.8]
-        weak = [ks for ks in knowledge_states if ks.knowledge_level <= 0.3 and ks.knowledge_level > 0]
-        not_started = [ks for ks in knowledge_states if ks.knowledge_level == 0]
-        
-        total_practice = sum(ks.practice_count for ks in knowledge_states)
-        
-        return {
-            'average_knowledge': round(avg_knowledge, 2),
-            'topics_mastered': len(mastered),
-            'topics_in_progress': len(in_progress),
-            'total_practice_count': total_practice,
-            'weak_topics': [{'id': ks.topic_id, 'level': round(ks.knowledge_level, 2)} 
-                           for ks in sorted(weak + not_started, key=lambda x: x.knowledge_level)[:5]],
-            'strong_topics': [{'id': ks.topic_id, 'level': round(ks.knowledge_level, 2)} 
-                             for ks in sorted(mastered, key=lambda x: x.knowledge_level, reverse=True)[:5]]
-        }
\ No newline at end of file
+        """Get overall learning progress for a user (materialized, see progress_summary.py)"""
+        return self.summaries.get(user_id)
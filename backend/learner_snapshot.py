@@ -0,0 +1,101 @@
+"""
+Learner Snapshot - One read of a student's learning state, shared by a whole workflow
+"""
+from collections import namedtuple
+from config import Config
+from knowledge_tracker import effective_levels
+from models import KnowledgeState, QuizAttempt
+from services import registry
+import numpy as np
+
+# Plain rows rather than ORM instances (TopicInfo too): workflow steps run on other threads,
+# each with its own session, and must not share attached objects
+# knowledge_level is the effective (decayed) level at load time; base_level is the stored one
+KnowledgeInfo = namedtuple('KnowledgeInfo', ['id', 'topic_id', 'knowledge_level', 'base_level', 'confidence',
+                                             'last_practiced', 'practice_count'])
+AttemptInfo = namedtuple('AttemptInfo', ['topic_id', 'is_correct', 'difficulty', 'created_at'])
+
+
+class LearnerSnapshot:
+    """
+    Read-only view of one student, loaded once per coordinator workflow and
+    handed to every agent through its environment.
+
+    load() issues one column-only query (the student's knowledge states; the
+    topics and their prerequisites come from the cached topic graph) and
+    decays every level to the present in one vectorized call.
+    Recent quiz attempts are fetched on first access, since most workflows
+    never look at them.
+    """
+
+    def __init__(self, user_id, graph, knowledge, recent_attempts=None):
+        self.user_id = user_id
+        self.graph = graph  # TopicDAG, the same one for the whole workflow
+        self.topics = graph.topics
+        self.topics_by_id = graph.topics_by_id
+        self.knowledge = {state.topic_id: state for state in knowledge}
+        self._recent_attempts = recent_attempts
+
+    @classmethod
+    def load(cls, user_id):
+        rows = KnowledgeState.query.with_entities(
+            KnowledgeState.id, KnowledgeState.topic_id, KnowledgeState.knowledge_level,
+            KnowledgeState.confidence, KnowledgeState.last_practiced, KnowledgeState.practice_count
+        ).filter_by(user_id=user_id).all()
+        levels = effective_levels(
+            [row[2] for row in rows],
+            [row[4] for row in rows],
+            forgetting_rate=registry.get('topic_parameters').forgetting_rates([row[1] for row in rows])
+        ) if rows else []
+        knowledge = [
+            KnowledgeInfo(row[0], row[1], float(level), *row[2:])
+            for row, level in zip(rows, levels)
+        ]
+        return cls(user_id, registry.get('topic_graph').get(), knowledge)
+
+    def topic(self, topic_id):
+        """TopicInfo or None"""
+        return self.topics_by_id.get(topic_id)
+
+    def state(self, topic_id):
+        """KnowledgeInfo or None when the student never practiced the topic"""
+        return self.knowledge.get(topic_id)
+
+    def levels(self):
+        """{topic_id: effective knowledge level} for practiced topics"""
+        return {topic_id: state.knowledge_level for topic_id, state in self.knowledge.items()}
+
+    @property
+    def knowledge_vector(self):
+        """Knowledge level per topic, aligned with self.topics (0 when never practiced)"""
+        return np.array([
+            self.knowledge[topic.id].knowledge_level if topic.id in self.knowledge else 0.0
+            for topic in self.topics
+        ])
+
+    @property
+    def recent_attempts(self):
+        """Latest quiz attempts, newest first (Config.LEARNER_RECENT_ATTEMPTS of them)"""
+        if self._recent_attempts is None:
+            # Attempts still in the write-behind buffer count too (read before the table)
+            buffer = registry.get('write_behind')
+            pending = buffer.pending(QuizAttempt, self.user_id) if buffer else []
+
+            attempts = [
+                AttemptInfo(*row) for row in QuizAttempt.query.with_entities(
+                    QuizAttempt.topic_id, QuizAttempt.is_correct,
+                    QuizAttempt.difficulty, QuizAttempt.created_at
+                ).filter_by(user_id=self.user_id)
+                .order_by(QuizAttempt.created_at.desc())
+                .limit(Config.LEARNER_RECENT_ATTEMPTS)
+            ]
+            if pending:
+                saved = {(attempt.topic_id, attempt.created_at) for attempt in attempts}
+                attempts += [
+                    AttemptInfo(row['topic_id'], row['is_correct'], row.get('difficulty'), row['created_at'])
+                    for row in pending if (row['topic_id'], row['created_at']) not in saved
+                ]
+                attempts.sort(key=lambda attempt: attempt.created_at, reverse=True)
+
+            self._recent_attempts = tuple(attempts[:Config.LEARNER_RECENT_ATTEMPTS])
+        return self._recent_attempts
@@ -0,0 +1,244 @@
+"""
+LLM Response Cache - Content-addressed two-tier cache for LLM responses
+"""
+from collections import OrderedDict
+from config import Config
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses:
+    - Memory tier: LRU with size and TTL eviction (per process)
+    - Disk tier: SQLite file shared by all worker processes, survives restarts
+
+    Keys are content hashes of (model name, normalized prompt, generation_config),
+    so identical prompts from different students share one entry.
+    """
+
+    def __init__(self, path=None, max_entries=None, ttl=None, disk_max_entries=None):
+        self.path = path or Config.LLM_CACHE_PATH
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.LLM_CACHE_TTL
+        self.disk_max_entries = disk_max_entries or Config.LLM_CACHE_DISK_MAX_ENTRIES
+
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_prune = 0
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'bypassed': 0
+        }
+
+        self._init_disk()
+
+    # ============ KEYING ============
+
+    @staticmethod
+    def normalize_prompt(prompt):
+        """Collapse indentation and blank lines so cosmetic whitespace doesn't change the key"""
+        lines = (' '.join(line.split()) for line in prompt.strip().splitlines())
+        return '\n'.join(line for line in lines if line)
+
+    @classmethod
+    def make_key(cls, model_name, prompt, generation_config):
+        """Content hash of everything that determines the model output"""
+        payload = json.dumps({
+            'model': model_name,
+            'prompt': cls.normalize_prompt(prompt),
+            'generation_config': generation_config or {}
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # ============ PUBLIC API ============
+
+    def get(self, key):
+        """Return cached response or None (memory tier first, then disk)"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+                self.stats['expirations'] += 1
+
+        value, expires_at = self._disk_get(key, now)
+        if value is not None:
+            with self._lock:
+                self.stats['disk_hits'] += 1
+                self._memory_put(key, value, expires_at)
+            return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        """Store response in both tiers"""
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._memory_put(key, value, expires_at)
+            self.stats['writes'] += 1
+
+        self._disk_set(key, value, expires_at)
+
+    def record_bypass(self):
+        """Count a call that skipped the cache lookup"""
+        with self._lock:
+            self.stats['bypassed'] += 1
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM response_cache")
+        except sqlite3.Error as e:
+            print(f"Error clearing response cache: {e}")
+
+    def get_stats(self):
+        """Return hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
+    # ============ MEMORY TIER ============
+
+    def _memory_put(self, key, value, expires_at):
+        """Insert into LRU, evicting least recently used entries (caller holds lock)"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    # ============ DISK TIER ============
+
+    def _connection(self):
+        """One SQLite connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_disk(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._connection()
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS response_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_response_cache_created_at "
+                    "ON response_cache (created_at)"
+                )
+        except sqlite3.Error as e:
+            print(f"Error initializing response cache: {e}")
+
+    def _disk_get(self, key, now):
+        try:
+            row = self._connection().execute(
+                "SELECT response, expires_at FROM response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {e}")
+            return None, None
+
+        if row is None:
+            return None, None
+
+        if row[1] <= now:
+            with self._lock:
+                self.stats['expirations'] += 1
+            return None, None
+
+        return row
+
+    def _disk_set(self, key, value, expires_at):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, time.time(), expires_at)
+                )
+
+            with self._lock:
+                self._writes_since_prune += 1
+                should_prune = self._writes_since_prune >= 100
+                if should_prune:
+                    self._writes_since_prune = 0
+
+            if should_prune:
+                self._disk_prune(conn)
+        except sqlite3.Error as e:
+            print(f"Error writing response cache: {e}")
+
+    def _disk_prune(self, conn):
+        """Remove expired rows and keep the table under its size limit"""
+        with conn:
+            expired = conn.execute(
+                "DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            evicted = conn.execute("""
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache
+                    ORDER BY created_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (self.disk_max_entries,)).rowcount
+
+        with self._lock:
+            self.stats['expirations'] += max(expired, 0)
+            self.stats['evictions'] += max(evicted, 0)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache shared by every LLMService instance"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ResponseCache()
+    return _shared_cache
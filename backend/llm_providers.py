@@ -0,0 +1,340 @@
+"""
+LLM Providers - Pluggable model backends for LLMService
+"""
+from abc import ABC, abstractmethod
+from config import Config
+from llm_cache import ResponseCache
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+
+class LLMProvider(ABC):
+    """
+    Base class for model backends.
+
+    `task` tells the backend what kind of output the caller expects
+    ('lesson', 'quiz', 'hint', 'explanation', 'explanations_batch', 'tips', 'text').
+    Real models ignore it; the synthetic backend uses it to shape responses.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    @abstractmethod
+    def generate(self, prompt, generation_config, task=None):
+        """Return the full response text"""
+        pass
+
+    async def agenerate(self, prompt, generation_config, task=None):
+        """Async generation; blocking backends run in the loop's executor"""
+        return await asyncio.to_thread(self.generate, prompt, generation_config, task)
+
+    def stream(self, prompt, generation_config, task=None):
+        """Yield response text chunks; non-streaming backends yield one chunk"""
+        yield self.generate(prompt, generation_config, task)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google.generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, model_name=None):
+        super().__init__(model_name or Config.LLM_MODEL)
+        # Imported here so offline backends don't need the SDK installed
+        import google.generativeai as genai
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def generate(self, prompt, generation_config, task=None):
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config
+        )
+        return response.text
+
+    async def agenerate(self, prompt, generation_config, task=None):
+        if hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config
+            )
+            return response.text
+        return await super().agenerate(prompt, generation_config, task)
+
+    def stream(self, prompt, generation_config, task=None):
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class ReplayProvider(LLMProvider):
+    """
+    Record/replay backend backed by a JSON-lines cassette on disk.
+
+    Modes:
+    - replay: serve recorded responses only; unknown prompts raise KeyError
+    - record: always call the inner provider and (re)record the response
+    - auto:   replay when recorded, otherwise record
+    """
+
+    name = "replay"
+
+    MODES = ('replay', 'record', 'auto')
+
+    def __init__(self, cassette_path=None, mode=None, inner=None):
+        self.cassette_path = cassette_path or Config.LLM_CASSETTE_PATH
+        self.mode = mode or Config.LLM_REPLAY_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown replay mode: {self.mode}")
+
+        self._inner = inner
+        self._inner_name = Config.LLM_REPLAY_INNER
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+        super().__init__(inner.model_name if inner else Config.LLM_MODEL)
+
+    @property
+    def inner(self):
+        """Provider used for recording; only built when a recording is needed"""
+        if self._inner is None:
+            self._inner = create_provider(self._inner_name)
+        return self._inner
+
+    def generate(self, prompt, generation_config, task=None):
+        key = self._key(prompt, generation_config)
+
+        if self.mode != 'record':
+            recorded = self._entries.get(key)
+            if recorded is not None:
+                return recorded
+            if self.mode == 'replay':
+                raise KeyError(f"No recording for prompt {key[:12]} in {self.cassette_path}")
+
+        text = self.inner.generate(prompt, generation_config, task)
+        self._record(key, prompt, text, task)
+        return text
+
+    def stream(self, prompt, generation_config, task=None):
+        # Replay line by line so streaming consumers see realistic chunking
+        for line in self.generate(prompt, generation_config, task).splitlines(keepends=True):
+            yield line
+
+    def _key(self, prompt, generation_config):
+        return ResponseCache.make_key(self.model_name, prompt, generation_config)
+
+    def _load(self):
+        entries = {}
+        if not os.path.exists(self.cassette_path):
+            return entries
+
+        with open(self.cassette_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # tolerate a torn final line
+                entries[record['key']] = record['response']
+        return entries
+
+    def _record(self, key, prompt, text, task):
+        record = {
+            'key': key,
+            'task': task,
+            'model': self.model_name,
+            'prompt': ResponseCache.normalize_prompt(prompt),
+            'response': text,
+            'recorded_at': time.time()
+        }
+        with self._lock:
+            self._entries[key] = text
+            os.makedirs(os.path.dirname(os.path.abspath(self.cassette_path)), exist_ok=True)
+            with open(self.cassette_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+
+class SyntheticProvider(LLMProvider):
+    """
+    Offline backend returning schema-valid lessons, quizzes, hints and
+    explanations after a sampled latency, for load tests and benchmarks.
+
+    Latency spec (Config.SYNTHETIC_LATENCY), in seconds:
+    - fixed:<s>
+    - uniform:<low>,<high>
+    - normal:<mean>,<std>
+    - lognormal:<median>,<sigma>
+    """
+
+    name = "synthetic"
+
+    def __init__(self, latency=None, seed=None):
+        super().__init__("synthetic-v1")
+        self.latency_spec = latency or Config.SYNTHETIC_LATENCY
+        self._sample = self._parse_latency(self.latency_spec)
+        self._random = random.Random(seed if seed is not None else Config.SYNTHETIC_SEED)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, generation_config, task=None):
+        time.sleep(self.sample_latency())
+        return self._respond(prompt, task)
+
+    async def agenerate(self, prompt, generation_config, task=None):
+        await asyncio.sleep(self.sample_latency())
+        return self._respond(prompt, task)
+
+    def stream(self, prompt, generation_config, task=None):
+        total = self.sample_latency()
+        lines = self._respond(prompt, task).splitlines(keepends=True)
+
+        # Roughly a third of the latency before the first token, the rest spread over chunks
+        time.sleep(total / 3)
+        per_chunk = (total * 2 / 3) / max(len(lines), 1)
+        for line in lines:
+            yield line
+            time.sleep(per_chunk)
+
+    def sample_latency(self):
+        with self._lock:
+            return max(0.0, self._sample(self._random))
+
+    # ============ LATENCY ============
+
+    # Parameters each latency distribution takes
+    LATENCY_PARAMS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+
+    @classmethod
+    def _parse_latency(cls, spec):
+        kind, _, raw = spec.partition(':')
+        params = [float(p) for p in raw.split(',') if p.strip()]
+        if kind in cls.LATENCY_PARAMS and len(params) != cls.LATENCY_PARAMS[kind]:
+            raise ValueError(f"{kind} latency takes {cls.LATENCY_PARAMS[kind]} parameter(s): {spec}")
+
+        if kind == 'fixed':
+            return lambda rng: params[0]
+        if kind == 'uniform':
+            return lambda rng: rng.uniform(params[0], params[1])
+        if kind == 'normal':
+            return lambda rng: rng.gauss(params[0], params[1])
+        if kind == 'lognormal':
+            return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    # ============ RESPONSES ============
+
+    def _respond(self, prompt, task):
+        task = task or 'text'
+        if task == 'lesson':
+            return self._lesson(prompt)
+        if task == 'quiz':
+            return self._quiz(prompt)
+        if task == 'explanations_batch':
+            return self._batch_explanations(prompt)
+        if task == 'explanation':
+            return ("The correct answer follows directly from the core definition. "
+                    "Compare each option against that definition. "
+                    "Tip: restate the concept in your own words before answering.")
+        if task == 'tips':
+            return ("- **Practice daily** with short, focused sessions.\n"
+                    "- Revisit your **weak topics** before moving on.\n"
+                    "- Explain concepts aloud to check your **understanding**.")
+        if task == 'hint':
+            question = self._match(r'Question:\s*(.+)', prompt, 'this problem')
+            return (f"Start from your question \"{question}\" and break it into smaller steps. "
+                    "What is the first thing your program needs to do?")
+        return "Good effort! Review the key idea and try once more."
+
+    def _lesson(self, prompt):
+        topic = self._match(r'lesson on "([^"]+)"', prompt, 'this topic')
+        return (
+            f"## Introduction\n"
+            f"**{topic}** is a building block you will use constantly.\n\n"
+            f"## Core Concepts\n"
+            f"- The core idea of {topic}\n"
+            f"- How it fits with what you already know\n\n"
+            f"## Practical Examples\n"
+            f"```python\n"
+            f"values = [1, 2, 3]\n"
+            f"print(sum(values))\n"
+            f"```\n\n"
+            f"## Real-World Applications\n"
+            f"Teams use {topic} in production code every day.\n\n"
+            f"## Key Takeaways\n"
+            f"- Start simple\n"
+            f"- Practice regularly\n"
+            f"- Build on the basics\n\n"
+            f"## Practice Challenge\n"
+            f"Write a Python program that prints the numbers 1 to 5. Expected output: 1 2 3 4 5\n"
+        )
+
+    def _quiz(self, prompt):
+        topic = self._match(r'quiz for "([^"]+)"', prompt, None) or \
+            self._match(r'questions on "([^"]+)"', prompt, 'this topic')
+
+        mix = [(int(count), level) for count, level in
+               re.findall(r'(\d+) (beginner|intermediate|advanced) level questions', prompt)]
+        if not mix:
+            count = int(self._match(r'Generate (\d+)', prompt, '5'))
+            mix = [(count, 'intermediate')]
+
+        questions = []
+        for count, level in mix:
+            for _ in range(count):
+                number = len(questions) + 1
+                questions.append({
+                    "question": f"Question {number} about {topic} ({level})?",
+                    "options": {
+                        "A": f"Correct statement about {topic}",
+                        "B": "Plausible distractor",
+                        "C": "Common misconception",
+                        "D": "Unrelated option"
+                    },
+                    "correct_answer": "A",
+                    "explanation": f"Option A states the core idea of {topic}.",
+                    "difficulty": level,
+                    "topic_area": f"{topic} fundamentals"
+                })
+        return "```json\n" + json.dumps(questions, indent=2) + "\n```"
+
+    def _batch_explanations(self, prompt):
+        count = len(re.findall(r'^\s*\d+\. Question:', prompt, flags=re.MULTILINE))
+        return json.dumps([
+            {"index": i, "explanation": f"Answer {i}: compare your choice with the core definition."}
+            for i in range(1, count + 1)
+        ])
+
+    @staticmethod
+    def _match(pattern, text, default):
+        match = re.search(pattern, text)
+        return match.group(1).strip() if match else default
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'replay': ReplayProvider,
+    'synthetic': SyntheticProvider
+}
+
+
+def create_provider(name=None):
+    """Build the provider selected by name or Config.LLM_PROVIDER"""
+    name = (name or Config.LLM_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {name} (expected one of {', '.join(PROVIDERS)})")
+    return PROVIDERS[name]()
@@ -0,0 +1,291 @@
+"""
+LLM Resilience - Latency tracking, adaptive timeouts, hedging and circuit breaking
+"""
+from collections import defaultdict, deque
+from async_llm import LLMTimeoutError
+from config import Config
+import asyncio
+import numpy as np
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while its circuit is open"""
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds) per task"""
+
+    def __init__(self, window=None):
+        self.window = window or Config.LLM_LATENCY_WINDOW
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, task, seconds):
+        with self._lock:
+            self._samples[task].append(seconds)
+
+    def percentile(self, task, q, min_samples=1):
+        """q-th percentile for task, or None with fewer than min_samples samples"""
+        with self._lock:
+            samples = self._samples.get(task)
+            if not samples or len(samples) < min_samples:
+                return None
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+        return float(np.percentile(values, q))
+
+    def summary(self):
+        """p50/p95/p99 in milliseconds per task"""
+        with self._lock:
+            snapshot = {task: list(samples) for task, samples in self._samples.items() if samples}
+
+        summary = {}
+        for task, samples in snapshot.items():
+            p50, p95, p99 = np.percentile(np.array(samples), [50, 95, 99])
+            summary[task] = {
+                'samples': len(samples),
+                'p50_ms': round(float(p50) * 1000, 1),
+                'p95_ms': round(float(p95) * 1000, 1),
+                'p99_ms': round(float(p99) * 1000, 1)
+            }
+        return summary
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker:
+    - closed:    calls pass; `failure_threshold` consecutive failures open it
+    - open:      calls are rejected for `cooldown` seconds
+    - half_open: one probe call passes; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None):
+        self.failure_threshold = failure_threshold or Config.LLM_BREAKER_FAILURES
+        self.cooldown = cooldown if cooldown is not None else Config.LLM_BREAKER_COOLDOWN
+
+        self.state = 'closed'
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'opened': 0,
+            'short_circuited': 0,
+            'failures': 0,
+            'successes': 0
+        }
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self._probe_in_flight = False
+
+            if self.state == 'closed':
+                return
+            # A probe whose caller vanished without reporting must not wedge the breaker
+            probe_stale = time.monotonic() - self._probe_started >= self.cooldown
+            if self.state == 'half_open' and (not self._probe_in_flight or probe_stale):
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return
+
+            self.stats['short_circuited'] += 1
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+        raise CircuitOpenError(f"LLM circuit open, retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self.state == 'half_open' or self._consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.stats['opened'] += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def get_status(self):
+        with self._lock:
+            status = dict(self.stats)
+            status['state'] = self.state
+            status['consecutive_failures'] = self._consecutive_failures
+            if self.state == 'open':
+                status['retry_in_seconds'] = round(
+                    max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1
+                )
+        return status
+
+
+class LLMResilience:
+    """
+    Per-provider policy applied around every LLMService call:
+    - Adaptive timeout: `multiplier` x observed p99, clamped to [floor, Config.LLM_TIMEOUT_SECONDS]
+    - Hedging (optional): a second identical request once the first has run past
+      the task's p95; whichever succeeds first wins, the other is cancelled
+    - Circuit breaker: while open, calls fail fast so callers serve their fallback
+    """
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.adaptive_timeouts = Config.LLM_ADAPTIVE_TIMEOUT
+        self.hedging = Config.LLM_HEDGE_ENABLED
+        self.min_samples = Config.LLM_LATENCY_MIN_SAMPLES
+        self.max_hedges = Config.LLM_HEDGE_MAX_IN_FLIGHT
+
+        self._lock = threading.Lock()
+        self._hedges_in_flight = 0
+        self.stats = {
+            'hedged': 0,
+            'hedge_wins': 0,
+            'timeouts': 0
+        }
+
+    # ============ POLICY ============
+
+    def before_call(self):
+        """Fail fast while the provider is unhealthy"""
+        self.breaker.allow()
+
+    def timeout_for(self, task, requested=None):
+        """Explicit timeouts win; otherwise derive one from the task's p99"""
+        if requested is not None:
+            return requested
+
+        ceiling = Config.LLM_TIMEOUT_SECONDS
+        if not self.adaptive_timeouts:
+            return ceiling
+
+        p99 = self.latency.percentile(task, 99, self.min_samples)
+        if p99 is None:
+            return ceiling
+        return min(ceiling, max(Config.LLM_TIMEOUT_FLOOR, p99 * Config.LLM_TIMEOUT_MULTIPLIER))
+
+    def record_success(self, task, seconds):
+        self.latency.record(task, seconds)
+        self.breaker.record_success()
+
+    def record_failure(self, task):
+        self.breaker.record_failure()
+
+    def record_timeout(self, task):
+        with self._lock:
+            self.stats['timeouts'] += 1
+        self.breaker.record_failure()
+
+    # ============ EXECUTION ============
+
+    async def call(self, task, factory, timeout=None):
+        """
+        Run factory() (a zero-argument coroutine factory) with hedging and a
+        hard timeout, and feed the outcome to the latency tracker and breaker.
+
+        The timeout is enforced here rather than only by the waiting caller:
+        shared calls keep running after their waiters give up, and a late
+        success must not reset the breaker or inflate the latency window.
+        """
+        started = time.monotonic()
+        delay = self.latency.percentile(task, 95, self.min_samples) if self.hedging else None
+
+        try:
+            call = factory() if delay is None else self._hedged(factory, delay)
+            result = await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            self.record_timeout(task)
+            raise LLMTimeoutError(f"LLM call exceeded {timeout:.1f}s")
+        except asyncio.CancelledError:
+            raise  # the caller gave up before the deadline; says nothing about the provider
+        except Exception:
+            self.record_failure(task)
+            raise
+
+        self.record_success(task, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, factory, delay):
+        primary = asyncio.ensure_future(factory())
+        tasks = [primary]
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._reserve_hedge():
+                return await primary
+
+            try:
+                tasks.append(asyncio.ensure_future(factory()))
+                pending = set(tasks)
+                error = None
+
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is not primary:
+                                with self._lock:
+                                    self.stats['hedge_wins'] += 1
+                            return task.result()
+                        error = error or task.exception()
+
+                raise error
+            finally:
+                with self._lock:
+                    self._hedges_in_flight -= 1
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _reserve_hedge(self):
+        """Hedges are capped so a slow provider doesn't get double the load"""
+        with self._lock:
+            if self._hedges_in_flight >= self.max_hedges:
+                return False
+            self._hedges_in_flight += 1
+            self.stats['hedged'] += 1
+            return True
+
+    # ============ STATUS ============
+
+    def get_status(self):
+        """Breaker state, per-task latency percentiles and current timeouts"""
+        latency = self.latency.summary()
+        for task, summary in latency.items():
+            summary['timeout_s'] = round(self.timeout_for(task), 2)
+
+        with self._lock:
+            stats = dict(self.stats)
+
+        return {
+            'breaker': self.breaker.get_status(),
+            'latency': latency,
+            'adaptive_timeouts': self.adaptive_timeouts,
+            'hedging': self.hedging,
+            **stats
+        }
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_resilience(name):
+    """Process-wide policy per provider/model, shared by every LLMService instance"""
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = LLMResilience()
+        return _policies[name]
@@ -1,22 +1,35 @@
-import google.generativeai as genai
 from config import Config
+from llm_cache import ResponseCache, get_response_cache
+from llm_providers import create_provider
+from async_llm import LLMTimeoutError, get_runner
+from llm_resilience import get_resilience
+from quiz_parser import IncrementalQuizParser, parse_quiz_text
+import tracing
+import asyncio
 import json
+import queue
+import threading
 import time
 
 class LLMService:
-    def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, provider=None):
+        # Backend selected by Config.LLM_PROVIDER (gemini, replay, synthetic)
+        self.provider = provider or create_provider()
+        self.model_name = f"{self.provider.name}/{self.provider.model_name}"
         self.generation_config = {
             'temperature': 0.7,
             'top_p': 0.8,
             'top_k': 40,
             'max_output_tokens': 2048,
         }
+        self.cache = get_response_cache() if Config.LLM_CACHE_ENABLED else None
+        self.runner = get_runner()
+        self.resilience = get_resilience(self.model_name)
     
     # ============ AGENT-COMPATIBLE METHODS ============
     
-    def generate_lesson_with_prompt(self, topic_name, difficulty, knowledge_level, custom_prompt=None):
+    def generate_lesson_with_prompt(self, topic_name, difficulty, knowledge_level, custom_prompt=None,
+                                    bypass_cache=False, timeout=None):
         """
         Generate lesson with custom prompt (for Teaching Agent)
         
@@ -25,27 +38,22 @@ class LLMService:
             difficulty: str - Difficulty level
             knowledge_level: float - Current knowledge (0-1)
             custom_prompt: str - Custom prompt from Teaching Agent (optional)
+            bypass_cache: bool - Skip the response cache lookup (optional)
+            timeout: float - Per-call timeout in seconds (optional)
         
         Returns:
             str - Generated lesson content
         """
-        if custom_prompt:
-            prompt = custom_prompt
-        else:
-            # Use default prompt structure
-            prompt = self._default_lesson_prompt(topic_name, difficulty, knowledge_level)
+        prompt = custom_prompt or self._default_lesson_prompt(topic_name, difficulty, knowledge_level)
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            return response.text
+            return self._generate(prompt, 'lesson', bypass_cache=bypass_cache, timeout=timeout)
         except Exception as e:
             print(f"Error generating lesson: {e}")
             return self._get_fallback_lesson(topic_name, difficulty)
     
-    def generate_quiz_with_prompt(self, topic_name, num_questions, custom_prompt=None):
+    def generate_quiz_with_prompt(self, topic_name, num_questions, custom_prompt=None, bypass_cache=False,
+                                  timeout=None, use_fallback=True):
         """
         Generate quiz with custom prompt (for Assessment Agent)
         
@@ -53,41 +61,26 @@ class LLMService:
             topic_name: str - Name of the topic
             num_questions: int - Number of questions to generate
             custom_prompt: str - Custom prompt from Assessment Agent (optional)
+            bypass_cache: bool - Skip the response cache lookup (optional)
+            timeout: float - Per-call timeout in seconds (optional)
+            use_fallback: bool - Return the sample quiz on failure instead of raising (optional)
         
         Returns:
             list - Array of quiz questions
         """
-        if custom_prompt:
-            prompt = custom_prompt
-        else:
-            prompt = self._default_quiz_prompt(topic_name, num_questions)
+        prompt = custom_prompt or self._default_quiz_prompt(topic_name, num_questions)
         
         try:
-            response = self.model.generate_content(
-                prompt, 
-                generation_config=self.generation_config
-            )
-            text = response.text.strip()
-            
-            # Extract JSON from response
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0]
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0]
-            
-            questions = json.loads(text.strip())
-            
-            # Validate structure
-            if isinstance(questions, list) and len(questions) > 0:
-                return questions
-            else:
-                raise ValueError("Invalid JSON structure")
-                
+            return self._generate(prompt, 'quiz', bypass_cache=bypass_cache, parse=self._parse_quiz,
+                                  timeout=timeout)
         except Exception as e:
             print(f"Error generating quiz: {e}")
+            if not use_fallback:
+                raise
             return self._get_fallback_quiz(topic_name, 'intermediate', num_questions)
     
-    def generate_hint_with_context(self, question, context, hint_level='moderate'):
+    def generate_hint_with_context(self, question, context, hint_level='moderate', bypass_cache=False,
+                                   timeout=None):
         """
         Generate hint with specific context (for Tutor Agent)
         
@@ -95,42 +88,26 @@ class LLMService:
             question: str - Student's question
             context: dict - Context information
             hint_level: str - Level of hint detail (subtle, moderate, detailed)
+            bypass_cache: bool - Skip the response cache lookup (optional)
+            timeout: float - Per-call timeout in seconds (optional)
         
         Returns:
             str - Generated hint
         """
-        challenge = context.get('challenge', '')
-        attempt_count = context.get('attempt_count', 1)
-        
-        hint_instructions = {
-            'subtle': 'Provide a gentle nudge without revealing the solution. Ask guiding questions.',
-            'moderate': 'Explain the concept and provide a partial solution or approach.',
-            'detailed': 'Provide clear explanation with example code, but encourage student to try.'
-        }
-        
-        prompt = f"""
-        You are a supportive programming tutor.
-        
-        STUDENT CONTEXT:
-        - Question: {question}
-        - Challenge: {challenge}
-        - Previous attempts: {attempt_count}
-        
-        INSTRUCTIONS:
-        {hint_instructions.get(hint_level, hint_instructions['moderate'])}
-        
-        Be encouraging and educational. Keep response 2-4 sentences.
-        """
+        prompt = self._hint_prompt(question, context, hint_level)
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            return response.text
+            return self._generate(prompt, 'hint', bypass_cache=bypass_cache, timeout=timeout)
         except Exception as e:
             print(f"Error generating hint: {e}")
-            return "Think about what you've learned. Break the problem into smaller steps!"
+            return self._get_fallback_hint()
+    
+    def generate_text(self, prompt, task='text', bypass_cache=False, timeout=None):
+        """
+        Generate free-form text from a prompt built by an agent
+        Raises on failure so the calling agent can apply its own fallback
+        """
+        return self._generate(prompt, task, bypass_cache=bypass_cache, timeout=timeout)
     
     # ============ LEGACY METHODS (Still supported) ============
     
@@ -154,12 +131,462 @@ class LLMService:
         prompt = self._default_quiz_prompt(topic_name, num_questions, difficulty)
         return self.generate_quiz_with_prompt(topic_name, num_questions, prompt)
     
-    def explain_answer(self, question, user_answer, correct_answer, topic):
+    def explain_answer(self, question, user_answer, correct_answer, topic, bypass_cache=False, timeout=None):
         """
         Generate explanation for why an answer is correct/incorrect
         Used by Assessment Agent
         """
-        prompt = f"""
+        prompt = self._explanation_prompt(question, user_answer, correct_answer, topic)
+        
+        try:
+            return self._generate(prompt, 'explanation', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating explanation: {e}")
+            return self._get_fallback_explanation(user_answer, correct_answer, topic)
+    
+    def explain_answers_batch(self, answers, topic, bypass_cache=False, timeout=None):
+        """
+        Explain a whole quiz submission with one LLM call
+        
+        Args:
+            answers: list of dicts with {'question', 'user_answer', 'correct_answer'}
+            topic: str - Topic name
+        
+        Returns:
+            list - One explanation per answer, in order. Items missing from the
+            batch output are explained individually (concurrently).
+        """
+        # On the runner's loop: no event loop per submission, and callers already on one are fine
+        return self.runner.orchestrate(lambda: self.aexplain_answers_batch(
+            answers, topic, bypass_cache=bypass_cache, timeout=timeout
+        ))
+    
+    def generate_study_tips(self, weak_topics, strong_topics, bypass_cache=False, timeout=None):
+        """
+        Generate personalized study recommendations
+        Used by Recommendation Agent and dashboard
+        """
+        prompt = self._study_tips_prompt(weak_topics, strong_topics)
+        
+        try:
+            return self._generate(prompt, 'tips', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating tips: {e}")
+            return self._get_fallback_tips()
+    
+    # ============ STREAMING METHODS ============
+    
+    def stream_lesson_with_prompt(self, topic_name, difficulty, knowledge_level, custom_prompt=None,
+                                  bypass_cache=False, timeout=None):
+        """
+        Stream lesson text as the model generates it (for Teaching Agent)
+        
+        Args: same as generate_lesson_with_prompt; timeout bounds the whole stream
+        
+        Yields:
+            str - Lesson text chunks; the fallback lesson if the model fails before producing output
+        """
+        prompt = custom_prompt or self._default_lesson_prompt(topic_name, difficulty, knowledge_level)
+        produced = False
+        
+        try:
+            for chunk in self._stream(prompt, 'lesson', bypass_cache=bypass_cache, timeout=timeout):
+                produced = True
+                yield chunk
+        except Exception as e:
+            print(f"Error streaming lesson: {e}")
+            if not produced:
+                yield self._get_fallback_lesson(topic_name, difficulty)
+    
+    def stream_quiz_with_prompt(self, topic_name, num_questions, custom_prompt=None, bypass_cache=False,
+                                timeout=None):
+        """
+        Stream quiz questions one at a time as each JSON object completes (for Assessment Agent)
+        
+        Args: same as generate_quiz_with_prompt; timeout bounds the whole stream
+        
+        Yields:
+            dict - Quiz questions; the sample quiz if the model fails before producing a question
+        """
+        prompt = custom_prompt or self._default_quiz_prompt(topic_name, num_questions)
+        parser = IncrementalQuizParser()
+        produced = 0
+        
+        try:
+            for chunk in self._stream(prompt, 'quiz', bypass_cache=bypass_cache, parse=self._parse_quiz,
+                                      timeout=timeout):
+                for question in parser.feed(chunk):
+                    produced += 1
+                    yield question
+            for question in parser.close():
+                produced += 1
+                yield question
+        except Exception as e:
+            print(f"Error streaming quiz: {e}")
+        
+        if not produced:
+            yield from self._get_fallback_quiz(topic_name, 'intermediate', num_questions)
+    
+    # ============ ASYNC METHODS ============
+    # Same contracts as the sync methods above; every call shares the
+    # process-wide concurrency limit of the async runner.
+    
+    async def agenerate_lesson_with_prompt(self, topic_name, difficulty, knowledge_level, custom_prompt=None,
+                                           bypass_cache=False, timeout=None):
+        """Async counterpart of generate_lesson_with_prompt"""
+        prompt = custom_prompt or self._default_lesson_prompt(topic_name, difficulty, knowledge_level)
+        
+        try:
+            return await self._agenerate(prompt, 'lesson', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating lesson: {e}")
+            return self._get_fallback_lesson(topic_name, difficulty)
+    
+    async def agenerate_quiz_with_prompt(self, topic_name, num_questions, custom_prompt=None, bypass_cache=False,
+                                         timeout=None):
+        """Async counterpart of generate_quiz_with_prompt"""
+        prompt = custom_prompt or self._default_quiz_prompt(topic_name, num_questions)
+        
+        try:
+            return await self._agenerate(prompt, 'quiz', bypass_cache=bypass_cache, parse=self._parse_quiz,
+                                         timeout=timeout)
+        except Exception as e:
+            print(f"Error generating quiz: {e}")
+            return self._get_fallback_quiz(topic_name, 'intermediate', num_questions)
+    
+    async def agenerate_hint_with_context(self, question, context, hint_level='moderate', bypass_cache=False,
+                                          timeout=None):
+        """Async counterpart of generate_hint_with_context"""
+        prompt = self._hint_prompt(question, context, hint_level)
+        
+        try:
+            return await self._agenerate(prompt, 'hint', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating hint: {e}")
+            return self._get_fallback_hint()
+    
+    async def agenerate_text(self, prompt, task='text', bypass_cache=False, timeout=None):
+        """Async counterpart of generate_text (raises on failure)"""
+        return await self._agenerate(prompt, task, bypass_cache=bypass_cache, timeout=timeout)
+    
+    async def aexplain_answer(self, question, user_answer, correct_answer, topic, bypass_cache=False,
+                              timeout=None):
+        """Async counterpart of explain_answer"""
+        prompt = self._explanation_prompt(question, user_answer, correct_answer, topic)
+        
+        try:
+            return await self._agenerate(prompt, 'explanation', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating explanation: {e}")
+            return self._get_fallback_explanation(user_answer, correct_answer, topic)
+    
+    async def aexplain_answers_batch(self, answers, topic, bypass_cache=False, timeout=None):
+        """Async counterpart of explain_answers_batch"""
+        if not answers:
+            return []
+        
+        explanations = {}
+        try:
+            explanations = await self._agenerate(
+                self._batch_explanation_prompt(answers, topic),
+                'explanations_batch',
+                bypass_cache=bypass_cache,
+                parse=lambda text: self._parse_batch_explanations(text, len(answers)),
+                timeout=timeout
+            )
+        except Exception as e:
+            print(f"Error generating batch explanation: {e}")
+        
+        missing = [i for i in range(len(answers)) if i not in explanations]
+        fallbacks = await asyncio.gather(*[
+            self.aexplain_answer(
+                answers[i]['question'], answers[i]['user_answer'], answers[i]['correct_answer'],
+                topic, bypass_cache=bypass_cache, timeout=timeout
+            )
+            for i in missing
+        ])
+        explanations.update(zip(missing, fallbacks))
+        
+        return [explanations[i] for i in range(len(answers))]
+    
+    async def agenerate_study_tips(self, weak_topics, strong_topics, bypass_cache=False, timeout=None):
+        """Async counterpart of generate_study_tips"""
+        prompt = self._study_tips_prompt(weak_topics, strong_topics)
+        
+        try:
+            return await self._agenerate(prompt, 'tips', bypass_cache=bypass_cache, timeout=timeout)
+        except Exception as e:
+            print(f"Error generating tips: {e}")
+            return self._get_fallback_tips()
+    
+    def get_cache_stats(self):
+        """Return response cache counters (None when caching is disabled)"""
+        return self.cache.get_stats() if self.cache else None
+    
+    def get_runner_stats(self):
+        """Return concurrency counters of the shared async runner"""
+        return self.runner.get_stats()
+    
+    def get_resilience_stats(self):
+        """Return circuit breaker state, latency percentiles and adaptive timeouts"""
+        return self.resilience.get_status()
+    
+    # ============ PRIVATE HELPER METHODS ============
+    
+    def _generate(self, prompt, task, bypass_cache=False, parse=None, timeout=None):
+        """
+        Single entry point for sync model calls, backed by the response cache
+        
+        Args:
+            prompt: str - Prompt to send
+            task: str - Kind of output expected (lesson, quiz, hint, ...), passed to the provider
+            bypass_cache: bool - Skip the lookup; the fresh response still refreshes the cache
+            parse: callable - Optional parser; responses that fail to parse are not cached
+            timeout: float - Per-call timeout in seconds (default: adaptive, see LLMResilience)
+        
+        Returns:
+            Response text, or parse(text) when a parser is given
+        
+        Raises:
+            CircuitOpenError immediately while the provider is unhealthy
+        """
+        parse = parse or (lambda text: text)
+        with tracing.span('llm', task=task, model=self.model_name) as span:
+            key, cached = self._cache_lookup(prompt, bypass_cache)
+            if cached is not None:
+                span.tag(cache='hit')
+                return parse(cached)
+            
+            self.resilience.before_call()
+            timeout = self.resilience.timeout_for(task, timeout)
+            span.tag(cache='miss', timeout_s=round(timeout, 2))
+            
+            # Identical prompts already in flight share one upstream call
+            started = time.perf_counter()
+            text = self.runner.run(lambda: self._afetch(prompt, task, key, parse, timeout), timeout=timeout, key=key)
+            tracing.record_latency('LLMService', task, time.perf_counter() - started)
+            return parse(text)
+    
+    async def _agenerate(self, prompt, task, bypass_cache=False, parse=None, timeout=None):
+        """Async entry point for model calls (see _generate)"""
+        parse = parse or (lambda text: text)
+        with tracing.span('llm', task=task, model=self.model_name) as span:
+            key, cached = self._cache_lookup(prompt, bypass_cache)
+            if cached is not None:
+                span.tag(cache='hit')
+                return parse(cached)
+            
+            self.resilience.before_call()
+            timeout = self.resilience.timeout_for(task, timeout)
+            span.tag(cache='miss', timeout_s=round(timeout, 2))
+            
+            started = time.perf_counter()
+            text = await self.runner.arun(lambda: self._afetch(prompt, task, key, parse, timeout), timeout=timeout, key=key)
+            tracing.record_latency('LLMService', task, time.perf_counter() - started)
+            return parse(text)
+    
+    async def _afetch(self, prompt, task, key, parse, timeout):
+        """
+        Upstream call shared by every coalesced caller: validates the response
+        once and stores it in the cache once
+        """
+        text = await self.resilience.call(
+            task,
+            lambda: self.provider.agenerate(prompt, self.generation_config, task),
+            timeout=timeout
+        )
+        parse(text)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, text)
+        return text
+    
+    def _stream(self, prompt, task, bypass_cache=False, parse=None, timeout=None):
+        """
+        Streaming entry point; holds one runner slot while chunks arrive and
+        caches the full text once the stream completes (and passes parse, if given).
+        The timeout bounds the whole stream, a provider stalled mid-response included.
+        """
+        key, cached = self._cache_lookup(prompt, bypass_cache)
+        if cached is not None:
+            yield cached
+            return
+        
+        # Streams are tracked separately: their latency covers the whole response
+        stream_task = f"{task}_stream"
+        self.resilience.before_call()
+        timeout = self.resilience.timeout_for(stream_task, timeout)
+        started = time.monotonic()
+        deadline = started + timeout
+        parts = []
+        
+        try:
+            with self.runner.slot(timeout=timeout):
+                chunks = self.provider.stream(prompt, self.generation_config, task)
+                for text in self._until_deadline(chunks, deadline, timeout):
+                    parts.append(text)
+                    yield text
+        except LLMTimeoutError:
+            self.resilience.record_timeout(stream_task)
+            raise
+        except GeneratorExit:
+            raise  # the client went away; says nothing about the provider
+        except Exception:
+            self.resilience.record_failure(stream_task)
+            raise
+        self.resilience.record_success(stream_task, time.monotonic() - started)
+        
+        # A generator can't hold a span open across yields, so it is recorded afterwards
+        elapsed = time.monotonic() - started
+        tracing.record_latency('LLMService', stream_task, elapsed)
+        ended = time.perf_counter()
+        tracing.record_span('llm.stream', ended - elapsed, ended, task=task, model=self.model_name,
+                            chunks=len(parts))
+        
+        text = ''.join(parts)
+        if parse is not None:
+            try:
+                parse(text)
+            except Exception:
+                return
+        self._cache_store(key, text)
+    
+    def _until_deadline(self, chunks, deadline, timeout):
+        """
+        Yield from a blocking chunk iterator, raising LLMTimeoutError at the
+        deadline even while the provider is stalled mid-response: chunks are
+        read on a helper thread and waited for with a timeout. The helper
+        stops at its next chunk once the stream is abandoned.
+        """
+        received = queue.Queue()
+        abandoned = threading.Event()
+        finished = object()
+        
+        def pump():
+            try:
+                for chunk in chunks:
+                    if abandoned.is_set():
+                        break
+                    received.put((chunk, None))
+                received.put((finished, None))
+            except Exception as e:
+                received.put((None, e))
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+        
+        threading.Thread(target=pump, name='llm-stream', daemon=True).start()
+        try:
+            while True:
+                try:
+                    chunk, error = received.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise LLMTimeoutError(f"LLM stream exceeded {timeout}s")
+                if error is not None:
+                    raise error
+                if chunk is finished:
+                    return
+                yield chunk
+        finally:
+            abandoned.set()
+    
+    def _cache_lookup(self, prompt, bypass_cache):
+        """Return (key, cached_text); the key also identifies the call for single-flight"""
+        key = ResponseCache.make_key(self.model_name, prompt, self.generation_config)
+        
+        if self.cache is None:
+            return key, None
+        
+        if bypass_cache:
+            self.cache.record_bypass()
+            return key, None
+        return key, self.cache.get(key)
+    
+    def _cache_store(self, key, text):
+        if self.cache is not None:
+            self.cache.set(key, text)
+    
+    def _extract_json(self, text):
+        """Parse the JSON payload of a response, with or without a code fence"""
+        text = text.strip()
+        
+        if '```json' in text:
+            text = text.split('```json')[1].split('```')[0]
+        elif '```' in text:
+            text = text.split('```')[1].split('```')[0]
+        
+        return json.loads(text.strip())
+    
+    def _parse_quiz(self, text):
+        """
+        Recover the quiz questions from a response, tolerating prose around the
+        array, trailing commas and a truncated final question
+        """
+        questions = parse_quiz_text(text)
+        
+        if questions:
+            return questions
+        raise ValueError("No valid questions in quiz response")
+    
+    def _parse_batch_explanations(self, text, count):
+        """
+        Map a batch explanation response back to answer positions
+        
+        Returns:
+            dict - {answer_index: explanation}; malformed items are left out
+        
+        Raises:
+            ValueError if no item could be recovered
+        """
+        items = self._extract_json(text)
+        if not isinstance(items, list):
+            raise ValueError("Invalid JSON structure")
+        
+        explanations = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            
+            explanation = item.get('explanation')
+            try:
+                index = int(item.get('index', position + 1)) - 1
+            except (TypeError, ValueError):
+                continue
+            
+            if isinstance(explanation, str) and explanation.strip() and 0 <= index < count:
+                explanations.setdefault(index, explanation.strip())
+        
+        if not explanations:
+            raise ValueError("No usable explanations in batch response")
+        return explanations
+    
+    def _hint_prompt(self, question, context, hint_level):
+        """Hint prompt structure"""
+        challenge = context.get('challenge', '')
+        attempt_count = context.get('attempt_count', 1)
+        
+        hint_instructions = {
+            'subtle': 'Provide a gentle nudge without revealing the solution. Ask guiding questions.',
+            'moderate': 'Explain the concept and provide a partial solution or approach.',
+            'detailed': 'Provide clear explanation with example code, but encourage student to try.'
+        }
+        
+        return f"""
+        You are a supportive programming tutor.
+        
+        STUDENT CONTEXT:
+        - Question: {question}
+        - Challenge: {challenge}
+        - Previous attempts: {attempt_count}
+        
+        INSTRUCTIONS:
+        {hint_instructions.get(hint_level, hint_instructions['moderate'])}
+        
+        Be encouraging and educational. Keep response 2-4 sentences.
+        """
+    
+    def _explanation_prompt(self, question, user_answer, correct_answer, topic):
+        """Answer explanation prompt structure"""
+        return f"""
         Topic: {topic}
         Question: {question}
         Student's Answer: {user_answer}
@@ -172,29 +599,42 @@ class LLMService:
         
         Be supportive and educational.
         """
-        
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            return response.text
-        except Exception as e:
-            print(f"Error generating explanation: {e}")
-            if user_answer == correct_answer:
-                return f"Correct! The answer {correct_answer} demonstrates your understanding of {topic}."
-            else:
-                return f"The correct answer is {correct_answer}. Review the key concepts of {topic} to strengthen your understanding."
     
-    def generate_study_tips(self, weak_topics, strong_topics):
-        """
-        Generate personalized study recommendations
-        Used by Recommendation Agent and dashboard
+    def _batch_explanation_prompt(self, answers, topic):
+        """Prompt explaining every answer of a quiz submission at once"""
+        answer_lines = '\n'.join(
+            f"""
+        {i}. Question: {a['question']}
+           Student's Answer: {a['user_answer']}
+           Correct Answer: {a['correct_answer']}"""
+            for i, a in enumerate(answers, start=1)
+        )
+        
+        return f"""
+        Topic: {topic}
+        
+        A student submitted the following quiz answers:
+        {answer_lines}
+        
+        For EACH answer, provide a clear, encouraging explanation (2-3 sentences) about:
+        1. Why the correct answer is right
+        2. If wrong, what misconception the student might have
+        3. A tip to remember this concept
+        
+        Return ONLY a JSON array with one object per answer, in the same order:
+        [
+            {{"index": 1, "explanation": "..."}}
+        ]
+        
+        NO other text. Just the JSON.
         """
+    
+    def _study_tips_prompt(self, weak_topics, strong_topics):
+        """Study tips prompt structure"""
         weak_str = ', '.join(weak_topics) if weak_topics else 'None'
         strong_str = ', '.join(strong_topics) if strong_topics else 'None'
         
-        prompt = f"""
+        return f"""
         Based on a student's performance:
         
         Weak areas: {weak_str}
@@ -211,18 +651,6 @@ class LLMService:
         
         Format as simple bullet points with dashes.
         """
-        
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            return response.text
-        except Exception as e:
-            print(f"Error generating tips: {e}")
-            return "- Practice regularly with focused study sessions\n- Review weak topics daily\n- Build on your strengths\n- Take breaks to avoid burnout\n- Track your progress"
-    
-    # ============ PRIVATE HELPER METHODS ============
     
     def _default_lesson_prompt(self, topic_name, difficulty, knowledge_level):
         """Default lesson prompt structure"""
@@ -326,4 +754,19 @@ class LLMService:
                 "correct_answer": "A",
                 "explanation": f"This is a sample question for {topic_name}. Practice with real content by ensuring your API connection is working."
             })
-        return questions
\ No newline at end of file
+        return questions
+    
+    def _get_fallback_hint(self):
+        """Fallback hint when API fails"""
+        return "Think about what you've learned. Break the problem into smaller steps!"
+    
+    def _get_fallback_explanation(self, user_answer, correct_answer, topic):
+        """Fallback explanation when API fails"""
+        if user_answer == correct_answer:
+            return f"Correct! The answer {correct_answer} demonstrates your understanding of {topic}."
+        else:
+            return f"The correct answer is {correct_answer}. Review the key concepts of {topic} to strengthen your understanding."
+    
+    def _get_fallback_tips(self):
+        """Fallback study tips when API fails"""
+        return "- Practice regularly with focused study sessions\n- Review weak topics daily\n- Build on your strengths\n- Take breaks to avoid burnout\n- Track your progress"
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Migrations - Versioned, in-place upgrades of existing databases
+
+db.create_all() adds missing tables but never changes a table that already
+exists, so indexes and constraints declared in models.py after a database
+was created never reach it. Each migration below upgrades an existing
+database by one version and is recorded in the schema_migration table;
+upgrade() runs the ones a database hasn't had yet, in order, each in its own
+transaction. init_db calls it after create_all, so a fresh database goes
+through the same steps (they are no-ops there).
+
+Usage: python migrations.py [--status]
+"""
+from datetime import datetime
+from models import db, KnowledgeState, LearningSession, QuizAttempt, SchemaMigration, TopicPrerequisite
+from sqlalchemy import inspect
+import sys
+
+MIGRATIONS = []  # (version, name, function(connection)), in version order
+
+
+def migration(version, name):
+    """Register a migration; versions must be added in increasing order and never change once released"""
+    def register(function):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, "migration versions must increase"
+        MIGRATIONS.append((version, name, function))
+        return function
+    return register
+
+
+# ============ MIGRATIONS ============
+
+@migration(1, "Merge duplicate knowledge states")
+def merge_duplicate_knowledge_states(conn):
+    """
+    Without a unique constraint, concurrent first practice could create two
+    states for one user and topic. Keep the most recently practiced one and
+    give it the practice count of all of them.
+    """
+    states = KnowledgeState.__table__
+    duplicates = conn.execute(
+        db.select(states.c.user_id, states.c.topic_id)
+        .group_by(states.c.user_id, states.c.topic_id)
+        .having(db.func.count() > 1)
+    ).all()
+
+    for user_id, topic_id in duplicates:
+        rows = conn.execute(
+            db.select(states.c.id, states.c.practice_count)
+            .where(states.c.user_id == user_id, states.c.topic_id == topic_id)
+            .order_by(states.c.last_practiced.desc(), states.c.id.desc())
+        ).all()
+        keep = rows[0].id
+        conn.execute(db.update(states).where(states.c.id == keep).values(
+            practice_count=sum(row.practice_count or 0 for row in rows)
+        ))
+        conn.execute(db.delete(states).where(states.c.id.in_([row.id for row in rows[1:]])))
+
+
+@migration(2, "Unique knowledge state per user and topic; user and topic indexes")
+def add_lookup_indexes(conn):
+    for model, names in (
+        (KnowledgeState, ['uq_knowledge_state_user_topic']),
+        (QuizAttempt, ['ix_quiz_attempt_user_created', 'ix_quiz_attempt_topic_user_created']),
+        (LearningSession, ['ix_learning_session_user_created'])
+    ):
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+
+@migration(3, "Prerequisites from topic.prerequisites into topic_prerequisite")
+def copy_topic_prerequisites(conn):
+    """
+    Topics used to list their prerequisites as comma-separated ids. The old
+    column is left in place (SQLite can't always drop it) but nothing reads
+    it after this.
+    """
+    if 'prerequisites' not in {column['name'] for column in inspect(conn).get_columns('topic')}:
+        return  # created after the column was removed
+
+    topics = dict(conn.exec_driver_sql('SELECT id, prerequisites FROM topic').all())
+    existing = set(conn.execute(db.select(TopicPrerequisite.topic_id, TopicPrerequisite.prerequisite_id)).all())
+    rows = []
+    for topic_id, prerequisites in topics.items():
+        for value in (prerequisites or '').split(','):
+            value = value.strip()
+            pair = (topic_id, int(value)) if value.isdigit() else None
+            if pair and pair[1] in topics and pair[1] != topic_id and pair not in existing:
+                existing.add(pair)
+                rows.append({'topic_id': pair[0], 'prerequisite_id': pair[1]})
+    if rows:
+        conn.execute(db.insert(TopicPrerequisite), rows)
+
+
+# ============ RUNNER ============
+
+def applied_versions(conn):
+    return set(conn.execute(db.select(SchemaMigration.version)).scalars())
+
+
+def upgrade():
+    """Apply pending migrations in order (needs an app context); returns the names applied"""
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    with db.engine.connect() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, function in MIGRATIONS:
+        if version in done:
+            continue
+        # One transaction per migration: a failure leaves the database at the previous version
+        with db.engine.begin() as conn:
+            function(conn)
+            conn.execute(db.insert(SchemaMigration).values(version=version, name=name, applied_at=datetime.utcnow()))
+        print(f"Applied migration {version}: {name}")
+        applied.append(name)
+    return applied
+
+
+def main(args):
+    from app import app
+
+    with app.app_context():
+        if '--status' not in args:
+            db.create_all()
+            upgrade()
+
+        SchemaMigration.__table__.create(db.engine, checkfirst=True)
+        with db.engine.connect() as conn:
+            done = applied_versions(conn)
+        for version, name, _ in MIGRATIONS:
+            print(f"  {version:>3} {'applied' if version in done else 'pending':<8} {name}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
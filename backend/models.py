@@ -19,10 +19,15 @@ class Topic(db.Model):
     category = db.Column(db.String(50), nullable=False)
     difficulty = db.Column(db.String(20), nullable=False)
     description = db.Column(db.Text)
-    prerequisites = db.Column(db.String(200))  # Comma-separated topic IDs
+    # Prerequisites are TopicPrerequisite rows (older databases also have a comma-separated
+    # prerequisites column, copied over by migrations.py and no longer read)
     
     knowledge_states = db.relationship('KnowledgeState', backref='topic', lazy=True)
 
+class TopicPrerequisite(db.Model):
+    topic_id = db.Column(db.Integer, db.ForeignKey('topic.id'), primary_key=True)
+    prerequisite_id = db.Column(db.Integer, db.ForeignKey('topic.id'), primary_key=True)  # learned before topic_id
+
 class KnowledgeState(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -32,6 +37,9 @@ class KnowledgeState(db.Model):
     last_practiced = db.Column(db.DateTime, default=datetime.utcnow)
     practice_count = db.Column(db.Integer, default=0)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # One state per user and topic; also the index for per-user lookups (migrations.py adds it to older databases)
+    __table_args__ = (db.Index('uq_knowledge_state_user_topic', 'user_id', 'topic_id', unique=True),)
 
 class LearningSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -41,6 +49,8 @@ class LearningSession(db.Model):
     difficulty = db.Column(db.String(20))
     duration = db.Column(db.Integer)  # in seconds
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_learning_session_user_created', 'user_id', 'created_at'),)
 
 class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -52,4 +62,64 @@ class QuizAttempt(db.Model):
     is_correct = db.Column(db.Boolean)
     difficulty = db.Column(db.String(20))
     time_taken = db.Column(db.Integer)  # in seconds
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_user_created', 'user_id', 'created_at'),  # a user's latest attempts
+        db.Index('ix_quiz_attempt_topic_user_created', 'topic_id', 'user_id', 'created_at'),  # one topic's history
+    )
+
+class TopicParameters(db.Model):
+    topic_id = db.Column(db.Integer, db.ForeignKey('topic.id'), primary_key=True)  # written by fit_parameters.py
+    learning_rate = db.Column(db.Float, nullable=False)
+    forgetting_rate = db.Column(db.Float, nullable=False)  # per day
+    attempts = db.Column(db.Integer)  # quiz attempts the fit saw
+    brier_score = db.Column(db.Float)  # next-answer error with these rates
+    baseline_brier_score = db.Column(db.Float)  # same, with the Config defaults
+    fitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ProgressSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)  # maintained by progress_summary.py
+    topic_count = db.Column(db.Integer, default=0)  # knowledge states
+    level_sum = db.Column(db.Float, default=0.0)  # of effective levels
+    topics_mastered = db.Column(db.Integer, default=0)
+    topics_in_progress = db.Column(db.Integer, default=0)
+    weak_count = db.Column(db.Integer, default=0)  # weak or not started
+    total_practice_count = db.Column(db.Integer, default=0)
+    weak_topics = db.Column(db.Text)  # JSON [[topic_id, name, level], ...], weakest first
+    strong_topics = db.Column(db.Text)  # JSON, mastered topics, strongest first
+    valid_until = db.Column(db.DateTime)  # next time a level decays; rebuilt after that
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReviewSchedule(db.Model):
+    # Maintained by review_queue.py; one row per practiced (user, topic)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topic.id'), primary_key=True)
+    level = db.Column(db.Float, nullable=False)  # knowledge level right after practice
+    practiced_at = db.Column(db.DateTime, nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)  # review due from here...
+    lapses_at = db.Column(db.DateTime, nullable=False)  # ...until decay makes it a knowledge gap
+    
+    # "Who has reviews due" scans only rows that haven't lapsed yet
+    __table_args__ = (db.Index('ix_review_schedule_live', 'lapses_at', 'due_at', 'user_id'),)
+
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True)  # applied by migrations.py
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, handed to the client
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    task = db.Column(db.String(50), nullable=False)  # coordinator task
+    params = db.Column(db.Text)  # JSON context passed to the coordinator
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued | running | succeeded | failed | cancelled
+    progress = db.Column(db.Text)  # JSON {step: {status, at}}
+    result = db.Column(db.Text)  # JSON results of finished steps, then the full result
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
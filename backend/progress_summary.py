@@ -0,0 +1,169 @@
+"""
+Progress Summary - Per-user progress summary, updated as knowledge changes
+"""
+from datetime import datetime, timedelta
+from knowledge_tracker import effective_levels
+from models import db, KnowledgeState, ProgressSummary, Topic
+from services import registry
+from sqlalchemy.exc import IntegrityError
+import bisect
+import heapq
+import json
+import numpy as np
+
+MASTERED = 0.8  # level at which a topic counts as mastered (strong)
+WEAK = 0.3  # level at or below which a topic counts as weak
+SHOWN = 5  # weak/strong topics in a summary
+KEPT = 10  # kept per list, so one topic leaving it rarely forces a rebuild
+
+
+class ProgressSummaries:
+    """
+    One ProgressSummary row per user: averages, counts and the weakest and
+    strongest topics (with names), as of the effective knowledge levels.
+
+    KnowledgeTracker.apply_attempts reports every change through record(),
+    which adjusts the row in place; get() is then a single primary-key read.
+    Levels also decay with time, but only at whole-day steps, so a row stays
+    exact until valid_until, the next step of any of the user's topics.
+    A row past that, missing, or invalidated (a new knowledge state) is
+    rebuilt from the user's knowledge states with one query.
+    """
+
+    # ============ READ ============
+
+    def get(self, user_id, now=None):
+        """The user's progress summary as returned by /api/progress-summary"""
+        now = now or datetime.utcnow()
+        row = db.session.get(ProgressSummary, user_id)
+        if row is not None and not self._stale(row, now):
+            return self.to_dict(row)
+
+        row = self._rebuild(user_id, row, now)
+        summary = self.to_dict(row)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request created the row first; it is just as good
+            db.session.rollback()
+        return summary
+
+    @staticmethod
+    def to_dict(row):
+        return {
+            'average_knowledge': round(row.level_sum / row.topic_count, 2) if row.topic_count else 0,
+            'topics_mastered': row.topics_mastered,
+            'topics_in_progress': row.topics_in_progress,
+            'total_practice_count': row.total_practice_count,
+            'weak_topics': [
+                {'id': topic_id, 'name': name, 'level': round(level, 2)}
+                for topic_id, name, level in json.loads(row.weak_topics or '[]')[:SHOWN]
+            ],
+            'strong_topics': [
+                {'id': topic_id, 'name': name, 'level': round(level, 2)}
+                for topic_id, name, level in json.loads(row.strong_topics or '[]')[:SHOWN]
+            ]
+        }
+
+    # ============ UPDATE ============
+
+    def record(self, user_id, topic_id, old_level, new_level, practiced, now):
+        """
+        One knowledge state moved from old_level to new_level (both effective
+        at now) after `practiced` more answers. Runs in the caller's
+        transaction; nothing is committed.
+        """
+        row = db.session.get(ProgressSummary, user_id)
+        if row is None or self._stale(row, now):
+            self._rebuild(user_id, row, now)
+            return
+
+        row.level_sum += new_level - old_level
+        row.total_practice_count += practiced
+        row.topics_mastered += (new_level >= MASTERED) - (old_level >= MASTERED)
+        row.topics_in_progress += (0 < new_level < MASTERED) - (0 < old_level < MASTERED)
+        row.weak_count += (new_level <= WEAK) - (old_level <= WEAK)
+
+        # The practiced topic doesn't decay for a day; the others keep their schedule
+        row.valid_until = min(row.valid_until, now + timedelta(days=1))
+
+        name = None
+        lists = {}
+        for column, qualifies, count, sign in (
+            ('weak_topics', new_level <= WEAK, row.weak_count, 1),
+            ('strong_topics', new_level >= MASTERED, row.topics_mastered, -1)
+        ):
+            entries = [entry for entry in json.loads(getattr(row, column) or '[]') if entry[0] != topic_id]
+            complete = len(entries) == count - qualifies  # every qualifying topic but this one is listed
+
+            if qualifies and (complete or (entries and sign * new_level <= sign * entries[-1][2])):
+                name = name or db.session.get(Topic, topic_id).name
+                keys = [(sign * entry[2], entry[0]) for entry in entries]
+                entries.insert(bisect.bisect(keys, (sign * new_level, topic_id)), [topic_id, name, new_level])
+
+            if len(entries) < min(SHOWN, count):
+                # Too few known entries left to fill the list
+                self._rebuild(user_id, row, now)
+                return
+            lists[column] = entries[:KEPT]
+
+        row.weak_topics = json.dumps(lists['weak_topics'])
+        row.strong_topics = json.dumps(lists['strong_topics'])
+
+    def invalidate(self, user_id):
+        """Force a rebuild on next use (a knowledge state was added)"""
+        row = db.session.get(ProgressSummary, user_id)
+        if row is not None:
+            row.valid_until = None
+
+    # ============ REBUILD ============
+
+    @staticmethod
+    def _stale(row, now):
+        return row.valid_until is None or row.valid_until <= now
+
+    def _rebuild(self, user_id, row, now):
+        """Recompute a user's summary from their knowledge states (added to the session, not committed)"""
+        states = db.session.query(
+            KnowledgeState.topic_id, Topic.name, KnowledgeState.knowledge_level,
+            KnowledgeState.last_practiced, KnowledgeState.practice_count
+        ).join(Topic, Topic.id == KnowledgeState.topic_id).filter(KnowledgeState.user_id == user_id).all()
+
+        if row is None:
+            row = ProgressSummary(user_id=user_id)
+            db.session.add(row)
+
+        topic_ids = [state.topic_id for state in states]
+        rates = registry.get('topic_parameters').forgetting_rates(topic_ids)
+        anchors = [state.last_practiced or now for state in states]
+        levels = effective_levels([state.knowledge_level for state in states], anchors, now, rates).tolist() if states else []
+        entries = [(state.topic_id, state.name, level) for state, level in zip(states, levels)]
+
+        row.topic_count = len(entries)
+        row.level_sum = float(sum(levels))
+        row.topics_mastered = sum(1 for level in levels if level >= MASTERED)
+        row.topics_in_progress = sum(1 for level in levels if 0 < level < MASTERED)
+        row.weak_count = sum(1 for level in levels if level <= WEAK)
+        row.total_practice_count = sum(state.practice_count or 0 for state in states)
+        row.weak_topics = json.dumps([
+            list(entry) for entry in heapq.nsmallest(
+                KEPT, (entry for entry in entries if entry[2] <= WEAK), key=lambda entry: (entry[2], entry[0])
+            )
+        ])
+        row.strong_topics = json.dumps([
+            list(entry) for entry in heapq.nsmallest(
+                KEPT, (entry for entry in entries if entry[2] >= MASTERED), key=lambda entry: (-entry[2], entry[0])
+            )
+        ])
+        row.valid_until = self._next_decay(states, anchors, rates, now)
+        return row
+
+    @staticmethod
+    def _next_decay(states, anchors, rates, now):
+        """When the first decaying level takes its next whole-day step (a day from now at most)"""
+        until = now + timedelta(days=1)
+        for state, anchor, rate in zip(states, anchors, np.atleast_1d(rates).tolist() if states else []):
+            if state.knowledge_level > 0 and rate > 0:
+                days = max((now - anchor) // timedelta(days=1), 0)
+                until = min(until, anchor + timedelta(days=days + 1))
+        return until
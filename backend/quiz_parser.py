@@ -0,0 +1,199 @@
+"""
+Quiz Parser - Incremental, tolerant parsing of LLM quiz output
+"""
+import json
+import re
+
+
+REQUIRED_FIELDS = ('question', 'options', 'correct_answer')
+
+
+class IncrementalQuizParser:
+    """
+    Extracts question objects from a quiz response while it is still streaming.
+
+    Every top-level {...} object is yielded as soon as its closing brace
+    arrives, so the first question is available long before the array ends.
+    Text outside objects (code fences, "Here is your quiz:" prose, the
+    enclosing [ ] and commas) is ignored. Common defects are repaired:
+    trailing commas, raw newlines inside strings and a truncated final item.
+    """
+
+    def __init__(self):
+        self._buffer = []       # characters of the object being read
+        self._depth = 0         # {} / [] nesting inside the current object
+        self._in_string = False
+        self._escape = False
+        self.skipped = 0        # objects that could not be repaired or were not questions
+
+    def feed(self, chunk):
+        """
+        Consume more response text
+
+        Returns:
+            list - Question dicts completed by this chunk
+        """
+        questions = []
+
+        for char in chunk:
+            if self._depth == 0:
+                if char == '{':
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    question = self._finish(''.join(self._buffer), truncated=False)
+                    if question is not None:
+                        questions.append(question)
+
+        return questions
+
+    def close(self):
+        """
+        Signal end of output; salvages a truncated final question if it
+        already has the required fields
+
+        Returns:
+            list - Zero or one question dict
+        """
+        if self._depth == 0:
+            return []
+
+        text = ''.join(self._buffer)
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+        question = self._finish(text, truncated=True)
+        return [question] if question is not None else []
+
+    def _finish(self, text, truncated):
+        obj = repair_json_object(text, truncated=truncated)
+        if is_valid_question(obj):
+            return obj
+        self.skipped += 1
+        return None
+
+
+def parse_quiz_text(text):
+    """Parse a complete quiz response; returns the list of recoverable questions"""
+    parser = IncrementalQuizParser()
+    return parser.feed(text) + parser.close()
+
+
+def is_valid_question(obj):
+    """A usable multiple-choice question"""
+    return (
+        isinstance(obj, dict)
+        and all(obj.get(field) for field in REQUIRED_FIELDS)
+        and isinstance(obj['options'], dict)
+    )
+
+
+def repair_json_object(text, truncated=False):
+    """
+    Best-effort json.loads for one object
+
+    Returns:
+        dict/list, or None if the text cannot be repaired
+    """
+    cleaned = _clean(text)
+    for candidate in ([cleaned] if not truncated else _truncation_candidates(cleaned)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _clean(text):
+    """Escape raw newlines inside strings and drop trailing commas"""
+    out = []
+    in_string = False
+    escape = False
+
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                out.append('\\n')
+                continue
+            out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+        out.append(char)
+
+    return re.sub(r',(\s*[}\]])', r'\1', ''.join(out))
+
+
+def _truncation_candidates(text):
+    """
+    Ways to close a cut-off object: as-is, then after dropping the incomplete
+    last member, each with open strings and brackets closed
+    """
+    yield _close_open(text)
+
+    cut = len(text)
+    while True:
+        cut = text.rfind(',', 0, cut)
+        if cut <= 0:
+            return
+        yield _close_open(text[:cut])
+
+
+def _close_open(text):
+    """Append the quotes and brackets needed to balance text"""
+    stack = []
+    in_string = False
+    escape = False
+
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+
+    closing = '"' if in_string else ''
+    if escape:
+        closing = '\\' + closing
+    text = (text + closing).rstrip()
+    if text.endswith(','):
+        text = text[:-1]
+    return text + ''.join(reversed(stack))
@@ -0,0 +1,144 @@
+"""
+Quiz Pool - Background pre-generation of quizzes per topic and knowledge band
+"""
+from collections import defaultdict, deque
+from config import Config
+from models import Topic
+import threading
+import time
+
+
+class QuizPool:
+    """
+    Keeps up to `target_size` ready-made quizzes for every (topic_id, band).
+
+    AssessmentAgent only produces three difficulty mixes (low/mid/high knowledge
+    bands), so the set of quiz shapes per topic is small enough to pre-generate.
+    A daemon thread, started by the first take(), refills slots as quizzes are
+    taken; take() never blocks on the LLM and returns None when a slot is empty
+    so the caller can fall back.
+    """
+
+    BANDS = ('low', 'mid', 'high')
+
+    def __init__(self, app, generator, target_size=None, refill_interval=None):
+        """
+        Args:
+            app: Flask app - Needed for DB access from the worker thread
+            generator: callable(topic, band) -> list of questions; should raise on failure
+            target_size: int - Quizzes kept per (topic_id, band)
+            refill_interval: float - Seconds between refill passes when nothing is taken
+        """
+        self.app = app
+        self.generator = generator
+        self.target_size = target_size or Config.QUIZ_POOL_SIZE
+        self.refill_interval = refill_interval or Config.QUIZ_POOL_REFILL_INTERVAL
+
+        self._pools = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'served': 0,
+            'misses': 0,
+            'generated': 0,
+            'failures': 0
+        }
+
+    # ============ PUBLIC API ============
+
+    def take(self, topic_id, band):
+        """Pop a ready quiz, or None if the slot is empty"""
+        self.start()
+        with self._lock:
+            pool = self._pools.get((topic_id, band))
+            quiz = pool.popleft() if pool else None
+            self.stats['served' if quiz is not None else 'misses'] += 1
+
+        # Either way the slot is now below target
+        self._wakeup.set()
+        return quiz
+
+    def start(self):
+        """Start the refill worker (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='quiz-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def get_status(self):
+        """Pool depth per topic and band, plus counters"""
+        with self._lock:
+            depths = defaultdict(dict)
+            for (topic_id, band), pool in self._pools.items():
+                depths[topic_id][band] = len(pool)
+            stats = dict(self.stats)
+
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'target_size': self.target_size,
+            'total_ready': sum(sum(bands.values()) for bands in depths.values()),
+            'depths': dict(depths),
+            'stats': stats
+        }
+
+    # ============ WORKER ============
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    self._refill_pass()
+            except Exception as e:
+                print(f"Error refilling quiz pool: {e}")
+                time.sleep(1)
+
+            self._wakeup.wait(self.refill_interval)
+            self._wakeup.clear()
+
+    def _refill_pass(self):
+        """Top every slot up to target, one quiz per slot per round so empty slots fill first"""
+        topics = Topic.query.all()
+
+        while not self._stopping.is_set():
+            deficits = [
+                (topic, band)
+                for topic in topics
+                for band in self.BANDS
+                if self._depth(topic.id, band) < self.target_size
+            ]
+            if not deficits:
+                return
+
+            deficits.sort(key=lambda slot: self._depth(slot[0].id, slot[1]))
+
+            for topic, band in deficits:
+                if self._stopping.is_set():
+                    return
+                try:
+                    quiz = self.generator(topic, band)
+                except Exception as e:
+                    print(f"Error pre-generating quiz for topic {topic.id} ({band}): {e}")
+                    with self._lock:
+                        self.stats['failures'] += 1
+                    return  # provider is struggling - wait for the next pass
+
+                with self._lock:
+                    self._pools[(topic.id, band)].append(quiz)
+                    self.stats['generated'] += 1
+
+    def _depth(self, topic_id, band):
+        with self._lock:
+            pool = self._pools.get((topic_id, band))
+            return len(pool) if pool else 0
@@ -0,0 +1,249 @@
+"""
+Review Queue - Due spaced-repetition reviews, indexed by due time
+"""
+from collections import OrderedDict
+from config import Config
+from datetime import datetime, timedelta
+from knowledge_tracker import effective_levels
+from models import db, KnowledgeState, ReviewSchedule
+from services import LazyService
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, ProgrammingError
+import heapq
+import math
+import threading
+import time
+
+REVIEW_AFTER_DAYS = 7  # a topic is due once more than this many whole days have passed...
+REVIEW_MIN_LEVEL = 0.3  # ...while its level is still above this (below it is a knowledge gap)
+NEVER = datetime(9999, 1, 1)  # lapses_at of a topic that doesn't decay
+
+
+def schedule(level, practiced_at, forgetting_rate):
+    """(due_at, lapses_at) of a topic practiced up to `level` at practiced_at"""
+    due_at = practiced_at + timedelta(days=REVIEW_AFTER_DAYS + 1)
+    if level <= REVIEW_MIN_LEVEL:
+        return due_at, practiced_at
+    if forgetting_rate <= 0:
+        return due_at, NEVER
+
+    # Levels decay in whole-day steps: the first day with level * exp(-rate * days) <= REVIEW_MIN_LEVEL
+    days = math.ceil(math.log(level / REVIEW_MIN_LEVEL) / forgetting_rate)
+    return due_at, practiced_at + timedelta(days=min(days, (NEVER - practiced_at).days))
+
+
+class _UserReviews:
+    """One user's schedule entries in a heap ordered by due_at"""
+
+    def __init__(self, entries, loaded_at):
+        self.heap = list(entries)  # (due_at, topic_id, level, practiced_at, lapses_at)
+        heapq.heapify(self.heap)
+        self.current = {entry[1]: entry for entry in self.heap}  # topic_id -> live entry
+        self.loaded_at = loaded_at
+
+    def push(self, entry):
+        # The topic's previous entry stays in the heap until compaction; current says it's stale
+        self.current[entry[1]] = entry
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.current) + 16:
+            self.heap = list(self.current.values())
+            heapq.heapify(self.heap)
+
+    def due(self, now):
+        """Live entries with due_at <= now, visiting only that part of the heap"""
+        due = []
+        stack = [0] if self.heap else []
+        while stack:
+            i = stack.pop()
+            entry = self.heap[i]
+            if entry[0] > now:
+                continue  # nothing below a not-yet-due entry is due either
+            if self.current.get(entry[1]) is entry and entry[4] > now:
+                due.append(entry)
+            stack.extend(child for child in (2 * i + 1, 2 * i + 2) if child < len(self.heap))
+        return due
+
+
+class ReviewQueue:
+    """
+    Topics due for spaced-repetition review: practiced more than
+    REVIEW_AFTER_DAYS whole days ago, with an effective level still above
+    REVIEW_MIN_LEVEL.
+
+    The ReviewSchedule table has one row per practiced (user, topic) holding
+    the two times that matter: due_at, when the topic becomes due, and
+    lapses_at, when decay takes it below REVIEW_MIN_LEVEL. record()
+    reschedules a topic on every practice (KnowledgeTracker.apply_attempts).
+
+    due() answers from a per-user heap ordered by due_at, loaded from the
+    table on first use and then kept current by record() once its
+    transaction commits. Heaps are kept for the Config.REVIEW_CACHE_USERS
+    most recent users and re-read after Config.REVIEW_CACHE_TTL seconds, so
+    practice recorded by other processes shows up. users_due() answers from
+    the table's ix_review_schedule_live index.
+
+    lapses_at uses the topic's forgetting rate at practice time; due() checks
+    the effective level with the current rates.
+    """
+
+    parameters = LazyService('topic_parameters')
+
+    def __init__(self, max_users=None, ttl=None):
+        self.max_users = Config.REVIEW_CACHE_USERS if max_users is None else max_users
+        self.ttl = Config.REVIEW_CACHE_TTL if ttl is None else ttl
+        self._users = OrderedDict()  # user_id -> _UserReviews, least recently used first
+        self._loading = {}  # user_id -> entries committed while its heap loads
+        self._lock = threading.Lock()
+        self.loads = 0
+
+        # Heaps only see committed changes
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_rollback', self._after_rollback)
+
+    # ============ READ ============
+
+    def due(self, user_id, k=3, now=None):
+        """
+        The user's k highest-priority due reviews
+
+        Returns:
+            list of dicts {topic_id, days_since, current_level, priority},
+            priority = days_since * (1 - current_level), highest first
+        """
+        now = now or datetime.utcnow()
+        reviews = self._reviews(user_id)
+        with self._lock:
+            entries = reviews.due(now)
+        if not entries:
+            return []
+
+        levels = effective_levels(
+            [entry[2] for entry in entries],
+            [entry[3] for entry in entries],
+            now,
+            self.parameters.forgetting_rates([entry[1] for entry in entries])
+        ).tolist()
+
+        candidates = []
+        for entry, level in zip(entries, levels):
+            if level > REVIEW_MIN_LEVEL:
+                days_since = (now - entry[3]).days
+                candidates.append({
+                    'topic_id': entry[1],
+                    'days_since': days_since,
+                    'current_level': level,
+                    'priority': days_since * (1 - level)
+                })
+        return heapq.nlargest(k, candidates, key=lambda candidate: candidate['priority'])
+
+    def users_due(self, day=None, now=None):
+        """Ids of users with at least one review due by the end of `day` (a date, default today)"""
+        now = now or datetime.utcnow()
+        day_start = datetime.combine(day or now.date(), datetime.min.time())
+        day_end = day_start + timedelta(days=1)
+        query = db.select(ReviewSchedule.user_id).where(
+            ReviewSchedule.lapses_at > max(now, day_start),
+            ReviewSchedule.due_at < day_end,
+            ReviewSchedule.lapses_at > ReviewSchedule.due_at
+        )
+        # Deduplicated here: DISTINCT / ORDER BY in SQL makes SQLite walk the primary key instead
+        return sorted(set(db.session.execute(query).scalars()))
+
+    def _reviews(self, user_id):
+        with self._lock:
+            reviews = self._users.get(user_id)
+            if reviews is not None and time.monotonic() - reviews.loaded_at <= self.ttl:
+                self._users.move_to_end(user_id)
+                return reviews
+
+            # Commits made while loading are pushed afterwards (pushing one already loaded is harmless)
+            missed = self._loading.setdefault(user_id, [])
+
+        reviews = _UserReviews(self._load(user_id), time.monotonic())
+        with self._lock:
+            for entry in missed:
+                reviews.push(entry)
+            if self._loading.get(user_id) is missed:
+                del self._loading[user_id]
+            self._users[user_id] = reviews
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            self.loads += 1
+        return reviews
+
+    def _load(self, user_id):
+        # Own connection: a failed read must not roll back the caller's session
+        query = db.select(
+            ReviewSchedule.due_at, ReviewSchedule.topic_id, ReviewSchedule.level,
+            ReviewSchedule.practiced_at, ReviewSchedule.lapses_at
+        ).where(ReviewSchedule.user_id == user_id, ReviewSchedule.lapses_at > datetime.utcnow())
+        try:
+            with db.engine.connect() as conn:
+                return [tuple(row) for row in conn.execute(query)]
+        except (OperationalError, ProgrammingError) as e:
+            # Database created before the table existed (init_db creates it)
+            print(f"Review schedule unavailable, no reviews suggested: {e.orig}")
+            return []
+
+    # ============ UPDATE ============
+
+    def record(self, user_id, topic_id, level, practiced_at):
+        """Reschedule a topic just practiced up to `level`; runs in the caller's transaction"""
+        due_at, lapses_at = schedule(level, practiced_at, self.parameters.get(topic_id)[1])
+        values = {'level': level, 'practiced_at': practiced_at, 'due_at': due_at, 'lapses_at': lapses_at}
+
+        updated = db.session.execute(db.update(ReviewSchedule).where(
+            ReviewSchedule.user_id == user_id, ReviewSchedule.topic_id == topic_id
+        ).values(**values))
+        if updated.rowcount == 0:
+            db.session.execute(db.insert(ReviewSchedule).values(user_id=user_id, topic_id=topic_id, **values))
+
+        db.session.info.setdefault('review_updates', []).append(
+            (user_id, (due_at, topic_id, level, practiced_at, lapses_at))
+        )
+
+    def _after_commit(self, session):
+        if session.in_nested_transaction():
+            return  # a savepoint released (get_or_create_knowledge_state); the transaction can still roll back
+        updates = session.info.pop('review_updates', None)
+        if not updates:
+            return
+        with self._lock:
+            for user_id, entry in updates:
+                reviews = self._users.get(user_id)
+                if reviews is not None:
+                    reviews.push(entry)
+                if user_id in self._loading:
+                    self._loading[user_id].append(entry)
+
+    def _after_rollback(self, session):
+        if session.in_nested_transaction():
+            return  # only the savepoint's work was undone
+        session.info.pop('review_updates', None)
+
+    def backfill(self):
+        """Schedule every practiced knowledge state, if the table is still empty (a database that predates it)"""
+        if db.session.execute(db.select(ReviewSchedule.user_id).limit(1)).first() is not None:
+            return 0
+
+        states = db.session.execute(db.select(
+            KnowledgeState.user_id, KnowledgeState.topic_id,
+            KnowledgeState.knowledge_level, KnowledgeState.last_practiced
+        ).where(KnowledgeState.last_practiced.isnot(None))).all()
+
+        rows = {}
+        for user_id, topic_id, level, practiced_at in states:
+            due_at, lapses_at = schedule(level or 0.0, practiced_at, self.parameters.get(topic_id)[1])
+            rows[(user_id, topic_id)] = {
+                'user_id': user_id, 'topic_id': topic_id, 'level': level or 0.0,
+                'practiced_at': practiced_at, 'due_at': due_at, 'lapses_at': lapses_at
+            }
+        if rows:
+            db.session.execute(db.insert(ReviewSchedule), list(rows.values()))
+        db.session.commit()
+        return len(rows)
+
+    def get_status(self):
+        with self._lock:
+            return {'cached_users': len(self._users), 'loads': self.loads}
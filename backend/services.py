@@ -0,0 +1,119 @@
+"""
+Services - Process-wide registry of shared objects, built on first use
+"""
+from config import Config
+import importlib
+import threading
+
+_MISSING = object()
+
+
+class ServiceRegistry:
+    """
+    Maps service names to factories and builds each service the first time it
+    is asked for; every later caller gets the same instance.
+
+    Nothing is built at import time, so a process only pays for what it uses:
+    an app that never gives a hint never imports the hint index's sklearn stack.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()  # factories may get other services
+
+    def register(self, name, factory):
+        """Add or replace a factory (a replaced service is rebuilt on next use)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown service '{name}'")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_built(self, name):
+        return name in self._instances
+
+    def built(self):
+        """Names of the services built so far"""
+        return sorted(self._instances)
+
+
+class LazyService:
+    """
+    Class attribute that resolves to a registry service on first access:
+
+        class TeachingAgent(BaseAgent):
+            llm_service = LazyService('llm_service')
+
+    Assigning the attribute on an instance replaces the service for that instance.
+    """
+
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry
+        self.attr = name
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.attr, _MISSING)
+        if value is _MISSING:
+            value = (self.registry or registry).get(self.name)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.attr] = value
+
+
+# ============ DEFAULT SERVICES ============
+
+def _build(module, attr):
+    """Factory calling module.attr(), importing the module only when first built"""
+    def factory():
+        return getattr(importlib.import_module(module), attr)()
+    return factory
+
+
+def _hint_index():
+    if not Config.HINT_CACHE_ENABLED:
+        return None
+    from hint_index import get_hint_index
+    return get_hint_index()
+
+
+registry = ServiceRegistry()
+
+# One LLM client per process; it shares the runner, cache and resilience state anyway
+registry.register('llm_service', _build('llm_service', 'LLMService'))
+registry.register('hint_index', _hint_index)
+registry.register('quiz_pool', lambda: None)  # the app registers its pool when enabled
+registry.register('write_behind', lambda: None)  # the app registers its buffer when enabled
+registry.register('topic_parameters', _build('knowledge_tracker', 'TopicParameterCache'))
+registry.register('progress_summaries', _build('progress_summary', 'ProgressSummaries'))
+registry.register('review_queue', _build('review_queue', 'ReviewQueue'))
+registry.register('topic_graph', _build('topic_graph', 'TopicGraph'))
+
+# Sub-agents hold no per-request state, so every coordinator can share them
+registry.register('teaching_agent', _build('agents.teaching_agent', 'TeachingAgent'))
+registry.register('assessment_agent', _build('agents.assessment_agent', 'AssessmentAgent'))
+registry.register('knowledge_agent', _build('agents.knowledge_agent', 'KnowledgeAgent'))
+registry.register('tutor_agent', _build('agents.tutor_agent', 'TutorAgent'))
+registry.register('recommendation_agent', _build('agents.recommendation_agent', 'RecommendationAgent'))
+
+
+def get_llm_service():
+    """The process-wide LLMService"""
+    return registry.get('llm_service')
@@ -0,0 +1,186 @@
+"""
+Async runner test for async_llm.py
+
+Checks that calls beyond max_concurrency wait for a slot, from sync and
+async callers alike, and that slot() gives its slot back when acquiring it
+times out, even when the acquisition races the timeout. Then checks that
+identical concurrent calls share one upstream call, which keeps running for
+the other waiters when one of them times out or is cancelled.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import check, synthetic_latency
+from async_llm import AsyncLLMRunner, LLMTimeoutError
+
+CAP = 4
+
+
+def sleeper(seconds):
+    return lambda: asyncio.sleep(seconds, result=seconds)
+
+
+def counted(calls, seconds, value):
+    """Factory of an upstream call that records each time it really runs"""
+    async def upstream():
+        calls.append(value)
+        await asyncio.sleep(seconds)
+        return value
+    return lambda: upstream()
+
+
+def hold_every_slot(runner, timeout=2):
+    """True if max_concurrency threads can all be inside slot() at once"""
+    barrier = threading.Barrier(runner.max_concurrency, timeout=timeout)
+    entered = []
+    
+    def hold():
+        try:
+            with runner.slot(timeout=timeout):
+                barrier.wait()
+                entered.append(True)
+        except (LLMTimeoutError, threading.BrokenBarrierError):
+            pass
+    
+    threads = [threading.Thread(target=hold) for _ in range(runner.max_concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(entered) == runner.max_concurrency
+
+
+def test_concurrency_cap():
+    print("\n" + "="*60)
+    print("TEST: LLM concurrency cap")
+    print("="*60)
+    
+    runner = AsyncLLMRunner(max_concurrency=CAP)
+    results = []
+    print(f"\nResult:")
+    
+    # Sync callers: 5x the cap, all submitted at once
+    started = time.perf_counter()
+    futures = [runner.submit(sleeper(0.05)) for _ in range(CAP * 5)]
+    values = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    stats = runner.get_stats()
+    check(results, "sync calls capped", stats['peak_in_flight'] == CAP and len(values) == CAP * 5
+          and elapsed >= 5 * 0.05 * 0.9, f"peak {stats['peak_in_flight']}, {elapsed:.2f}s for 5 waves")
+    
+    # Async callers on their own loop share the same limit
+    async def burst():
+        return await asyncio.gather(*[runner.arun(sleeper(0.02)) for _ in range(CAP * 3)])
+    
+    values = asyncio.run(burst())
+    stats = runner.get_stats()
+    check(results, "async calls capped", stats['peak_in_flight'] == CAP and len(values) == CAP * 3
+          and stats['completed'] == CAP * 8 and stats['in_flight'] == 0)
+    
+    # slot() while every slot is busy: times out without keeping a slot
+    busy = [runner.submit(sleeper(0.3)) for _ in range(CAP)]
+    time.sleep(0.05)
+    try:
+        with runner.slot(timeout=0.05):
+            timed_out = False
+    except LLMTimeoutError:
+        timed_out = True
+    for future in busy:
+        future.result()
+    check(results, "slot() times out when all are busy", timed_out and runner.get_stats()['timeouts'] == 1)
+    check(results, "timed-out slot() left every slot free", hold_every_slot(runner))
+    
+    # A zero timeout races the acquisition: sometimes it gave up before, sometimes just after
+    timeouts = 0
+    for _ in range(200):
+        try:
+            with runner.slot(timeout=0):
+                pass
+        except LLMTimeoutError:
+            timeouts += 1
+    check(results, "slot given back when acquired just after the timeout", hold_every_slot(runner),
+          f"{timeouts} of 200 acquisitions timed out")
+    check(results, "peak never above the cap", runner.get_stats()['peak_in_flight'] == CAP)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+def test_single_flight():
+    print("\n" + "="*60)
+    print("TEST: Single-flight LLM calls")
+    print("="*60)
+    
+    results = []
+    print(f"\nResult:")
+    
+    # Identical prompts through LLMService: one provider call for all of them
+    with synthetic_latency('fixed:0.3') as service:
+        upstream = []
+        agenerate = service.provider.agenerate
+        
+        async def counted_agenerate(*args, **kwargs):
+            upstream.append(args[0])
+            return await agenerate(*args, **kwargs)
+        
+        service.provider.agenerate = counted_agenerate
+        before = service.get_runner_stats()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            answers = list(pool.map(lambda _: service.generate_text('Explain recursion in one line'), range(8)))
+        after = service.get_runner_stats()
+    
+    shared = after['shared_calls'] - before['shared_calls']
+    coalesced = after['coalesced'] - before['coalesced']
+    check(results, "8 identical calls, 1 upstream call", len(upstream) == 1 and len(set(answers)) == 1,
+          f"{len(upstream)} upstream call(s)")
+    check(results, "counted as 1 shared call and 7 coalesced", shared == 1 and coalesced == 7,
+          f"shared {shared}, coalesced {coalesced}")
+    
+    runner = AsyncLLMRunner(max_concurrency=CAP)
+    
+    # One waiter times out; the call it shared goes on for the other
+    calls = []
+    patient = runner.submit(counted(calls, 0.3, 'answer'), timeout=2, key='slow')
+    try:
+        runner.run(counted(calls, 0.3, 'answer'), timeout=0.05, key='slow')
+        impatient_timed_out = False
+    except LLMTimeoutError:
+        impatient_timed_out = True
+    check(results, "timed-out waiter leaves the shared call running",
+          impatient_timed_out and patient.result() == 'answer' and len(calls) == 1)
+    
+    # One waiter is cancelled; same
+    calls = []
+    leaving = runner.submit(counted(calls, 0.2, 'answer'), key='cancelled')
+    staying = runner.submit(counted(calls, 0.2, 'answer'), key='cancelled')
+    time.sleep(0.05)
+    check(results, "cancelled waiter leaves the shared call running",
+          leaving.cancel() and staying.result() == 'answer' and len(calls) == 1)
+    
+    # Once finished, the key starts a fresh call
+    calls = []
+    check(results, "next call after completion runs again",
+          runner.run(counted(calls, 0, 'again'), key='slow') == 'again' and len(calls) == 1)
+    
+    stats = runner.get_stats()
+    check(results, "runner counters", stats['shared_calls'] == 3 and stats['coalesced'] == 2
+          and stats['timeouts'] == 1 and stats['cancelled'] == 1, f"{stats}")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_concurrency_cap()
+    passed = test_single_flight() and passed
+    exit(0 if passed else 1)
@@ -0,0 +1,161 @@
+"""
+Concurrency stress test for the shared CoordinatorAgent
+
+Runs many users' requests in parallel through the single module-level
+coordinator and checks every result against the same request run alone.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from conftest import synthetic_latency
+from app import app, db, coordinator
+from models import User, Topic, KnowledgeState
+
+NUM_USERS = 12
+ROUNDS = 3
+WORKERS = 16
+
+# Fields that legitimately differ between two runs of the same request
+VOLATILE_KEYS = {'timestamp', 'generated_at', 'evaluated_at', 'timing'}
+
+
+def setup_users():
+    """Create users whose knowledge states all differ"""
+    with app.app_context():
+        topic_ids = [t.id for t in Topic.query.order_by(Topic.id).all()]
+        users = []
+        
+        for i in range(NUM_USERS):
+            user = User(username=f'stress_user_{i}', email=f'stress{i}@example.com')
+            db.session.add(user)
+            db.session.flush()
+            
+            # One knowledge gap per user, on a user-specific topic and level
+            states = [(topic_ids[i % len(topic_ids)], 0.1 + 0.02 * i)]
+            if i % 3 == 0:
+                # Some experienced learners, so recommendation strategies differ too
+                states += [(topic_ids[(i + 1) % len(topic_ids)], 0.9),
+                           (topic_ids[(i + 2) % len(topic_ids)], 0.65)]
+            
+            for topic_id, level in states:
+                db.session.add(KnowledgeState(
+                    user_id=user.id,
+                    topic_id=topic_id,
+                    knowledge_level=level,
+                    confidence=0.5,
+                    last_practiced=datetime.utcnow(),
+                    practice_count=3
+                ))
+            
+            users.append((user.id, i, topic_ids[i % len(topic_ids)]))
+        
+        db.session.commit()
+    
+    return users
+
+
+def build_requests(users):
+    """Several different tasks per user"""
+    requests = []
+    
+    for user_id, i, topic_id in users:
+        requests.append((user_id, {
+            'task': 'generate_quiz',
+            'user_id': user_id,
+            'context': {'topic_id': topic_id, 'knowledge_level': [0.1, 0.5, 0.9][i % 3],
+                        'recent_performance': []}
+        }))
+        requests.append((user_id, {
+            'task': 'recommend_topic',
+            'user_id': user_id,
+            'context': {'current_topic_id': topic_id}
+        }))
+        requests.append((user_id, {
+            'task': 'provide_hint',
+            'user_id': user_id,
+            'context': {'question': f'How do I solve exercise {user_id}?',
+                        'challenge': f'Challenge {i}', 'attempt_count': 1 + i % 4}
+        }))
+        requests.append((user_id, {
+            'task': 'generate_lesson',
+            'user_id': user_id,
+            'context': {'topic_id': topic_id, 'knowledge_level': [0.1, 0.5, 0.9][i % 3],
+                        'learning_history': []}
+        }))
+    
+    return requests
+
+
+def signature(value):
+    """Result with volatile fields stripped, for comparison"""
+    if isinstance(value, dict):
+        return {k: signature(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [signature(v) for v in value]
+    return value
+
+
+def run_request(environment):
+    with app.app_context():
+        return coordinator.perceive(environment).decide().act()
+
+
+@synthetic_latency('uniform:0.005,0.03')  # uneven, so requests interleave differently
+def test_isolation_under_load():
+    """Parallel results must match the same request run alone"""
+    print("\n" + "="*60)
+    print("TEST: Request isolation under parallel load")
+    print("="*60)
+    
+    users = setup_users()
+    requests = build_requests(users)
+    coordinated = coordinator.get_statistics()['tasks_coordinated']  # by earlier tests
+    print(f"[OK] {len(users)} users, {len(requests)} distinct requests")
+    
+    # Baseline: every request on its own
+    expected = [signature(run_request(env)) for _, env in requests]
+    
+    failed_baseline = [e for e in expected if not e.get('success')]
+    if failed_baseline:
+        print(f"\n[FAIL] Baseline requests failed: {failed_baseline[0].get('error')}")
+        return False
+    
+    # Same requests, interleaved across threads
+    jobs = [index for index in range(len(requests)) for _ in range(ROUNDS)]
+    random.Random(7).shuffle(jobs)
+    
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(lambda index: (index, run_request(requests[index][1])), jobs))
+    elapsed = time.time() - started
+    
+    mismatches = 0
+    for index, result in results:
+        user_id, environment = requests[index]
+        if result.get('user_id') != user_id or signature(result) != expected[index]:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  Mismatch: {environment['task']} for user {user_id} "
+                      f"(result user_id={result.get('user_id')}, error={result.get('error')})")
+    
+    print(f"\nResult:")
+    print(f"  Parallel requests: {len(jobs)} on {WORKERS} threads in {elapsed:.2f}s")
+    print(f"  Mismatches: {mismatches}")
+    
+    tasks = coordinator.get_statistics()['tasks_coordinated'] - coordinated
+    expected_tasks = len(requests) * (1 + ROUNDS)
+    print(f"  Tasks coordinated: {tasks} (expected {expected_tasks})")
+    
+    if mismatches == 0 and tasks == expected_tasks:
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_isolation_under_load()
+    exit(0 if passed else 1)
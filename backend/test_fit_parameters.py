@@ -0,0 +1,106 @@
+"""
+Parameter fit test for fit_parameters.py
+
+Simulates students on two topics, one learned quickly and one slowly, fits
+the rates from their quiz attempts and checks that the fit tells the topics
+apart, never does worse than the defaults, gives the same answer whatever
+the chunk size, and is used by KnowledgeTracker once saved.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from conftest import check
+from app import app, db
+from fit_parameters import fit, save
+from knowledge_tracker import KnowledgeTracker
+from models import User, Topic, QuizAttempt
+from services import registry
+
+TRUE_RATES = {'fast': (0.4, 0.01), 'slow': (0.06, 0.1)}
+
+
+def simulate(user_ids, topic_id, learning_rate, forgetting_rate, rng):
+    """Quiz attempts of students whose chance of a right answer grows with the tracker's own level"""
+    rows = []
+    start = datetime(2026, 1, 1)
+    for user_id in user_ids:
+        level, when = 0.0, start
+        for _ in range(12):
+            gap = int(rng.integers(0, 6))
+            when += timedelta(days=gap, minutes=1)
+            level *= np.exp(-forgetting_rate * gap)
+            correct = bool(rng.random() < 0.2 + 0.8 * level)
+            rows.append({'user_id': user_id, 'topic_id': topic_id, 'question': 'q', 'is_correct': correct,
+                         'difficulty': 'intermediate', 'created_at': when})
+            level = level + learning_rate * (1 - level) if correct else level - learning_rate * level * 0.3
+    return rows
+
+
+def setup_attempts():
+    rng = np.random.default_rng(7)
+    
+    with app.app_context():
+        users = [User(username=f'fit_{i}', email=f'fit_{i}@example.com') for i in range(150)]
+        db.session.add_all(users)
+        db.session.flush()
+        user_ids = [user.id for user in users]
+        topics = {}
+        for name in TRUE_RATES:
+            topic = Topic(name=f'Fit {name}', category='Test', difficulty='beginner')
+            db.session.add(topic)
+            db.session.flush()
+            topics[name] = topic.id
+        
+        for name, topic_id in topics.items():
+            db.session.execute(db.insert(QuizAttempt), simulate(user_ids, topic_id, *TRUE_RATES[name], rng))
+        db.session.commit()
+        return topics, user_ids[0]
+
+
+def test_fit_parameters():
+    print("\n" + "="*60)
+    print("TEST: Knowledge-tracing parameter fit")
+    print("="*60)
+    
+    topics, user_id = setup_attempts()
+    results = []
+    print(f"\nResult:")
+    
+    with app.app_context():
+        fitted, total = fit(chunk_size=100000, min_attempts=100)
+        chunked, _ = fit(chunk_size=7, min_attempts=100)
+        by_topic = {row['topic_id']: row for row in fitted}
+        fast, slow = by_topic[topics['fast']], by_topic[topics['slow']]
+        
+        check(results, "every attempt read", total == QuizAttempt.query.count() >= 2 * 150 * 12, f"{total} attempts")
+        same = all(
+            a['learning_rate'] == b['learning_rate'] and a['forgetting_rate'] == b['forgetting_rate']
+            and np.isclose(a['brier_score'], b['brier_score'])
+            for a, b in zip(fitted, chunked)
+        )
+        check(results, "chunk size doesn't change the fit", same and len(fitted) == len(chunked) >= 2)
+        check(results, "fast topic learns faster", fast['learning_rate'] > slow['learning_rate'],
+              f"lr {fast['learning_rate']:.2f} vs {slow['learning_rate']:.2f}")
+        check(results, "never worse than the defaults",
+              all(row['brier_score'] <= row['baseline_brier_score'] for row in fitted),
+              ', '.join(f"{row['brier_score']:.4f} <= {row['baseline_brier_score']:.4f}" for row in fitted))
+        
+        # Once saved, the tracker updates with the topic's fitted learning rate
+        save(fitted)
+        registry.get('topic_parameters').invalidate()
+        state = KnowledgeTracker().update_knowledge(user_id, topics['fast'], True, 'intermediate')
+        check(results, "tracker uses fitted rates", abs(state.knowledge_level - fast['learning_rate']) < 1e-9,
+              f"first correct answer -> {state.knowledge_level:.2f}")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_fit_parameters()
+    exit(0 if passed else 1)
@@ -0,0 +1,94 @@
+"""
+Lesson formatting test for formatting.py
+
+Checks that IncrementalLessonFormatter, fed a lesson in chunks of any size
+or split anywhere, emits fragments whose concatenation equals
+format_lesson_content of the whole lesson, and that it emits them early.
+"""
+import random
+
+from conftest import check
+from formatting import IncrementalLessonFormatter, format_lesson_content
+
+# A code fence with blank lines, lists, and headings with and without a blank line before them
+LESSON = (
+    "## Introduction\n"
+    "**Lists** hold items in order.\n"
+    "\n"
+    "## Core Concepts\n"
+    "- Items keep their `index`\n"
+    "- Lists can grow\n"
+    "\n"
+    "## Practical Examples\n"
+    "```python\n"
+    "values = [1, 2, 3]\n"
+    "\n"
+    "\n"
+    "print(sum(values))\n"
+    "```\n"
+    "\n"
+    "The sum is printed.\n"
+    "### Slicing\n"
+    "Slices copy part of a list.\n"
+    "## Key Takeaways\n"
+    "- Start simple\n"
+    "- Practice regularly\n"
+)
+
+
+def format_in_chunks(chunks):
+    """Joined fragments, and how many were emitted before flush()"""
+    formatter = IncrementalLessonFormatter()
+    fragments = []
+    for chunk in chunks:
+        fragments.extend(formatter.feed(chunk))
+    early = len(fragments)
+    fragments.extend(formatter.flush())
+    return ''.join(fragments), early
+
+
+def test_incremental_formatting():
+    print("\n" + "="*60)
+    print("TEST: Incremental lesson formatting")
+    print("="*60)
+    
+    expected = format_lesson_content(LESSON)
+    rng = random.Random(5)
+    results = []
+    print(f"\nResult:")
+    
+    by_size = [size for size in range(1, len(LESSON) + 1)
+               if format_in_chunks(LESSON[i:i + size] for i in range(0, len(LESSON), size))[0] != expected]
+    check(results, "fixed chunk sizes match the full lesson", not by_size,
+          f"sizes {by_size[:5]} differ" if by_size else f"sizes 1-{len(LESSON)}")
+    
+    mismatches = 0
+    for _ in range(300):
+        cuts = sorted(rng.sample(range(1, len(LESSON)), rng.randint(1, 12)))
+        bounds = [0] + cuts + [len(LESSON)]
+        if format_in_chunks(LESSON[a:b] for a, b in zip(bounds, bounds[1:]))[0] != expected:
+            mismatches += 1
+    check(results, "random splits match the full lesson", mismatches == 0, f"{mismatches} of 300 differ")
+    
+    # Split inside a heading, a fenced blank line and a list item
+    heading = LESSON.index("## Practical") + 4
+    fence = LESSON.index("\n\n\nprint") + 1
+    item = LESSON.index("Practice regularly") + 3
+    chunks = [LESSON[:heading], LESSON[heading:fence], LESSON[fence:item], LESSON[item:]]
+    html, early = format_in_chunks(chunks)
+    check(results, "heading, fence and list split across chunks", html == expected)
+    check(results, "blocks emitted before the lesson ends", early >= 3, f"{early} fragments before flush")
+    check(results, "code fence kept whole", '<pre><code class="python">values = [1, 2, 3]' in html
+          and '<h2>Practical Examples</h2>' in html)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_incremental_formatting()
+    exit(0 if passed else 1)
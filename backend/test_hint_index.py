@@ -0,0 +1,95 @@
+"""
+Hint index test for hint_index.py
+
+Checks that a near-duplicate question in the same challenge and hint level
+reuses the stored hint while other levels, challenges and questions miss,
+that a new index reloads its entries from SQLite, and that past max_entries
+the oldest hint is evicted and its terms leave the document frequencies.
+"""
+import os
+
+import numpy as np
+
+from conftest import TEMP_DIR, check
+from hint_index import HintIndex
+
+CHALLENGE = 'Write a program to print numbers 1 to 10'
+HINTS = [
+    ('How do I use a for loop to print the numbers?', 'Try range(1, 11) in a for loop.'),
+    ('Why does my while loop never stop?', 'Check that the loop variable changes each time.'),
+    ('How can I print all numbers on one line?', 'print() takes an end argument.'),
+]
+
+
+def document_frequencies(index):
+    """Document frequencies recounted from the rows the index holds"""
+    counts = np.zeros_like(index._doc_freq)
+    for bucket in index._buckets.values():
+        for row in bucket['rows']:
+            counts[row.indices] += 1
+    return counts
+
+
+def test_hint_index():
+    print("\n" + "="*60)
+    print("TEST: Hint similarity index")
+    print("="*60)
+    
+    path = os.path.join(TEMP_DIR, 'hint_index.db')
+    index = HintIndex(path=path, threshold=0.85, max_entries=100)
+    for question, hint in HINTS:
+        index.add(CHALLENGE, question, 'subtle', hint)
+    index.add('Reverse a string', 'How do I use a for loop to print the numbers?', 'subtle', 'Slices can step backwards.')
+    results = []
+    print(f"\nResult:")
+    
+    # Same challenge (modulo case and spacing) and level, question typed slightly differently
+    hint, similarity = index.lookup('  write a program to print numbers 1 to 10', 'how do I use a for-loop to print the numbers', 'subtle')
+    check(results, "near-duplicate question hits", hint == HINTS[0][1] and similarity >= 0.85, f"similarity {similarity:.3f}")
+    
+    misses = {
+        'other hint level': index.lookup(CHALLENGE, HINTS[0][0], 'detailed'),
+        'other challenge': index.lookup('Sum a list', HINTS[0][0], 'subtle'),
+        'other question': index.lookup(CHALLENGE, 'What is the difference between a list and a tuple?', 'subtle'),
+    }
+    check(results, "other level, challenge or question misses", all(hint is None for hint, _ in misses.values()),
+          ', '.join(f"{name} {similarity:.2f}" for name, (_, similarity) in misses.items()))
+    
+    stats = index.get_stats()
+    check(results, "stats count lookups", stats['lookups'] == 4 and stats['hits'] == 1 and stats['entries'] == 4
+          and stats['buckets'] == 2)
+    
+    # A restarted process reloads the hints from SQLite
+    restarted = HintIndex(path=path, threshold=0.85, max_entries=100)
+    hint, _ = restarted.lookup(CHALLENGE, 'Why does my while loop never stop', 'subtle')
+    check(results, "reloaded from SQLite", hint == HINTS[1][1] and restarted.get_stats()['entries'] == 4
+          and np.array_equal(restarted._doc_freq, index._doc_freq))
+    
+    # Past max_entries the oldest goes, from memory and from the document frequencies
+    small = HintIndex(path=os.path.join(TEMP_DIR, 'hint_index_small.db'), threshold=0.85, max_entries=3)
+    for question, hint in HINTS:
+        small.add(CHALLENGE, question, 'subtle', hint)
+    newest = 'How do I skip even numbers?'
+    before = int(small._doc_freq.sum())
+    small.add(CHALLENGE, newest, 'subtle', 'Use range with a step of 2.')
+    expected = before - small._tf(HINTS[0][0]).nnz + small._tf(newest).nnz
+    
+    hint, _ = small.lookup(CHALLENGE, HINTS[0][0], 'subtle')
+    check(results, "oldest hint evicted", hint is None and small.get_stats()['entries'] == 3
+          and small.lookup(CHALLENGE, HINTS[1][0], 'subtle')[0] == HINTS[1][1])
+    check(results, "evicted terms leave the document frequencies",
+          np.array_equal(small._doc_freq, document_frequencies(small)) and small._doc_freq.sum() == expected,
+          f"{int(small._doc_freq.sum())} term occurrences left, {expected} expected")
+    check(results, "evicted on disk too", HintIndex(path=small.path, max_entries=3).get_stats()['entries'] == 3)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_hint_index()
+    exit(0 if passed else 1)
@@ -0,0 +1,117 @@
+"""
+Background job test for full_learning_session
+
+Submits jobs through the API and follows them to completion by polling and
+over the event stream, checks the per-user limit, cancellation and that jobs
+interrupted by a restart are run again.
+"""
+import json
+import time
+
+from conftest import check, synthetic_latency
+from app import app, db, job_queue
+from models import User, Job
+
+STEPS = {'knowledge_analysis', 'recommendations', 'lesson', 'assessment', 'motivation'}
+
+
+def setup_client():
+    """A logged-in client for a fresh user"""
+    with app.app_context():
+        user = User(username='job_user', email='jobs@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'job_user'
+    return client, user_id
+
+
+def wait_for(client, job_id, timeout=30):
+    """Poll a job until it has finished"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job['status'] in ('succeeded', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+
+@synthetic_latency('fixed:0.2')  # jobs run long enough to queue behind each other
+def test_jobs():
+    print("\n" + "="*60)
+    print("TEST: Background jobs")
+    print("="*60)
+    
+    client, user_id = setup_client()
+    results = []
+    print(f"\nResult:")
+    
+    # A job left 'running' by a previous process runs again on start
+    with app.app_context():
+        db.session.add(Job(id='interrupted', user_id=user_id, task='full_learning_session',
+                           params='{}', status='running', attempts=1))
+        db.session.commit()
+        job_queue.workers = 1  # the second of two jobs waits in the queue
+        job_queue.max_per_user = 2
+        job_queue.start()
+    
+    job = wait_for(client, 'interrupted')
+    check(results, "interrupted job requeued", job['status'] == 'succeeded' and job['attempts'] == 2,
+          f"{job['status']}, attempt {job['attempts']}")
+    
+    # Submit returns at once; polling sees every step and the results
+    started = time.time()
+    response = client.post('/api/jobs', json={'task': 'full_learning_session'})
+    submit_ms = (time.time() - started) * 1000
+    job_id = response.get_json()['job_id']
+    check(results, "submit returns immediately", response.status_code == 202 and submit_ms < 200,
+          f"status {response.status_code} in {submit_ms:.0f}ms")
+    
+    job = wait_for(client, job_id)
+    finished = {name for name, step in job['progress'].items() if step['status'] in ('done', 'skipped')}
+    check(results, "job succeeded", job['status'] == 'succeeded', job['error'] or '')
+    check(results, "progress covers every step", finished == STEPS, ', '.join(sorted(finished)))
+    check(results, "results saved", STEPS - {'lesson'} <= set(job['result']['results']))
+    
+    # The event stream reports progress and ends with 'done'
+    job_id = client.post('/api/jobs', json={}).get_json()['job_id']
+    body = client.get(f'/api/jobs/{job_id}/events').get_data(as_text=True)
+    events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+    last = json.loads(body.strip().splitlines()[-1][len('data: '):])
+    check(results, "event stream", events[0] == 'progress' and events[-1] == 'done' and last['status'] == 'succeeded',
+          f"{events.count('progress')} progress events")
+    
+    # Per-user limit, and cancelling a queued job (one worker: the second job waits)
+    first = client.post('/api/jobs', json={}).get_json()['job_id']
+    second = client.post('/api/jobs', json={}).get_json()['job_id']
+    third = client.post('/api/jobs', json={})
+    check(results, "per-user limit", third.status_code == 429, f"status {third.status_code}")
+    
+    cancelled = client.post(f'/api/jobs/{second}/cancel').get_json()
+    check(results, "queued job cancelled", cancelled['status'] == 'cancelled', cancelled['status'])
+    check(results, "other job unaffected", wait_for(client, first)['status'] == 'succeeded')
+    
+    unknown = client.post('/api/jobs', json={'task': 'provide_hint'})
+    check(results, "unknown task rejected", unknown.status_code == 400, f"status {unknown.status_code}")
+    
+    job_queue.stop()
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    try:
+        passed = test_jobs()
+    finally:
+        job_queue.stop()
+    exit(0 if passed else 1)
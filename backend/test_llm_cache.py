@@ -0,0 +1,113 @@
+"""
+Response cache test for llm_cache.py
+
+Checks content-addressed keys (same model, prompt and config hit; another
+config misses), LRU eviction from the memory tier, that the SQLite tier
+outlives the process-local one, and how LLMService uses the cache: a
+bypassed call refreshes the entry and an unparseable response is not stored.
+"""
+import os
+
+from conftest import TEMP_DIR, check
+from llm_cache import ResponseCache
+from llm_providers import LLMProvider
+from llm_service import LLMService
+
+CONFIG = {'temperature': 0.7, 'top_p': 0.8, 'top_k': 40, 'max_output_tokens': 2048}
+
+
+class CountingProvider(LLMProvider):
+    """Answers reply(n) to the n-th call"""
+    
+    name = "counting"
+    
+    def __init__(self, reply):
+        super().__init__("counting-v1")
+        self.reply = reply
+        self.calls = 0
+    
+    def generate(self, prompt, generation_config, task=None):
+        self.calls += 1
+        return self.reply(self.calls)
+
+
+def cached_service(provider, path):
+    """An LLMService on its own cache file (conftest turns the shared cache off)"""
+    service = LLMService(provider)
+    service.cache = ResponseCache(path=path)
+    return service
+
+
+def test_llm_cache():
+    print("\n" + "="*60)
+    print("TEST: LLM response cache")
+    print("="*60)
+    
+    results = []
+    print(f"\nResult:")
+    
+    # Keys: cosmetic whitespace is ignored, generation settings are not
+    path = os.path.join(TEMP_DIR, 'cache_keys.db')
+    cache = ResponseCache(path=path, max_entries=3)
+    key = ResponseCache.make_key('gemini/flash', 'Explain lists.\n\n   Keep it short.', CONFIG)
+    cache.set(key, 'Lists are ordered.')
+    same = ResponseCache.make_key('gemini/flash', '  Explain lists.\nKeep it short.  ', dict(CONFIG))
+    check(results, "same model, prompt and config hit", cache.get(same) == 'Lists are ordered.')
+    
+    hotter = ResponseCache.make_key('gemini/flash', 'Explain lists.\nKeep it short.', {**CONFIG, 'temperature': 0.2})
+    other_model = ResponseCache.make_key('gemini/pro', 'Explain lists.\nKeep it short.', CONFIG)
+    check(results, "changed config or model misses", cache.get(hotter) is None and cache.get(other_model) is None)
+    
+    # Memory tier: the least recently used entry goes first, the disk still has it
+    keys = [ResponseCache.make_key('gemini/flash', f'Prompt {i}', CONFIG) for i in range(3)]
+    cache.set(keys[0], 'answer 0')
+    cache.set(keys[1], 'answer 1')
+    cache.get(key)  # oldest entry, but just used
+    cache.set(keys[2], 'answer 2')
+    stats = cache.get_stats()
+    check(results, "LRU evicts the least recently used",
+          keys[0] not in cache._memory and key in cache._memory and stats['evictions'] == 1
+          and stats['memory_entries'] == 3, f"{stats['evictions']} eviction(s)")
+    check(results, "evicted entry still served from disk",
+          cache.get(keys[0]) == 'answer 0' and cache.get_stats()['disk_hits'] == stats['disk_hits'] + 1)
+    
+    # A new cache on the same file (another worker, or after a restart)
+    restarted = ResponseCache(path=path)
+    check(results, "SQLite tier survives a new cache",
+          restarted.get(keys[2]) == 'answer 2' and restarted.get_stats()['disk_hits'] == 1)
+    
+    # bypass_cache calls the model again and refreshes the stored entry
+    provider = CountingProvider(lambda n: f"response {n}")
+    service = cached_service(provider, os.path.join(TEMP_DIR, 'cache_service.db'))
+    answers = [service.generate_text('What is a tuple?'),
+               service.generate_text('What is a tuple?'),
+               service.generate_text('What is a tuple?', bypass_cache=True),
+               service.generate_text('What is a tuple?')]
+    check(results, "bypass_cache refreshes the entry",
+          answers == ['response 1', 'response 1', 'response 2', 'response 2'] and provider.calls == 2
+          and service.get_cache_stats()['bypassed'] == 1, f"{answers}")
+    
+    # A response the caller can't parse is not cached
+    provider = CountingProvider(lambda n: "Sorry, I can't write a quiz right now.")
+    service = cached_service(provider, os.path.join(TEMP_DIR, 'cache_unparsed.db'))
+    failures = 0
+    for _ in range(2):
+        try:
+            service.generate_quiz_with_prompt('Lists', 3, custom_prompt='Quiz me on lists', use_fallback=False)
+        except ValueError:
+            failures += 1
+    check(results, "unparseable response not cached",
+          failures == 2 and provider.calls == 2 and service.get_cache_stats()['writes'] == 0,
+          f"{provider.calls} provider calls")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_llm_cache()
+    exit(0 if passed else 1)
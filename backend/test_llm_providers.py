@@ -0,0 +1,151 @@
+"""
+Provider test for llm_providers.py
+
+Records responses to a temporary cassette and replays them without ever
+building the recording provider (no network), checks that an unknown prompt
+raises KeyError in replay mode and is recorded in auto mode, and checks the
+synthetic backend's latency specs that the test setup relies on.
+"""
+import os
+import statistics
+
+from conftest import TEMP_DIR, check
+from config import Config
+from llm_providers import LLMProvider, ReplayProvider, SyntheticProvider
+from quiz_parser import parse_quiz_text
+
+CASSETTE = os.path.join(TEMP_DIR, 'cassettes', 'providers.jsonl')
+CONFIG = {'temperature': 0.7}
+
+
+class ScriptedProvider(LLMProvider):
+    """Stands in for the real model when recording; counts its calls"""
+    
+    name = "scripted"
+    
+    def __init__(self, label='Answer'):
+        super().__init__(Config.LLM_MODEL)
+        self.label = label
+        self.calls = 0
+    
+    def generate(self, prompt, generation_config, task=None):
+        self.calls += 1
+        return f"{self.label} {self.calls} to: {prompt}\nSecond line\n"
+
+
+def test_record_replay():
+    print("\n" + "="*60)
+    print("TEST: Record/replay provider")
+    print("="*60)
+    
+    results = []
+    print(f"\nResult:")
+    
+    inner = ScriptedProvider()
+    recorder = ReplayProvider(CASSETTE, mode='record', inner=inner)
+    recorded = [recorder.generate(prompt, CONFIG, 'text') for prompt in ('What is a list?', 'What is a dict?')]
+    check(results, "record mode calls the model and writes the cassette",
+          inner.calls == 2 and os.path.exists(CASSETTE), f"{inner.calls} model calls")
+    
+    # Replay in a new provider with no model to record from: never built, never called
+    replayer = ReplayProvider(CASSETTE, mode='replay')
+    replayed = [replayer.generate(prompt, CONFIG, 'text') for prompt in ('What is a list?', '  What is a dict?')]
+    check(results, "replay serves the recordings", replayed == recorded and replayer._inner is None)
+    check(results, "streams replay line by line",
+          list(replayer.stream('What is a list?', CONFIG)) == recorded[0].splitlines(keepends=True))
+    
+    try:
+        replayer.generate('What is a set?', CONFIG, 'text')
+        missing = None
+    except KeyError as e:
+        missing = e
+    try:
+        replayer.generate('What is a list?', {'temperature': 0.1}, 'text')
+        other_config = None
+    except KeyError as e:
+        other_config = e
+    check(results, "unknown prompt or config raises KeyError in replay mode",
+          missing is not None and other_config is not None and replayer._inner is None, f"{missing}")
+    
+    # Auto: replays what it has, records what it doesn't
+    inner = ScriptedProvider()
+    auto = ReplayProvider(CASSETTE, mode='auto', inner=inner)
+    hit = auto.generate('What is a list?', CONFIG, 'text')
+    new = auto.generate('What is a set?', CONFIG, 'text')
+    check(results, "auto mode records only unknown prompts", hit == recorded[0] and inner.calls == 1)
+    
+    # Record mode re-records; the latest recording wins and a torn last line is ignored
+    rerecorded = ReplayProvider(CASSETTE, mode='record', inner=ScriptedProvider('Retake')).generate('What is a set?', CONFIG)
+    with open(CASSETTE, 'a', encoding='utf-8') as f:
+        f.write('{"key": "torn')
+    reloaded = ReplayProvider(CASSETTE, mode='replay')
+    check(results, "latest recording wins, torn line ignored",
+          reloaded.generate('What is a set?', CONFIG) == rerecorded != new
+          and reloaded.generate('What is a dict?', CONFIG) == recorded[1])
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+def test_synthetic_latency():
+    print("\n" + "="*60)
+    print("TEST: Synthetic provider latency")
+    print("="*60)
+    
+    results = []
+    print(f"\nResult:")
+    
+    # What conftest configures for every test
+    default = SyntheticProvider()
+    check(results, "test setup latency is fixed:0.001",
+          default.latency_spec == 'fixed:0.001' and default.sample_latency() == 0.001)
+    
+    check(results, "fixed specs",
+          [SyntheticProvider(latency=spec).sample_latency() for spec in ('fixed:0.2', 'fixed:0.3')] == [0.2, 0.3])
+    
+    uniform = SyntheticProvider(latency='uniform:0.005,0.03', seed=3)
+    values = [uniform.sample_latency() for _ in range(2000)]
+    check(results, "uniform stays within bounds", 0.005 <= min(values) and max(values) <= 0.03
+          and abs(statistics.mean(values) - 0.0175) < 0.001, f"{min(values):.4f}-{max(values):.4f}")
+    
+    normal = SyntheticProvider(latency='normal:0.01,0.05', seed=3)
+    values = [normal.sample_latency() for _ in range(2000)]
+    check(results, "normal never negative", min(values) == 0.0 and max(values) > 0.05)
+    
+    lognormal = SyntheticProvider(latency='lognormal:1.5,0.4', seed=3)
+    values = [lognormal.sample_latency() for _ in range(4000)]
+    check(results, "lognormal median", abs(statistics.median(values) - 1.5) < 0.05, f"{statistics.median(values):.3f}s")
+    
+    same = [[SyntheticProvider(latency='uniform:0,1', seed=11).sample_latency() for _ in range(5)] for _ in range(2)]
+    check(results, "seeded samples repeat", same[0] == same[1])
+    
+    rejected = 0
+    for spec in ('gamma:1,2', 'fixed', 'uniform:1', 'normal:1,2,3'):
+        try:
+            SyntheticProvider(latency=spec)
+        except ValueError:
+            rejected += 1
+    check(results, "malformed specs rejected up front", rejected == 4, f"{rejected} of 4")
+    
+    # Responses are shaped by the task, e.g. a quiz follows the requested mix
+    quiz = default.generate('quiz for "Lists": 2 beginner level questions, 1 advanced level questions', CONFIG, 'quiz')
+    questions = parse_quiz_text(quiz)
+    check(results, "synthetic quiz follows the requested mix",
+          [q['difficulty'] for q in questions] == ['beginner', 'beginner', 'advanced'])
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_record_replay()
+    passed = test_synthetic_latency() and passed
+    exit(0 if passed else 1)
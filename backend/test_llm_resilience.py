@@ -0,0 +1,186 @@
+"""
+Resilience test for llm_resilience.py
+
+Checks the circuit breaker's closed -> open -> half_open cycle (one probe at
+a time, a probe nobody reported on goes stale after the cooldown), that
+adaptive timeouts stay between the floor and the ceiling, and that a hedge
+is sent once a call runs past the task's p95 and is counted when it wins.
+"""
+import asyncio
+import time
+
+from conftest import check
+from async_llm import LLMTimeoutError
+from config import Config
+from llm_resilience import CircuitBreaker, CircuitOpenError, LLMResilience
+
+COOLDOWN = 0.1
+
+
+def allowed(breaker):
+    try:
+        breaker.allow()
+        return True
+    except CircuitOpenError:
+        return False
+
+
+def racing(starts, delays):
+    """Factory whose n-th call takes delays[n] seconds; records when each started"""
+    async def call(n):
+        starts.append(time.monotonic())
+        await asyncio.sleep(delays[n])
+        return 'primary' if n == 0 else 'hedge'
+    return lambda: call(len(starts))
+
+
+def test_circuit_breaker():
+    print("\n" + "="*60)
+    print("TEST: LLM circuit breaker")
+    print("="*60)
+    
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=COOLDOWN)
+    results = []
+    print(f"\nResult:")
+    
+    # Closed: only consecutive failures count
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    check(results, "closed below the threshold", breaker.state == 'closed' and allowed(breaker))
+    
+    breaker.record_failure()
+    check(results, "threshold opens it", breaker.state == 'open' and breaker.get_status()['opened'] == 1)
+    check(results, "open rejects calls", not allowed(breaker) and breaker.get_status()['short_circuited'] == 1)
+    
+    # Half-open: a single probe; its failure re-opens the breaker
+    time.sleep(COOLDOWN * 1.2)
+    probe, second = allowed(breaker), allowed(breaker)
+    check(results, "cooldown lets one probe through", probe and not second and breaker.state == 'half_open')
+    
+    breaker.record_failure()
+    check(results, "failed probe re-opens", breaker.state == 'open' and breaker.get_status()['opened'] == 2
+          and not allowed(breaker))
+    
+    # A probe whose caller never reports goes stale after another cooldown
+    time.sleep(COOLDOWN * 1.2)
+    probe = allowed(breaker)
+    check(results, "unreported probe still blocks others", probe and not allowed(breaker))
+    time.sleep(COOLDOWN * 1.2)
+    check(results, "stale probe replaced", allowed(breaker) and not allowed(breaker))
+    
+    breaker.record_success()
+    check(results, "successful probe closes", breaker.state == 'closed' and allowed(breaker) and allowed(breaker)
+          and breaker.get_status()['consecutive_failures'] == 0)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+def test_adaptive_timeout():
+    print("\n" + "="*60)
+    print("TEST: Adaptive LLM timeouts")
+    print("="*60)
+    
+    floor, ceiling = Config.LLM_TIMEOUT_FLOOR, Config.LLM_TIMEOUT_SECONDS
+    resilience = LLMResilience()
+    results = []
+    print(f"\nResult:")
+    
+    check(results, "explicit timeout wins", resilience.timeout_for('lesson', requested=3) == 3)
+    
+    for _ in range(resilience.min_samples - 1):
+        resilience.latency.record('lesson', 0.5)
+    check(results, "ceiling until min_samples", resilience.timeout_for('lesson') == ceiling)
+    
+    resilience.latency.record('lesson', 0.5)
+    check(results, "fast task clamped to the floor", resilience.timeout_for('lesson') == floor,
+          f"{resilience.timeout_for('lesson')}s")
+    
+    for _ in range(resilience.min_samples):
+        resilience.latency.record('quiz', ceiling)
+    check(results, "slow task clamped to the ceiling", resilience.timeout_for('quiz') == ceiling)
+    
+    middle = (floor + ceiling) / 2 / Config.LLM_TIMEOUT_MULTIPLIER
+    for _ in range(resilience.min_samples):
+        resilience.latency.record('hint', middle)
+    check(results, "in between: multiplier x p99",
+          abs(resilience.timeout_for('hint') - middle * Config.LLM_TIMEOUT_MULTIPLIER) < 1e-9,
+          f"{resilience.timeout_for('hint'):.2f}s")
+    
+    resilience.adaptive_timeouts = False
+    check(results, "disabled: always the ceiling", resilience.timeout_for('lesson') == ceiling)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+def test_hedging():
+    print("\n" + "="*60)
+    print("TEST: Hedged LLM calls")
+    print("="*60)
+    
+    resilience = LLMResilience()
+    resilience.hedging = True
+    p95 = 0.05
+    for _ in range(resilience.min_samples):
+        resilience.latency.record('hint', p95)
+    results = []
+    print(f"\nResult:")
+    
+    # Primary finishes within p95: no hedge
+    starts = []
+    answer = asyncio.run(resilience.call('hint', racing(starts, [0.01]), timeout=2))
+    check(results, "fast primary not hedged", answer == 'primary' and len(starts) == 1
+          and resilience.stats['hedged'] == 0)
+    
+    # Primary stalls: the hedge goes out after p95 and wins
+    starts = []
+    started = time.monotonic()
+    answer = asyncio.run(resilience.call('hint', racing(starts, [1.0, 0.01]), timeout=2))
+    elapsed = time.monotonic() - started
+    fired_after = starts[1] - starts[0] if len(starts) == 2 else None
+    check(results, "hedge fires after p95", fired_after is not None and p95 * 0.9 <= fired_after < 0.5,
+          f"after {fired_after:.3f}s" if fired_after is not None else "no hedge")
+    check(results, "faster hedge wins", answer == 'hedge' and elapsed < 0.5
+          and resilience.stats['hedged'] == 1 and resilience.stats['hedge_wins'] == 1, f"{elapsed:.2f}s")
+    
+    # Hedge slower than the primary: hedged but not a win
+    starts = []
+    answer = asyncio.run(resilience.call('hint', racing(starts, [0.1, 1.0]), timeout=2))
+    check(results, "primary can still win", answer == 'primary' and resilience.stats['hedged'] == 2
+          and resilience.stats['hedge_wins'] == 1 and resilience._hedges_in_flight == 0)
+    
+    # Hard timeout over primary and hedge alike
+    starts = []
+    try:
+        asyncio.run(resilience.call('hint', racing(starts, [1.0, 1.0]), timeout=0.2))
+        timed_out = False
+    except LLMTimeoutError:
+        timed_out = True
+    check(results, "timeout counted as a breaker failure", timed_out and resilience.stats['timeouts'] == 1
+          and resilience.breaker.get_status()['consecutive_failures'] == 1)
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_circuit_breaker()
+    passed = test_adaptive_timeout() and passed
+    passed = test_hedging() and passed
+    exit(0 if passed else 1)
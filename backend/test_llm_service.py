@@ -0,0 +1,162 @@
+"""
+LLMService test for llm_service.py
+
+Checks that a stream stalled mid-response ends at its deadline, releasing
+its runner slot and counting as a timeout, for lessons and quizzes alike;
+and that batch explanations are mapped back to their answers, with only the
+missing ones explained individually, also from inside a running event loop.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from conftest import check
+from async_llm import LLMTimeoutError
+from llm_providers import LLMProvider
+from llm_service import LLMService
+
+
+class StallingProvider(LLMProvider):
+    """Streams the start of a response, then hangs until released"""
+    
+    name = "stalling"
+    
+    def __init__(self):
+        super().__init__("stalling-v1")
+        self.release = threading.Event()
+    
+    def generate(self, prompt, generation_config, task=None):
+        return "unused"
+    
+    def stream(self, prompt, generation_config, task=None):
+        yield '[{"question": "What is a list?", ' if task == 'quiz' else "## Introduction\n"
+        self.release.wait(30)
+        yield "too late\n"
+
+
+class ScriptedProvider(LLMProvider):
+    """Fixed response per task; records the tasks it was called for"""
+    
+    name = "scripted"
+    
+    def __init__(self, responses):
+        super().__init__("scripted-v1")
+        self.responses = responses
+        self.tasks = []
+    
+    def generate(self, prompt, generation_config, task=None):
+        self.tasks.append(task)
+        return self.responses[task]
+
+
+def answers(count):
+    return [{'question': f'Question {i}?', 'user_answer': 'B', 'correct_answer': 'A'} for i in range(1, count + 1)]
+
+
+def test_stream_deadline():
+    print("\n" + "="*60)
+    print("TEST: Stalled LLM streams")
+    print("="*60)
+    
+    provider = StallingProvider()
+    service = LLMService(provider)
+    in_flight = service.get_runner_stats()['in_flight']
+    results = []
+    print(f"\nResult:")
+    
+    chunks = []
+    started = time.monotonic()
+    try:
+        for chunk in service._stream('Teach me lists', 'lesson', timeout=0.3):
+            chunks.append(chunk)
+        timed_out = False
+    except LLMTimeoutError:
+        timed_out = True
+    elapsed = time.monotonic() - started
+    check(results, "stalled stream times out at its deadline",
+          timed_out and chunks == ["## Introduction\n"] and elapsed < 1.0, f"{elapsed:.2f}s")
+    check(results, "runner slot released", service.get_runner_stats()['in_flight'] == in_flight)
+    check(results, "timeout recorded", service.get_resilience_stats()['timeouts'] == 1)
+    
+    # The streaming endpoints: a lesson keeps what it got, a quiz with no question falls back
+    started = time.monotonic()
+    lesson = list(service.stream_lesson_with_prompt('Lists', 'beginner', 0.2, timeout=0.3))
+    quiz = list(service.stream_quiz_with_prompt('Lists', 3, timeout=0.3))
+    elapsed = time.monotonic() - started
+    check(results, "lesson and quiz streams end", lesson == ["## Introduction\n"] and len(quiz) == 3
+          and quiz[0]['question'].startswith('Sample question') and elapsed < 2.0, f"{elapsed:.2f}s")
+    
+    provider.release.set()
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+def test_batch_explanations():
+    print("\n" + "="*60)
+    print("TEST: Batch answer explanations")
+    print("="*60)
+    
+    service = LLMService(ScriptedProvider({}))
+    parse = service._parse_batch_explanations
+    results = []
+    print(f"\nResult:")
+    
+    shuffled = json.dumps([{'index': 3, 'explanation': 'third'}, {'index': 1, 'explanation': ' first '},
+                           {'index': 2, 'explanation': 'second'}])
+    check(results, "indices out of order", parse(shuffled, 3) == {0: 'first', 1: 'second', 2: 'third'})
+    
+    messy = json.dumps([{'explanation': 'by position'}, {'index': 0, 'explanation': 'zero'},
+                        {'index': 4, 'explanation': 'past the end'},
+                        'not an object', ['nor', 'this'], {'index': 'two', 'explanation': 'bad index'},
+                        {'index': 2, 'explanation': ''}, {'index': 2, 'explanation': 'second'}, {'index': 2, 'explanation': 'duplicate'}])
+    check(results, "out-of-range, non-dict and empty items skipped",
+          parse(messy, 3) == {0: 'by position', 1: 'second'}, f"{parse(messy, 3)}")
+    
+    failures = []
+    for text in ('{"index": 1, "explanation": "not a list"}', '[{"index": 9, "explanation": "x"}]', '[]'):
+        try:
+            parse(text, 3)
+        except ValueError:
+            failures.append(text)
+    check(results, "nothing usable raises", len(failures) == 3)
+    
+    # A partial batch: only the missing answer is explained on its own
+    provider = ScriptedProvider({
+        'explanations_batch': "```json\n" + json.dumps([{'index': 3, 'explanation': 'batch 3'},
+                                                         {'index': 1, 'explanation': 'batch 1'}]) + "\n```",
+        'explanation': 'individual'
+    })
+    service = LLMService(provider)
+    explained = service.explain_answers_batch(answers(3), 'Lists')
+    check(results, "partial batch falls back for the missing answer only",
+          explained == ['batch 1', 'individual', 'batch 3']
+          and sorted(provider.tasks) == ['explanation', 'explanations_batch'], f"{explained}")
+    
+    # The sync version used to start its own event loop, which fails inside a running one
+    async def from_a_loop():
+        return service.explain_answers_batch(answers(4), 'Tuples')
+    
+    provider.tasks.clear()
+    explained = asyncio.run(from_a_loop())
+    check(results, "sync batch works from a running event loop",
+          explained == ['batch 1', 'individual', 'batch 3', 'individual'] and len(provider.tasks) == 3,
+          f"{explained}")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_stream_deadline()
+    passed = test_batch_explanations() and passed
+    exit(0 if passed else 1)
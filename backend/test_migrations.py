@@ -0,0 +1,190 @@
+"""
+Migration test for migrations.py
+
+Builds a database as the first release created it (no indexes,
+prerequisites as comma-separated ids, duplicate knowledge states), upgrades
+it as init_db would, then checks the duplicates are merged, the indexes and
+the unique constraint are in place, prerequisites are copied into their
+table, a second upgrade does nothing, and concurrent first lookups of a
+knowledge state end with one row.
+"""
+import os
+import sqlite3
+import threading
+
+from conftest import TEMP_DIR, check
+from flask import Flask
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from knowledge_tracker import KnowledgeTracker
+from models import db, KnowledgeState, Topic, TopicPrerequisite, User, ReviewSchedule, SchemaMigration
+from services import registry
+import migrations
+
+DATABASE = os.path.join(TEMP_DIR, 'old.db')
+
+# The tables as the first release created them
+OLD_SCHEMA = '''
+CREATE TABLE user (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL, created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE topic (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, category VARCHAR(50) NOT NULL,
+    difficulty VARCHAR(20) NOT NULL, description TEXT, prerequisites VARCHAR(200),
+    PRIMARY KEY (id)
+);
+CREATE TABLE knowledge_state (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, topic_id INTEGER NOT NULL, knowledge_level FLOAT,
+    confidence FLOAT, last_practiced DATETIME, practice_count INTEGER, updated_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(topic_id) REFERENCES topic (id)
+);
+CREATE TABLE learning_session (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, topic_id INTEGER NOT NULL, content TEXT NOT NULL,
+    difficulty VARCHAR(20), duration INTEGER, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(topic_id) REFERENCES topic (id)
+);
+CREATE TABLE quiz_attempt (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, topic_id INTEGER NOT NULL, question TEXT NOT NULL,
+    user_answer TEXT, correct_answer TEXT, is_correct BOOLEAN, difficulty VARCHAR(20), time_taken INTEGER,
+    created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(topic_id) REFERENCES topic (id)
+);
+'''
+
+# Unknown ids, junk and self-references in the old column are skipped
+OLD_TOPICS = [(1, 'Python Basics', ''), (2, 'Data Structures', '1'), (3, 'Algorithms', '1,2'),
+              (4, 'Neural Networks', '3, 9,x,4')]
+COPIED_PREREQUISITES = {(2, 1), (3, 1), (3, 2), (4, 3)}
+
+
+def setup_old_database():
+    """The old tables with two users' practice and two stale duplicates of one state; returns that state"""
+    conn = sqlite3.connect(DATABASE)
+    conn.executescript(OLD_SCHEMA)
+    conn.executemany(
+        "INSERT INTO topic (id, name, category, difficulty, prerequisites) VALUES (?, ?, 'Test', 'beginner', ?)",
+        OLD_TOPICS
+    )
+    conn.executemany("INSERT INTO user (id, username, email) VALUES (?, ?, ?)",
+                     [(1, 'old_user_1', 'old1@example.com'), (2, 'old_user_2', 'old2@example.com')])
+    conn.executemany(
+        "INSERT INTO knowledge_state (user_id, topic_id, knowledge_level, confidence, last_practiced, practice_count) "
+        "VALUES (?, ?, ?, 0.5, ?, ?)",
+        [(1, 1, 0.8, '2026-03-01 10:00:00', 5), (1, 2, 0.6, '2026-03-02 10:00:00', 3),
+         (1, 3, 0.4, '2026-03-03 10:00:00', 1), (2, 1, 0.5, '2026-03-01 12:00:00', 2)]
+    )
+    for _ in range(2):
+        conn.execute(
+            "INSERT INTO knowledge_state (user_id, topic_id, knowledge_level, confidence, last_practiced, practice_count) "
+            "VALUES (1, 2, 0.1, 0.1, '2020-01-01 00:00:00', 2)"
+        )
+    conn.commit()
+    conn.close()
+    return {'id': 2, 'user_id': 1, 'topic_id': 2, 'practice_count': 3}
+
+
+def old_database_app():
+    """A second app on the old database, so the test's shared database is left alone"""
+    old_app = Flask(__name__)
+    old_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DATABASE
+    db.init_app(old_app)
+    return old_app
+
+
+def test_migrations():
+    print("\n" + "="*60)
+    print("TEST: Database migrations")
+    print("="*60)
+    
+    duplicated = setup_old_database()
+    old_app = old_database_app()
+    results = []
+    print(f"\nResult:")
+    
+    with old_app.app_context():
+        # What init_db does to an existing database
+        db.create_all()
+        migrations.upgrade()
+        registry.get('review_queue').backfill()
+        
+        applied = [row.version for row in SchemaMigration.query.order_by(SchemaMigration.version)]
+        check(results, "old database upgraded", applied == [version for version, _, _ in migrations.MIGRATIONS],
+              f"versions {applied}")
+        
+        states = KnowledgeState.query.filter_by(user_id=duplicated['user_id'], topic_id=duplicated['topic_id']).all()
+        check(results, "duplicates merged into the latest state",
+              len(states) == 1 and states[0].id == duplicated['id']
+              and states[0].practice_count == duplicated['practice_count'] + 4,
+              f"{len(states)} state(s), practice count {states[0].practice_count if states else '-'}")
+        
+        inspector = inspect(db.engine)
+        indexes = {index['name']: index for table in ('knowledge_state', 'quiz_attempt', 'learning_session')
+                   for index in inspector.get_indexes(table)}
+        expected = ['uq_knowledge_state_user_topic', 'ix_quiz_attempt_user_created',
+                    'ix_quiz_attempt_topic_user_created', 'ix_learning_session_user_created']
+        check(results, "indexes created", all(name in indexes for name in expected)
+              and indexes['uq_knowledge_state_user_topic']['unique'],
+              ', '.join(name for name in expected if name in indexes))
+        
+        check(results, "new tables created and reviews backfilled",
+              ReviewSchedule.query.count() == KnowledgeState.query.count() > 0,
+              f"{ReviewSchedule.query.count()} scheduled reviews")
+        
+        copied = set(db.session.execute(db.select(TopicPrerequisite.topic_id, TopicPrerequisite.prerequisite_id)).all())
+        check(results, "prerequisites copied into their table", copied == COPIED_PREREQUISITES,
+              f"{len(copied)} prerequisite pairs")
+        
+        check(results, "second upgrade is a no-op", migrations.upgrade() == [])
+        
+        db.session.add(KnowledgeState(user_id=duplicated['user_id'], topic_id=duplicated['topic_id']))
+        try:
+            db.session.commit()
+            rejected = False
+        except IntegrityError:
+            db.session.rollback()
+            rejected = True
+        check(results, "duplicate state rejected", rejected)
+        
+        user = User(username='migration_user', email='migration@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id, topic_id = user.id, Topic.query.first().id
+    
+    # Concurrent first lookups: every request gets the same single state
+    barrier = threading.Barrier(8)
+    found, errors = [], []
+    
+    def first_lookup():
+        with old_app.app_context():
+            try:
+                barrier.wait()
+                found.append(KnowledgeTracker().get_or_create_knowledge_state(user_id, topic_id).id)
+            except Exception as e:
+                errors.append(repr(e))
+    
+    threads = [threading.Thread(target=first_lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with old_app.app_context():
+        rows = KnowledgeState.query.filter_by(user_id=user_id, topic_id=topic_id).count()
+    check(results, "concurrent creation leaves one state", rows == 1 and len(set(found)) == 1 and not errors,
+          f"{rows} row(s), {len(found)} lookups, {len(errors)} errors" + (f" ({errors[0]})" if errors else ""))
+    
+    # Cached rates may have been read from the old database meanwhile
+    registry.get('topic_parameters').invalidate()
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_migrations()
+    exit(0 if passed else 1)
@@ -0,0 +1,111 @@
+"""
+Progress summary test for progress_summary.py
+
+Drives one student through many quiz submissions on more topics than a
+summary keeps, with time moving forward so levels decay between them, and
+after every submission compares the stored (incrementally updated) summary
+with one computed from scratch from the knowledge states.
+"""
+import random
+from datetime import datetime, timedelta
+
+from conftest import check
+from app import app, db
+from knowledge_tracker import KnowledgeTracker
+from models import User, Topic, KnowledgeState, ProgressSummary
+
+
+def setup_user():
+    """A user and 25 topics (more than a summary list keeps)"""
+    with app.app_context():
+        for i in range(25 - Topic.query.count()):
+            db.session.add(Topic(name=f'Extra Topic {i}', category='Test', difficulty='beginner'))
+        user = User(username='summary_user', email='summary@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user.id, [topic.id for topic in Topic.query.order_by(Topic.id)]
+
+
+def reference_summary(tracker, user_id, now):
+    """The summary computed from scratch, as get_progress_summary did before it was stored"""
+    states = KnowledgeState.query.filter_by(user_id=user_id).all()
+    names = {topic.id: topic.name for topic in Topic.query.all()}
+    levels = tracker.current_levels(states, now)
+    pairs = [(state.topic_id, level) for state, level in zip(states, levels)]
+    
+    def listed(items):
+        return [{'id': tid, 'name': names[tid], 'level': round(level, 2)} for tid, level in items[:5]]
+    
+    return {
+        'average_knowledge': round(sum(levels) / len(levels), 2) if levels else 0,
+        'topics_mastered': sum(1 for _, level in pairs if level >= 0.8),
+        'topics_in_progress': sum(1 for _, level in pairs if 0 < level < 0.8),
+        'total_practice_count': sum(state.practice_count for state in states),
+        'weak_topics': listed(sorted((p for p in pairs if p[1] <= 0.3), key=lambda p: (p[1], p[0]))),
+        'strong_topics': listed(sorted((p for p in pairs if p[1] >= 0.8), key=lambda p: (-p[1], p[0])))
+    }
+
+
+def test_progress_summary():
+    print("\n" + "="*60)
+    print("TEST: Stored progress summary")
+    print("="*60)
+    
+    user_id, topic_ids = setup_user()
+    rng = random.Random(11)
+    tracker = KnowledgeTracker()
+    results = []
+    print(f"\nResult:")
+    
+    with app.app_context():
+        now = datetime.utcnow()
+        mismatches = []
+        longest = {'weak_topics': 0, 'strong_topics': 0}
+        for step in range(150):
+            # Favor a few topics so some get mastered while others fade
+            topic_id = rng.choice(topic_ids[:6] if rng.random() < 0.6 else topic_ids)
+            answers = [(rng.random() < 0.8, rng.choice(['beginner', 'intermediate', 'advanced']))
+                       for _ in range(rng.randint(1, 5))]
+            now += timedelta(hours=rng.choice([0, 1, 5, 20, 30]))
+            
+            tracker.apply_attempts(user_id, topic_id, answers, now)
+            db.session.commit()
+            
+            stored = tracker.summaries.get(user_id, now)
+            expected = reference_summary(tracker, user_id, now)
+            if stored != expected:
+                mismatches.append((step, stored, expected))
+            for key in longest:
+                longest[key] = max(longest[key], len(stored[key]))
+        
+        check(results, "matches a full recompute after every submission", not mismatches,
+              f"{len(mismatches)} of 150 differ" + (f", first at step {mismatches[0][0]}" if mismatches else ""))
+        if mismatches:
+            print(f"      stored:   {mismatches[0][1]}")
+            print(f"      expected: {mismatches[0][2]}")
+        
+        check(results, "both lists filled at some point", longest['weak_topics'] == 5 and longest['strong_topics'] > 0,
+              f"up to {longest['weak_topics']} weak, {longest['strong_topics']} strong")
+        
+        summary = tracker.summaries.get(user_id, now)
+        
+        # Untouched for a week: the row is past valid_until and rebuilt with the decayed levels
+        row = db.session.get(ProgressSummary, user_id)
+        later = now + timedelta(days=7)
+        fresh_before = row.valid_until > now
+        decayed = tracker.summaries.get(user_id, later)
+        check(results, "rebuilt once levels decay", fresh_before and decayed == reference_summary(tracker, user_id, later)
+              and decayed['average_knowledge'] < summary['average_knowledge'],
+              f"average {summary['average_knowledge']} -> {decayed['average_knowledge']}")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_progress_summary()
+    exit(0 if passed else 1)
@@ -0,0 +1,137 @@
+"""
+Query budget test for the agent-backed endpoints
+
+Counts the SQL statements each endpoint issues (workflow threads included)
+and fails when one exceeds its budget.
+"""
+from datetime import datetime, timedelta
+
+from conftest import check
+from sqlalchemy import event
+from app import app, db
+from models import User, Topic, KnowledgeState
+from services import registry
+
+# Maximum SQL statements per request
+QUERY_BUDGETS = {
+    'generate-lesson': 3,  # snapshot (1; topics are cached), due reviews (1, first use; cached after), save lesson (1)
+    'generate-quiz': 1,  # snapshot (1); knowledge decays on read, never written here
+    'next-topic': 1,  # snapshot (1)
+    'ask-challenge-hint': 0,
+    'submit-quiz': 8,  # topic (1), insert attempts (1), knowledge state read + write (2), progress summary rebuilt (3),
+                       # review rescheduled (1)
+    'submit-quiz again': 7,  # progress summary updated in place (2), review rescheduled (1)
+    'progress-summary': 1  # stored summary (1)
+}
+
+
+class QueryCounter:
+    """Counts statements executed on the engine while active"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        self.active = False
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.count += 1
+            self.statements.append(statement.split('\n')[0][:80])
+    
+    def __enter__(self):
+        self.count = 0
+        self.statements = []
+        self.active = True
+        return self
+    
+    def __exit__(self, *exc):
+        self.active = False
+
+
+def setup_user():
+    """A learner with a few practiced topics, some of them stale"""
+    with app.app_context():
+        topic_ids = [t.id for t in Topic.query.order_by(Topic.id).all()]
+        user = User(username='query_user', email='query@example.com')
+        db.session.add(user)
+        db.session.flush()
+        
+        for topic_id, level, days_ago in [(topic_ids[0], 0.9, 10), (topic_ids[1], 0.5, 2), (topic_ids[2], 0.2, 0)]:
+            practiced = datetime.utcnow() - timedelta(days=days_ago)
+            db.session.add(KnowledgeState(
+                user_id=user.id,
+                topic_id=topic_id,
+                knowledge_level=level,
+                confidence=0.5,
+                last_practiced=practiced,
+                practice_count=3
+            ))
+            # Their reviews are scheduled, as practicing them would have
+            registry.get('review_queue').record(user.id, topic_id, level, practiced)
+        
+        db.session.commit()
+        
+        # Topics and fitted rates cached up front, as at startup (earlier tests may have changed them)
+        registry.get('topic_parameters').rates()
+        registry.get('topic_graph').get()
+        return user.id, topic_ids[1]
+
+
+def test_query_budgets():
+    """Every agent-backed endpoint stays within its query budget"""
+    print("\n" + "="*60)
+    print("TEST: Queries per endpoint")
+    print("="*60)
+    
+    user_id, topic_id = setup_user()
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    client = app.test_client()
+    
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'query_user'
+    
+    quiz = {'topic_id': topic_id, 'answers': [
+        {'question': f'Q{i}', 'user_answer': 'A', 'correct_answer': 'A' if i % 2 else 'B', 'difficulty': 'beginner'}
+        for i in range(5)
+    ]}
+    submit_quiz = lambda: client.post('/api/submit-quiz', json=quiz)
+    
+    calls = {
+        'generate-lesson': lambda: client.post('/api/generate-lesson', json={'topic_id': topic_id}),
+        'generate-quiz': lambda: client.post('/api/generate-quiz', json={'topic_id': topic_id}),
+        'next-topic': lambda: client.get('/api/next-topic'),
+        'ask-challenge-hint': lambda: client.post('/api/ask-challenge-hint', json={
+            'question': 'How do I start?', 'challenge': 'Sum a list', 'attempt_count': 1
+        }),
+        'submit-quiz': submit_quiz,
+        'submit-quiz again': submit_quiz,
+        'progress-summary': lambda: client.get('/api/progress-summary')
+    }
+    
+    results = []
+    print(f"\nResult:")
+    for name, call in calls.items():
+        with counter:
+            response = call()
+        
+        budget = QUERY_BUDGETS[name]
+        ok = response.status_code == 200 and counter.count <= budget
+        check(results, name, ok, f"{counter.count} queries (budget {budget}, status {response.status_code})")
+        if not ok:
+            for statement in counter.statements:
+                print(f"      {statement}")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_query_budgets()
+    exit(0 if passed else 1)
@@ -0,0 +1,105 @@
+"""
+Quiz parser test for quiz_parser.py
+
+Feeds quiz responses to IncrementalQuizParser as the model would stream
+them and checks each question comes out once it is complete, whatever the
+chunking, despite prose and code fences around the array, trailing commas,
+raw newlines inside strings and a truncated final question; and that
+objects that are not usable questions are skipped and counted.
+"""
+import json
+import random
+
+from conftest import check
+from quiz_parser import IncrementalQuizParser, parse_quiz_text
+
+
+def question(number, **overrides):
+    item = {
+        "question": f"Question {number}: what does {{}} create?",
+        "options": {"A": "A dict", "B": "A set", "C": "A list", "D": "A tuple"},
+        "correct_answer": "A",
+        "explanation": "Empty braces are a \"dict\", not a set."
+    }
+    item.update(overrides)
+    return item
+
+
+def stream(text, chunks):
+    """Feed text in the given chunks; returns (questions per feed, questions from close, parser)"""
+    parser = IncrementalQuizParser()
+    fed = [parser.feed(chunk) for chunk in chunks]
+    return fed, parser.close(), parser
+
+
+def test_quiz_parser():
+    print("\n" + "="*60)
+    print("TEST: Incremental quiz parser")
+    print("="*60)
+    
+    rng = random.Random(4)
+    expected = [question(1), question(2), question(3)]
+    text = json.dumps(expected, indent=2)
+    results = []
+    print(f"\nResult:")
+    
+    # An object split across chunks is yielded by the chunk that closes it
+    middle = text.index('"options"', text.index('Question 2'))
+    fed, closed, _ = stream(text, [text[:middle], text[middle:]])
+    check(results, "object split across chunks",
+          fed[0] == expected[:1] and fed[1] == expected[1:] and closed == [])
+    
+    splits_ok = True
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 30)))
+        bounds = [0] + cuts + [len(text)]
+        fed, closed, _ = stream(text, [text[a:b] for a, b in zip(bounds, bounds[1:])])
+        splits_ok = splits_ok and [q for batch in fed for q in batch] + closed == expected
+    check(results, "any chunking gives the same questions", splits_ok)
+    
+    # Prose and a code fence around the array
+    wrapped = "Sure! Here is your quiz:\n```json\n" + text + "\n```\nGood luck {and have fun}!"
+    check(results, "prose and code fences ignored", parse_quiz_text(wrapped) == expected)
+    
+    # Trailing commas inside objects and after the last item
+    trailing = text.replace('"D": "A tuple"', '"D": "A tuple",').replace('\n  }\n]', '\n  },\n]')
+    check(results, "trailing commas repaired", trailing != text and parse_quiz_text(trailing) == expected)
+    
+    # Raw newlines inside strings (the model wrapped a long explanation)
+    raw = text.replace('are a \\"dict\\", not', 'are a \\"dict\\",\nnot')
+    parsed = parse_quiz_text(raw)
+    check(results, "raw newlines in strings kept", raw != text and len(parsed) == 3
+          and parsed[0]['explanation'] == 'Empty braces are a "dict",\nnot a set.')
+    
+    # Output cut off in the last question: close() salvages it once the required fields are in
+    cut = text.index('"explanation"', text.index('Question 3')) + len('"explanation": "Empty br')
+    fed, closed, parser = stream(text[:cut], [text[:cut]])
+    check(results, "truncated final question salvaged by close()",
+          fed[0] == expected[:2] and len(closed) == 1 and closed[0]['correct_answer'] == 'A'
+          and closed[0]['explanation'] == 'Empty br' and parser.skipped == 0)
+    
+    cut = text.index('"options"', text.index('Question 3')) + len('"options": {"A": "A d')
+    fed, closed, parser = stream(text[:cut], [text[:cut]])
+    check(results, "truncated before the required fields dropped",
+          fed[0] == expected[:2] and closed == [] and parser.skipped == 1)
+    
+    # Objects that are not usable questions are skipped and counted
+    no_answer = {key: value for key, value in question(2).items() if key != 'correct_answer'}
+    unusable = [question(1), no_answer, {"question": "No options?", "correct_answer": "A"},
+                question(4, options=["A", "B"]), question(5)]
+    fed, closed, parser = stream(json.dumps(unusable), [json.dumps(unusable)])
+    check(results, "questions without correct_answer or options skipped",
+          [q['question'] for q in fed[0]] == [question(1)['question'], question(5)['question']]
+          and parser.skipped == 3, f"{parser.skipped} skipped")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_quiz_parser()
+    exit(0 if passed else 1)
@@ -0,0 +1,96 @@
+"""
+Quiz pool test for quiz_pool.py
+
+Checks with a stub generator that the first take() starts the refill
+worker and misses on an empty slot, that every (topic, band) slot is filled
+to target_size and refilled after a take, and that quizzes the generator
+failed to produce are never pooled.
+"""
+import threading
+import time
+
+from conftest import check
+from app import app
+from models import Topic
+from quiz_pool import QuizPool
+
+TARGET = 2
+
+
+class StubGenerator:
+    """Numbered quizzes per (topic, band); the first `failures` calls raise"""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, topic, band):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call <= self.failures:
+            raise RuntimeError("provider unavailable")
+        return [{'question': f"{topic.name} ({band}) #{call}?"}]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_quiz_pool():
+    print("\n" + "="*60)
+    print("TEST: Quiz pool")
+    print("="*60)
+    
+    with app.app_context():
+        topic_id = Topic.query.first().id
+        slots = Topic.query.count() * len(QuizPool.BANDS)
+    
+    generator = StubGenerator(failures=2)
+    pool = QuizPool(app, generator, target_size=TARGET, refill_interval=0.05)
+    results = []
+    print(f"\nResult:")
+    
+    # Nothing runs until the first take(), which misses
+    first = pool.take(topic_id, 'mid')
+    check(results, "first take() on an empty slot misses", first is None and pool.stats['misses'] == 1)
+    check(results, "first take() started the worker", pool.get_status()['running'])
+    
+    filled = wait_for(lambda: pool.get_status()['total_ready'] == slots * TARGET)
+    status = pool.get_status()
+    check(results, "every slot filled to target_size",
+          filled and all(depth == TARGET for bands in status['depths'].values() for depth in bands.values()),
+          f"{status['total_ready']} quizzes for {slots} slots")
+    
+    # Failed generations are counted and retried, never pooled
+    pooled = [quiz for slot in pool._pools.values() for quiz in slot]
+    check(results, "failed generations not pooled",
+          status['stats']['failures'] == 2 and status['stats']['generated'] == slots * TARGET
+          and all(isinstance(quiz, list) and quiz[0]['question'].endswith('?') for quiz in pooled),
+          f"{status['stats']['failures']} failures, {status['stats']['generated']} generated")
+    
+    # Taking a quiz serves it and wakes the worker to top the slot up again
+    quiz = pool.take(topic_id, 'high')
+    check(results, "take() serves a pooled quiz", quiz is not None and '(high)' in quiz[0]['question'])
+    check(results, "slot refilled after a take",
+          wait_for(lambda: pool.get_status()['depths'][topic_id]['high'] == TARGET))
+    
+    pool.stop()
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_quiz_pool()
+    exit(0 if passed else 1)
@@ -0,0 +1,131 @@
+"""
+Review queue test for review_queue.py
+
+Several students practice topics at random times; after every quiz the
+due reviews from the cached per-user heaps are compared with the old scan
+of every knowledge state, at times up to three weeks ahead, and the users
+with reviews due on a day with a brute-force check.
+"""
+import random
+from datetime import datetime, timedelta
+
+from conftest import check
+from app import app, db
+from knowledge_tracker import KnowledgeTracker
+from models import User, Topic, KnowledgeState
+from services import registry
+
+
+def setup_users():
+    with app.app_context():
+        users = [User(username=f'review_{i}', email=f'review_{i}@example.com') for i in range(4)]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users], [topic.id for topic in Topic.query.order_by(Topic.id)]
+
+
+def reference_reviews(tracker, user_id, now):
+    """Due reviews as KnowledgeAgent.decide found them, by scanning every knowledge state"""
+    states = KnowledgeState.query.filter_by(user_id=user_id).all()
+    reviews = []
+    for state, level in zip(states, tracker.current_levels(states, now)):
+        days_since = (now - state.last_practiced).days
+        if days_since > 7 and level > 0.3:
+            reviews.append((state.topic_id, days_since, level, days_since * (1 - level)))
+    reviews.sort(key=lambda review: review[3], reverse=True)
+    return reviews[:3]
+
+
+def reference_users_due(tracker, user_ids, now):
+    """Users with a review that falls due before midnight while the topic is still above 0.3"""
+    day_end = datetime.combine(now.date(), datetime.min.time()) + timedelta(days=1)
+    due = []
+    for user_id in user_ids:
+        for state in KnowledgeState.query.filter_by(user_id=user_id):
+            due_at = state.last_practiced + timedelta(days=8)
+            if due_at < day_end and tracker.current_level(state, max(now, due_at)) > 0.3:
+                due.append(user_id)
+                break
+    return due
+
+
+def as_tuples(reviews):
+    return [(r['topic_id'], r['days_since'], r['current_level'], r['priority']) for r in reviews]
+
+
+def test_review_queue():
+    print("\n" + "="*60)
+    print("TEST: Due-review index")
+    print("="*60)
+    
+    user_ids, topic_ids = setup_users()
+    rng = random.Random(5)
+    tracker = KnowledgeTracker()
+    queue = registry.get('review_queue')
+    results = []
+    print(f"\nResult:")
+    
+    with app.app_context():
+        now = datetime.utcnow()
+        for user_id in user_ids:
+            queue.due(user_id, now=now)  # load every heap before any practice
+        loads = queue.get_status()['loads']
+        
+        mismatches, checks, found = [], 0, 0
+        for step in range(200):
+            user_id, topic_id = rng.choice(user_ids), rng.choice(topic_ids)
+            answers = [(rng.random() < 0.85, 'intermediate') for _ in range(rng.randint(1, 6))]
+            now += timedelta(hours=rng.choice([1, 6, 30, 80]))
+            tracker.apply_attempts(user_id, topic_id, answers, now)
+            db.session.commit()
+            
+            for ahead in (0, 8, 21):
+                at = now + timedelta(days=ahead, hours=rng.randint(0, 23))
+                got, expected = as_tuples(queue.due(user_id, k=3, now=at)), reference_reviews(tracker, user_id, at)
+                checks += 1
+                found += len(expected)
+                if got != expected:
+                    mismatches.append((step, at, got, expected))
+        
+        check(results, "due reviews match a full scan", not mismatches and found > 0,
+              f"{checks - len(mismatches)}/{checks} checks, {found} reviews found")
+        if mismatches:
+            print(f"      first at step {mismatches[0][0]}: {mismatches[0][2]} vs {mismatches[0][3]}")
+        check(results, "heaps kept current without reloading", queue.get_status()['loads'] == loads,
+              f"{queue.get_status()['loads'] - loads} reloads")
+        
+        # A rolled-back practice never reaches the heap, including one creating a state under a savepoint
+        at = now + timedelta(days=10)
+        user_id = max(user_ids, key=lambda user_id: len(reference_reviews(tracker, user_id, at)))
+        before = as_tuples(queue.due(user_id, now=at))
+        new_topic = Topic(name='Review Rollback', category='Test', difficulty='beginner')
+        db.session.add(new_topic)
+        db.session.commit()
+        for topic_id in topic_ids + [new_topic.id]:
+            tracker.apply_attempts(user_id, topic_id, [(True, 'advanced')] * 3, now + timedelta(days=1))
+        db.session.rollback()
+        after = as_tuples(queue.due(user_id, now=at))
+        check(results, "rollback leaves the heap alone", after and after == before == reference_reviews(tracker, user_id, at),
+              f"{len(after)} due before and after")
+        
+        # Batch: who has reviews due on a given day, over the next month
+        days_matching, notified = 0, 0
+        for day in range(30):
+            at = now + timedelta(days=day)
+            users_due = [due for due in queue.users_due(now=at) if due in user_ids]  # other tests share the database
+            days_matching += users_due == reference_users_due(tracker, user_ids, at)
+            notified += len(users_due)
+        check(results, "users due match a brute-force check", days_matching == 30 and notified > 0,
+              f"{days_matching}/30 days, {notified} user-days due")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_review_queue()
+    exit(0 if passed else 1)
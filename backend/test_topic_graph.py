@@ -0,0 +1,113 @@
+"""
+Topic graph test for topic_graph.py
+
+Checks the cached prerequisite DAG against brute force on a random graph
+(transitive closure, topological order), that cycles are reported and
+broken instead of looping, that learning paths put every prerequisite
+first, and that a committed prerequisite change reaches the cache.
+"""
+import random
+
+from conftest import check
+from app import app, db
+from agents.recommendation_agent import RecommendationAgent
+from models import User, Topic, TopicPrerequisite
+from services import registry
+from topic_graph import TopicDAG
+
+
+def random_dag(size, rng):
+    """Topics with shuffled ids, each requiring a few topics created before it"""
+    ids = rng.sample(range(1, 10 * size), size)
+    topics = [(topic_id, f'T{topic_id}', 'Test', 'beginner', '') for topic_id in ids]
+    edges = [(ids[i], ids[j]) for i in range(size) for j in rng.sample(range(i), min(i, rng.randint(0, 3)))]
+    return topics, edges
+
+
+def brute_force_ancestors(edges, topic_id):
+    direct = {}
+    for topic, prerequisite in edges:
+        direct.setdefault(topic, set()).add(prerequisite)
+    seen, stack = set(), [topic_id]
+    while stack:
+        for prerequisite in direct.get(stack.pop(), ()):
+            if prerequisite not in seen:
+                seen.add(prerequisite)
+                stack.append(prerequisite)
+    return seen
+
+
+def learnable_in_order(dag, path):
+    """Every topic comes after all its direct prerequisites that are on the path"""
+    position = {topic_id: i for i, topic_id in enumerate(path)}
+    return all(position[pid] < position[topic_id]
+               for topic_id in path for pid in dag.prerequisites(topic_id) if pid in position)
+
+
+def test_topic_graph():
+    print("\n" + "="*60)
+    print("TEST: Topic prerequisite graph")
+    print("="*60)
+    
+    rng = random.Random(9)
+    results = []
+    print(f"\nResult:")
+    
+    # Closure and order on a random DAG
+    topics, edges = random_dag(300, rng)
+    dag = TopicDAG(topics, edges)
+    rank = {topic_id: i for i, topic_id in enumerate(dag.order)}
+    check(results, "topological order", len(dag.order) == 300 and all(rank[p] < rank[t] for t, p in edges),
+          f"{len(edges)} edges")
+    closures_match = all(set(dag.ancestors(topic[0])) == brute_force_ancestors(edges, topic[0]) for topic in topics)
+    pairs = [(rng.choice(topics)[0], rng.choice(topics)[0]) for _ in range(2000)]
+    bits_match = all(dag.requires(a, b) == (b in brute_force_ancestors(edges, a)) for a, b in pairs)
+    check(results, "transitive closure matches brute force", closures_match and bits_match and not dag.cycles)
+    
+    # A cycle is broken, not followed forever
+    loop = [(2, 1), (3, 2), (1, 3)]
+    cyclic = TopicDAG([(i, f'T{i}', 'Test', 'beginner', '') for i in (1, 2, 3, 4)], loop + [(4, 3), (4, 4)])
+    kept = [edge for edge in loop + [(4, 3)] if edge not in cyclic.cycles]
+    check(results, "cycles reported and broken", len(cyclic.cycles) == 2 and (4, 4) in cyclic.cycles
+          and len(kept) == 3 and sorted(cyclic.order) == [1, 2, 3, 4]
+          and all(cyclic.rank[p] < cyclic.rank[t] for t, p in kept) and cyclic.requires(4, 3),
+          f"dropped {cyclic.cycles}")
+    
+    with app.app_context():
+        user = User(username='graph_user', email='graph@example.com')
+        db.session.add(user)
+        db.session.commit()
+        names = {topic.name: topic.id for topic in Topic.query}
+        
+        # Neural Networks <- Machine Learning Basics <- (Python Basics, Data Structures <- Python Basics)
+        graph = registry.get('topic_graph').get()
+        result = RecommendationAgent().create_learning_path(user.id, names['Neural Networks'])
+        path = [step['topic_id'] for step in result['path']]
+        expected = [names['Python Basics'], names['Data Structures'], names['Machine Learning Basics'], names['Neural Networks']]
+        check(results, "learning path has prerequisites first", path == expected and learnable_in_order(graph, path),
+              ' -> '.join(step['name'] for step in result['path']))
+        
+        # A committed change is seen without waiting for the TTL
+        db.session.add(TopicPrerequisite(topic_id=names['Neural Networks'], prerequisite_id=names['Algorithms']))
+        db.session.commit()
+        updated = registry.get('topic_graph').get()
+        check(results, "graph rebuilt after a prerequisite change",
+              updated is not graph and updated.requires(names['Neural Networks'], names['Algorithms'])
+              and learnable_in_order(updated, updated.path_to(names['Neural Networks'])),
+              f"{len(updated.path_to(names['Neural Networks']))} topics on the path now")
+        
+        # Leave the seeded graph as it was for other tests
+        TopicPrerequisite.query.filter_by(topic_id=names['Neural Networks'], prerequisite_id=names['Algorithms']).delete()
+        db.session.commit()
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_topic_graph()
+    exit(0 if passed else 1)
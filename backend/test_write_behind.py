@@ -0,0 +1,136 @@
+"""
+Write-behind buffer test for QuizAttempt and LearningSession inserts
+
+Checks that buffered attempts are visible to the same user's reads before
+they reach the database, that batches flush by size and on shutdown, and
+that journal segments left by a crashed process are replayed exactly once.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from conftest import TEMP_DIR, check
+from app import app, db
+from learner_snapshot import LearnerSnapshot
+from models import User, Topic, QuizAttempt, LearningSession
+from services import registry
+from write_behind import WriteBehindBuffer
+
+JOURNAL = os.path.join(TEMP_DIR, 'journal', 'write_behind.jsonl')
+
+
+def setup_client():
+    """A logged-in client for a fresh user; returns (client, user_id, topic_id)"""
+    with app.app_context():
+        user = User(username='buffer_user', email='buffer@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id, topic_id = user.id, Topic.query.first().id
+    
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = 'buffer_user'
+    return client, user_id, topic_id
+
+
+def leave_crashed_segment(user_id, topic_id):
+    """A journal segment as a crashed process leaves it: one row already committed, one not, a torn line"""
+    saved = datetime(2026, 1, 1, 12, 0, 0)
+    with app.app_context():
+        db.session.add(QuizAttempt(user_id=user_id, topic_id=topic_id, question='saved',
+                                   is_correct=True, created_at=saved))
+        db.session.commit()
+    
+    os.makedirs(os.path.dirname(JOURNAL), exist_ok=True)
+    with open(JOURNAL + '.3', 'w', encoding='utf-8') as f:
+        for question, created_at in [('saved', saved), ('lost', datetime(2026, 1, 1, 12, 0, 1))]:
+            f.write(json.dumps({'model': 'QuizAttempt', 'fields': {
+                'user_id': user_id, 'topic_id': topic_id, 'question': question,
+                'is_correct': True, 'created_at': created_at.isoformat()
+            }}) + '\n')
+        f.write('{"model": "QuizAtt')
+
+
+def count(model, user_id, **filters):
+    with app.app_context():
+        return model.query.filter_by(user_id=user_id, **filters).count()
+
+
+@contextmanager
+def own_buffer():
+    """A buffer the app's handlers use meanwhile (they look it up in the registry); stopped afterwards"""
+    previous = registry.get('write_behind')
+    buffer = WriteBehindBuffer(app, batch_size=8, flush_interval=60, journal_path=JOURNAL)  # only size and stop flush
+    registry.register('write_behind', lambda: buffer)
+    try:
+        yield buffer
+    finally:
+        buffer.stop()
+        registry.register('write_behind', lambda: previous)
+
+
+def test_write_behind():
+    print("\n" + "="*60)
+    print("TEST: Write-behind inserts")
+    print("="*60)
+    
+    client, user_id, topic_id = setup_client()
+    results = []
+    print(f"\nResult:")
+    
+    with own_buffer() as buffer:
+        # Journal left by a crash is replayed on start, without duplicating what was saved
+        leave_crashed_segment(user_id, topic_id)
+        buffer.start()
+        replayed = count(QuizAttempt, user_id, question='saved'), count(QuizAttempt, user_id, question='lost')
+        check(results, "crash journal replayed once", replayed == (1, 1) and not os.path.exists(JOURNAL + '.3'),
+              f"saved x{replayed[0]}, lost x{replayed[1]}")
+        
+        # A quiz goes to the buffer: not in the table yet, but the user's reads see it
+        answers = [
+            {'question': f'Q{i}', 'user_answer': 'A', 'correct_answer': 'A', 'difficulty': 'beginner'}
+            for i in range(5)
+        ]
+        response = client.post('/api/submit-quiz', json={'topic_id': topic_id, 'answers': answers})
+        in_table = count(QuizAttempt, user_id) - 2
+        with app.app_context():
+            seen = LearnerSnapshot.load(user_id).recent_attempts
+        check(results, "quiz buffered", response.status_code == 200 and in_table == 0,
+              f"status {response.status_code}, {in_table} in table")
+        check(results, "read-your-writes", len(seen) == 7 and seen[0].created_at > seen[-1].created_at,
+              f"{len(seen)} recent attempts")
+        
+        # Three more rows fill the batch of 8 and wake the flush thread
+        for i in range(3):
+            client.post('/api/submit-answer', json={'topic_id': topic_id, 'question': f'S{i}', 'user_answer': 'A',
+                                                    'correct_answer': 'B', 'difficulty': 'beginner'})
+        deadline = time.time() + 5
+        while count(QuizAttempt, user_id) < 10 and time.time() < deadline:
+            time.sleep(0.02)
+        with app.app_context():
+            seen = LearnerSnapshot.load(user_id).recent_attempts
+        check(results, "full batch flushed", count(QuizAttempt, user_id) == 10, f"{count(QuizAttempt, user_id)} in table")
+        check(results, "no duplicates after flush", len(seen) == 10, f"{len(seen)} recent attempts")
+        
+        # Shutdown flushes the rest and leaves no journal behind
+        client.post('/api/generate-lesson', json={'topic_id': topic_id})
+        waiting = buffer.get_status()['waiting']
+        buffer.stop()
+        leftover = os.listdir(os.path.dirname(JOURNAL))
+        check(results, "shutdown flush", waiting == 1 and count(LearningSession, user_id) == 1 and not leftover,
+              f"{waiting} waiting before stop, {len(leftover)} journal segments left")
+    
+    if all(results):
+        print(f"\n[PASS] Test PASSED")
+        return True
+    
+    print(f"\n[FAIL] Test FAILED")
+    return False
+
+
+if __name__ == '__main__':
+    passed = test_write_behind()
+    exit(0 if passed else 1)
@@ -0,0 +1,173 @@
+"""
+Topic Graph - Topics and their prerequisites as a cached DAG
+"""
+from collections import namedtuple
+from config import Config
+from models import db, Topic, TopicPrerequisite
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, ProgrammingError
+import threading
+import time
+
+# Plain rows rather than ORM instances, shared by every request; prerequisites are direct prerequisite ids
+TopicInfo = namedtuple('TopicInfo', ['id', 'name', 'category', 'difficulty', 'description', 'prerequisites'])
+
+
+class TopicDAG:
+    """
+    One immutable load of the topics and the TopicPrerequisite edges.
+
+    Topics get a rank in a topological order (every prerequisite before the
+    topics that need it), and each topic's transitive prerequisites are kept
+    as a bitset over ranks, so "is A needed for B" is one bit test and the
+    prerequisites of a topic come out already ordered. Edges that would
+    close a cycle are dropped and listed in `cycles` as
+    (topic_id, prerequisite_id).
+    """
+
+    def __init__(self, topics, edges):
+        topics = sorted(topics, key=lambda topic: topic[0])
+        known = {topic[0] for topic in topics}
+        direct = {topic_id: [] for topic_id in known}
+        for topic_id, prerequisite_id in sorted(set(edges)):
+            if topic_id in known and prerequisite_id in known:
+                direct[topic_id].append(prerequisite_id)
+
+        order, self.cycles = self._topological_order([topic[0] for topic in topics], direct)
+        dropped = set(self.cycles)
+        self.rank = {topic_id: rank for rank, topic_id in enumerate(order)}
+        self.order = tuple(order)  # topic ids, prerequisites first
+
+        info = {}
+        for topic in topics:
+            kept = tuple(pid for pid in direct[topic[0]] if (topic[0], pid) not in dropped)
+            info[topic[0]] = TopicInfo(*topic[:5], kept)
+        self.topics = tuple(info[topic[0]] for topic in topics)  # by id
+        self.topics_by_id = info
+
+        # Transitive prerequisites; a prerequisite's set is complete before its dependents are visited
+        self._closure = {}
+        for topic_id in order:
+            bits = 0
+            for pid in info[topic_id].prerequisites:
+                bits |= self._closure[pid] | (1 << self.rank[pid])
+            self._closure[topic_id] = bits
+
+    @staticmethod
+    def _topological_order(topic_ids, direct):
+        """Depth-first postorder over prerequisites; returns (order, back edges dropped)"""
+        state = {}  # topic_id -> 1 on the DFS stack, 2 finished
+        order, cycles = [], []
+        for root in topic_ids:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(direct[root]))]
+            while stack:
+                topic_id, prerequisites = stack[-1]
+                for pid in prerequisites:
+                    if pid not in state:
+                        state[pid] = 1
+                        stack.append((pid, iter(direct[pid])))
+                        break
+                    if state[pid] == 1:
+                        cycles.append((topic_id, pid))
+                else:
+                    stack.pop()
+                    state[topic_id] = 2
+                    order.append(topic_id)
+        return order, cycles
+
+    def topic(self, topic_id):
+        """TopicInfo or None"""
+        return self.topics_by_id.get(topic_id)
+
+    def prerequisites(self, topic_id):
+        """Direct prerequisite ids"""
+        topic = self.topics_by_id.get(topic_id)
+        return topic.prerequisites if topic else ()
+
+    def requires(self, topic_id, prerequisite_id):
+        """Whether prerequisite_id is needed, directly or not, before topic_id"""
+        if topic_id not in self._closure or prerequisite_id not in self.rank:
+            return False
+        return bool(self._closure[topic_id] >> self.rank[prerequisite_id] & 1)
+
+    def ancestors(self, topic_id):
+        """Every transitive prerequisite of a topic, in topological order"""
+        bits = self._closure.get(topic_id, 0)
+        ancestors = []
+        while bits:
+            low = bits & -bits
+            ancestors.append(self.order[low.bit_length() - 1])
+            bits ^= low
+        return ancestors
+
+    def path_to(self, topic_id):
+        """The topic's transitive prerequisites then the topic itself, in an order they can be learned"""
+        if topic_id not in self.topics_by_id:
+            return []
+        return self.ancestors(topic_id) + [topic_id]
+
+
+class TopicGraph:
+    """
+    Process-wide TopicDAG, loaded on first use with two queries.
+
+    Rebuilt after a commit that changed a Topic or TopicPrerequisite through
+    the ORM, after invalidate() (for Core writes such as the init_db seed)
+    and once Config.TOPIC_GRAPH_TTL seconds have passed, so changes made by
+    other processes are picked up too.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = Config.TOPIC_GRAPH_TTL if ttl is None else ttl
+        self._dag = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'after_commit', self._after_commit)
+
+    def get(self):
+        """The current TopicDAG"""
+        dag = self._dag
+        if dag is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._dag is None or time.monotonic() - self._loaded_at > self.ttl:
+                    self._dag = self._load()
+                    self._loaded_at = time.monotonic()
+                dag = self._dag
+        return dag
+
+    def _load(self):
+        # Own connection: reads never join (or roll back) the caller's session
+        with db.engine.connect() as conn:
+            topics = conn.execute(db.select(
+                Topic.id, Topic.name, Topic.category, Topic.difficulty, Topic.description
+            )).all()
+            try:
+                edges = conn.execute(db.select(TopicPrerequisite.topic_id, TopicPrerequisite.prerequisite_id)).all()
+            except (OperationalError, ProgrammingError) as e:
+                # Database created before the table existed (init_db migrates it)
+                print(f"Topic prerequisites unavailable, using none: {e.orig}")
+                edges = []
+
+        dag = TopicDAG([tuple(topic) for topic in topics], [tuple(edge) for edge in edges])
+        if dag.cycles:
+            print(f"Topic prerequisites have cycles, ignoring (topic, prerequisite) edges: {dag.cycles}")
+        return dag
+
+    def invalidate(self):
+        self._dag = None
+
+    def _after_flush(self, session, flush_context):
+        if any(isinstance(obj, (Topic, TopicPrerequisite))
+               for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.info['topic_graph_changed'] = True
+
+    def _after_commit(self, session):
+        if session.in_nested_transaction():
+            return  # a savepoint released; the change is not committed yet
+        if session.info.pop('topic_graph_changed', False):
+            self.invalidate()
@@ -0,0 +1,346 @@
+"""
+Tracing - Lightweight request spans and always-on latency histograms
+"""
+from bisect import bisect_left
+from collections import defaultdict, deque
+from config import Config
+from contextvars import ContextVar
+from datetime import datetime
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+# Span the current code runs under; None outside a sampled trace
+_current_span = ContextVar('current_span', default=None)
+
+
+# ============ SPANS ============
+
+class Trace:
+    """One sampled unit of work (usually a request) and every span recorded under it"""
+
+    def __init__(self, name, tags):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.tags = dict(tags)
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.spans = []
+        self.db_seconds = 0.0
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        # Workflow steps report from their own threads
+        with self._lock:
+            if not self.finished:
+                self.spans.append(span)
+
+    def add_db_time(self, seconds):
+        with self._lock:
+            self.db_seconds += seconds
+
+    def to_dict(self, ended):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'tags': self.tags,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round((ended - self.started) * 1000, 2),
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'spans': [span.to_dict(self.started) for span in spans]
+        }
+
+
+class Span:
+    """Timed, tagged section of a trace; use as a context manager"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'tags', 'start', 'end', '_token')
+
+    def __init__(self, trace, parent_id, name, tags, start=None, end=None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent_id
+        self.name = name
+        self.tags = tags
+        self.start = start
+        self.end = end
+        self._token = None
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.tags['error'] = exc_type.__name__
+        self.trace.add(self)
+        return False
+
+    def to_dict(self, origin):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'tags': self.tags,
+            'start_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round((self.end - self.start) * 1000, 2)
+        }
+
+
+class _NullSpan:
+    """Stand-in used outside sampled traces: costs one ContextVar lookup"""
+
+    __slots__ = ()
+
+    def tag(self, **tags):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name, **tags):
+    """Child span of the current one, or a no-op when the current work isn't sampled"""
+    parent = _current_span.get()
+    if parent is None:
+        return NULL_SPAN
+    return Span(parent.trace, parent.span_id, name, tags)
+
+
+def record_span(name, start, end, **tags):
+    """Add an already-timed span (perf_counter values) under the current span"""
+    parent = _current_span.get()
+    if parent is not None:
+        parent.trace.add(Span(parent.trace, parent.span_id, name, tags, start, end))
+
+
+def tag_trace(**tags):
+    """Tag the current trace as a whole (e.g. with the coordinator task)"""
+    current = _current_span.get()
+    if current is not None:
+        current.trace.tags.update(tags)
+
+
+def start_trace(name, force=False, **tags):
+    """
+    Open a root span if this unit of work is sampled (Config.TRACE_SAMPLE_RATE,
+    or force=True). Returns a handle for finish_trace(), or None when not sampled.
+    """
+    if not force and (Config.TRACE_SAMPLE_RATE <= 0 or random.random() >= Config.TRACE_SAMPLE_RATE):
+        if _current_span.get() is not None:
+            _current_span.set(None)  # never inherit a span left over on a reused thread
+        return None
+
+    root = Span(Trace(name, tags), None, name, {})
+    root.__enter__()
+    return root
+
+
+def finish_trace(root, error=None):
+    """Close a root span from start_trace() and export its trace"""
+    if root is None:
+        return
+    try:
+        root.__exit__(type(error) if error else None, error, None)
+    except ValueError:
+        # Finished from another context than it started in; the span is still complete
+        root.trace.add(root)
+
+    trace = root.trace
+    record = trace.to_dict(root.end)
+    trace.finished = True
+    for exporter in get_exporters():
+        exporter.export(record)
+
+
+# ============ EXPORTERS ============
+
+class InMemoryExporter:
+    """Keeps the most recent traces for /api/admin/traces"""
+
+    def __init__(self, max_traces=None):
+        self._traces = deque(maxlen=max_traces or Config.TRACE_MEMORY_SIZE)
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        with self._lock:
+            self._traces.append(record)
+
+    def recent(self, limit=20):
+        with self._lock:
+            return list(self._traces)[-limit:][::-1]
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class JsonlExporter:
+    """Appends one JSON line per trace to a local file"""
+
+    def __init__(self, path=None):
+        self.path = path or Config.TRACE_PATH
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+_memory_exporter = None
+_exporters = None
+_exporters_lock = threading.Lock()
+
+
+def get_exporters():
+    """In-memory exporter always; JSONL as well when Config.TRACE_EXPORTER is 'jsonl'"""
+    global _exporters, _memory_exporter
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                _memory_exporter = InMemoryExporter()
+                exporters = [_memory_exporter]
+                if Config.TRACE_EXPORTER == 'jsonl':
+                    exporters.append(JsonlExporter())
+                _exporters = exporters
+    return _exporters
+
+
+def recent_traces(limit=20):
+    """Newest traces first"""
+    get_exporters()
+    return _memory_exporter.recent(limit)
+
+
+# ============ LATENCY HISTOGRAMS ============
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets (milliseconds); recording is a bisect and an increment"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, float('inf'))
+
+    def __init__(self):
+        self.counts = [0] * len(self.BOUNDS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS_MS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return round(min(bound, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 2),
+            'buckets': {
+                (f"<={bound:g}ms" if bound != float('inf') else f">{self.BOUNDS_MS[-2]:g}ms"): count
+                for bound, count in zip(self.BOUNDS_MS, self.counts) if count
+            }
+        }
+
+
+_histograms = defaultdict(dict)  # component -> operation -> LatencyHistogram
+_histograms_lock = threading.Lock()
+
+
+def record_latency(component, operation, seconds):
+    """Count one call in the component's histogram (recorded whether or not it is traced)"""
+    with _histograms_lock:
+        histogram = _histograms[component].get(operation)
+        if histogram is None:
+            histogram = _histograms[component][operation] = LatencyHistogram()
+        histogram.record(seconds * 1000)
+
+
+def get_latency_histograms():
+    """{component: {operation: summary}}"""
+    with _histograms_lock:
+        return {
+            component: {operation: histogram.summary() for operation, histogram in operations.items()}
+            for component, operations in _histograms.items()
+        }
+
+
+def traced(component, operation):
+    """Decorator: time every call into the histogram and open a span when sampled"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            name = component(self) if callable(component) else component
+            started = time.perf_counter()
+            try:
+                with span(f"{name}.{operation}", component=name, operation=operation):
+                    return method(self, *args, **kwargs)
+            finally:
+                record_latency(name, operation, time.perf_counter() - started)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorator
+
+
+# ============ DATABASE ============
+
+def instrument_sqlalchemy(engine):
+    """Time every statement of sampled traces as a 'db' span and add it to the trace's DB total"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is not None:
+            conn.info.setdefault('trace_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('trace_query_start')
+        parent = _current_span.get()
+        if not starts or parent is None:
+            return
+        start = starts.pop()
+        end = time.perf_counter()
+        parent.trace.add_db_time(end - start)
+        parent.trace.add(Span(parent.trace, parent.span_id, 'db', {
+            'statement': statement.split(None, 1)[0].upper(),
+            'executemany': executemany
+        }, start, end))
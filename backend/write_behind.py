@@ -0,0 +1,301 @@
+"""
+Write Behind - Buffered, journaled inserts for append-only rows
+"""
+from config import Config
+from datetime import datetime
+from models import db, QuizAttempt, LearningSession
+import glob
+import json
+import os
+import threading
+
+
+class WriteBehindBuffer:
+    """
+    Takes QuizAttempt and LearningSession inserts off the request path.
+
+    add() appends the row to a journal on disk and keeps it in memory; a
+    background thread inserts buffered rows in one statement per model and
+    commits once per batch, when Config.WRITE_BEHIND_BATCH_SIZE rows are
+    waiting or every Config.WRITE_BEHIND_FLUSH_INTERVAL seconds. stop()
+    flushes what is left, so a clean shutdown loses nothing.
+
+    The journal is what makes a crash safe: it is written in numbered
+    segments (journal_path.N), one per batch, and a segment is deleted only
+    after its rows are committed. start() inserts the rows of any segments
+    a previous process left behind, skipping rows that already made it.
+
+    Rows not yet in the database are still visible through pending(), so
+    a user's own reads can include them (see LearnerSnapshot.recent_attempts).
+    Like the job queue, this assumes one serving process per database.
+    """
+
+    MODELS = {model.__name__: model for model in (QuizAttempt, LearningSession)}
+
+    def __init__(self, app, batch_size=None, flush_interval=None, journal_path=None, fsync=None):
+        """
+        Args:
+            app: Flask app - Needed for DB access from the flush thread
+            batch_size: int - Buffered rows that trigger a flush
+            flush_interval: float - Seconds between flushes otherwise
+            journal_path: str - Journal segments are written to journal_path.N
+            fsync: bool - fsync the journal on every add (durable across power loss)
+        """
+        self.app = app
+        self.batch_size = batch_size or Config.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.WRITE_BEHIND_FLUSH_INTERVAL
+        self.journal_path = journal_path or Config.WRITE_BEHIND_JOURNAL_PATH
+        self.fsync = Config.WRITE_BEHIND_FSYNC if fsync is None else fsync
+
+        self._lock = threading.Lock()  # guards the buffers and the open segment
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._started = False
+
+        self._segment = 0  # number of the segment being written
+        self._journal = None  # open file of that segment
+        self._pending = []  # (model name, fields) in the open segment
+        self._unflushed = []  # (segment path, rows) closed and waiting for the database
+
+        self.stats = {
+            'buffered': 0,
+            'flushed': 0,
+            'batches': 0,
+            'errors': 0,
+            'recovered': 0
+        }
+
+    # ============ PUBLIC API ============
+
+    def add(self, model, **fields):
+        """Buffer one insert; returns the fields (created_at filled in)"""
+        return self.add_many(model, [fields])[0]
+
+    def add_many(self, model, rows):
+        """
+        Buffer several inserts of one model with a single journal write
+
+        Args:
+            model: QuizAttempt or LearningSession
+            rows: list of column dicts
+
+        Returns:
+            list - The rows as buffered
+        """
+        name = model.__name__
+        if name not in self.MODELS:
+            raise ValueError(f"{name} can't be written behind")
+
+        self.start()
+        now = datetime.utcnow()
+        rows = [{**fields, 'created_at': fields.get('created_at') or now} for fields in rows]
+        lines = ''.join(
+            json.dumps({'model': name, 'fields': fields}, default=_encode) + '\n'
+            for fields in rows
+        )
+
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self._segment_path(self._segment), 'a', encoding='utf-8')
+            self._journal.write(lines)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+
+            self._pending.extend((name, fields) for fields in rows)
+            self.stats['buffered'] += len(rows)
+            full = len(self._pending) >= self.batch_size
+
+        if full:
+            self._wake.set()
+        return rows
+
+    def pending(self, model, user_id):
+        """
+        A user's buffered rows of a model that may not be in the database yet
+
+        Read this *before* querying the table: a row flushed in between then
+        shows up in both (match on created_at), but never in neither.
+        """
+        name = model.__name__
+        with self._lock:
+            batches = [rows for _, rows in self._unflushed] + [self._pending]
+            return [
+                fields for rows in batches for row_model, fields in rows
+                if row_model == name and fields.get('user_id') == user_id
+            ]
+
+    def flush(self):
+        """Insert everything buffered so far; returns the number of rows inserted"""
+        with self._flush_lock:
+            with self._lock:
+                if self._pending:
+                    # Close the segment: its rows are inserted (and it is deleted) as one batch
+                    self._journal.close()
+                    self._journal = None
+                    self._unflushed.append((self._segment_path(self._segment), self._pending))
+                    self._segment += 1
+                    self._pending = []
+                batches = list(self._unflushed)
+
+            inserted = 0
+            for path, rows in batches:
+                with self.app.app_context():
+                    try:
+                        self._insert(rows)
+                    except Exception as e:
+                        db.session.rollback()
+                        self._bump(errors=1)
+                        print(f"Error flushing write-behind buffer (will retry): {e}")
+                        break
+
+                os.remove(path)
+                with self._lock:
+                    self._unflushed.pop(0)
+                self._bump(flushed=len(rows), batches=1)
+                inserted += len(rows)
+
+            return inserted
+
+    def start(self):
+        """Replay journal segments left by the last process and start the flush thread (idempotent)"""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            self._stopping.clear()
+
+            with self.app.app_context():
+                self._recover()
+
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+            self._started = True
+
+    def stop(self):
+        """Stop the flush thread and flush what is left (the shutdown hook)"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        self._started = False
+
+    def get_status(self):
+        with self._lock:
+            waiting = len(self._pending) + sum(len(rows) for _, rows in self._unflushed)
+            stats = dict(self.stats)
+
+        return {
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'fsync': self.fsync,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'waiting': waiting,
+            'stats': stats
+        }
+
+    # ============ FLUSHING ============
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error in write-behind flush: {e}")
+
+    def _insert(self, rows):
+        """One INSERT per model for a batch of (model name, fields), then one commit"""
+        by_model = {}
+        for name, fields in rows:
+            by_model.setdefault(name, []).append(fields)
+
+        for name, batch in by_model.items():
+            db.session.execute(db.insert(self.MODELS[name]), batch)
+        db.session.commit()
+
+    # ============ JOURNAL ============
+
+    def _segment_path(self, number):
+        return f"{self.journal_path}.{number}"
+
+    def _recover(self):
+        """Insert rows from journal segments that were never flushed, then delete the segments"""
+        segments = sorted(
+            (int(path.rsplit('.', 1)[1]), path)
+            for path in glob.glob(glob.escape(self.journal_path) + '.*')
+            if path.rsplit('.', 1)[1].isdigit()
+        )
+        if segments:
+            self._segment = segments[-1][0] + 1
+        else:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+
+        recovered = 0
+        for _, path in segments:
+            rows = self._unsaved(self._read_segment(path))
+            if rows:
+                self._insert(rows)
+            os.remove(path)
+            recovered += len(rows)
+
+        if recovered:
+            self._bump(recovered=recovered)
+            print(f"Recovered {recovered} buffered row(s) from the write-behind journal")
+
+    def _read_segment(self, path):
+        rows = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line: that add() never returned
+                model = self.MODELS[entry['model']]
+                rows.append((entry['model'], _decode(model, entry['fields'])))
+        return rows
+
+    def _unsaved(self, rows):
+        """Drop rows already in the database (a crash between commit and segment delete)"""
+        unsaved = []
+        for name, model in self.MODELS.items():
+            batch = [fields for row_model, fields in rows if row_model == name]
+            if not batch:
+                continue
+
+            stamps = [fields['created_at'] for fields in batch]
+            saved = set(
+                db.session.query(model.user_id, model.created_at)
+                .filter(model.user_id.in_({fields['user_id'] for fields in batch}))
+                .filter(model.created_at.between(min(stamps), max(stamps)))
+            )
+            unsaved.extend(
+                (name, fields) for fields in batch
+                if (fields['user_id'], fields['created_at']) not in saved
+            )
+        return unsaved
+
+    def _bump(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't journal {type(value).__name__}")
+
+
+def _decode(model, fields):
+    """Journal fields back to column values (ISO strings to datetimes)"""
+    for column in model.__table__.columns:
+        if isinstance(column.type, db.DateTime) and isinstance(fields.get(column.name), str):
+            fields[column.name] = datetime.fromisoformat(fields[column.name])
+    return fields
@@ -79,43 +79,20 @@ const Quiz = () => {
     navigate(`/quiz/${topic.id}`)
   }
 
-  const handleAnswer = async (questionIndex, selectedAnswer) => {
+  const handleAnswer = (questionIndex, selectedAnswer) => {
     const question = quiz.questions[questionIndex]
     
-    // Save answer
+    // Graded locally; the whole quiz is submitted at the end
     setAnswers(prev => ({
       ...prev,
       [questionIndex]: {
         user_answer: selectedAnswer,
         correct_answer: question.correct_answer,
         question: question.question,
-        explanation: question.explanation
+        explanation: question.explanation,
+        is_correct: selectedAnswer === question.correct_answer
       }
     }))
-
-    // Submit to backend
-    try {
-      const response = await quizAPI.submitAnswer({
-        topic_id: selectedTopic.id,
-        question: question.question,
-        user_answer: selectedAnswer,
-        correct_answer: question.correct_answer,
-        difficulty: quiz.difficulty
-      })
-
-      // Update answer with backend response
-      setAnswers(prev => ({
-        ...prev,
-        [questionIndex]: {
-          ...prev[questionIndex],
-          is_correct: response.data.is_correct,
-          explanation: response.data.explanation,
-          new_knowledge_level: response.data.new_knowledge_level
-        }
-      }))
-    } catch (error) {
-      console.error('Failed to submit answer:', error)
-    }
   }
 
   const handleNext = () => {
@@ -130,7 +107,7 @@ const Quiz = () => {
     }
   }
 
-  const handleSubmitQuiz = () => {
+  const handleSubmitQuiz = async () => {
     const answeredCount = Object.keys(answers).length
     const totalQuestions = quiz.questions.length
 
@@ -139,15 +116,35 @@ const Quiz = () => {
       return
     }
 
+    // Submit every answer in one request
+    let gradedAnswers = answers
+    try {
+      const response = await quizAPI.submitQuiz(
+        selectedTopic.id,
+        quiz.questions.map((_, index) => ({ ...answers[index], difficulty: quiz.difficulty }))
+      )
+
+      gradedAnswers = Object.fromEntries(
+        response.data.results.map((result, index) => [index, {
+          ...answers[index],
+          is_correct: result.is_correct,
+          explanation: result.explanation || answers[index].explanation,
+          new_knowledge_level: response.data.new_knowledge_level
+        }])
+      )
+    } catch (error) {
+      console.error('Failed to submit quiz:', error)
+    }
+
     // Calculate results
-    const correct = Object.values(answers).filter(a => a.is_correct).length
+    const correct = Object.values(gradedAnswers).filter(a => a.is_correct).length
     const score = (correct / totalQuestions) * 100
 
     setResults({
       score,
       correct,
       total: totalQuestions,
-      answers,
+      answers: gradedAnswers,
       topicName: selectedTopic.name
     })
   }
@@ -46,6 +46,7 @@ export const learningAPI = {
 export const quizAPI = {
   generateQuiz: (topicId) => api.post('/api/generate-quiz', { topic_id: topicId }),
   submitAnswer: (data) => api.post('/api/submit-answer', data),
+  submitQuiz: (topicId, answers) => api.post('/api/submit-quiz', { topic_id: topicId, answers }),
 }
 
 // Progress APIs